@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import yaml
+from typing import Any, Callable, Dict, List
+from generate_doc import generate_markdown
+from validate_yaml import ValueType, load_yaml, validate_schema, generate_registers
+
+# Preset sizes: general registers, cell fields, cells
+SIZES = {
+    "small": (200, 10, 16),
+    "medium": (2000, 50, 200),
+    "large": (5000, 100, 1000),
+}
+
+VALUE_TYPES = ["uint16", "int16", "uint32", "int32", "float32", "float64", "bool", "uint8", "char[8]", "char[16]", "uint16[4]", "float32[3]"]
+UNITS = [None, "V", "A", "%", "°C", "Ah"]
+
+def synthetic_registers(count: int, address_key: str, rng: random.Random, explicit_ratio: float, coil_ratio: float, prefix: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Creates ``count`` registers with mixed ``auto`` and explicit addresses that do not overlap.
+
+    Explicit addresses leave a small gap after the previous register, like reserved registers in real maps.
+    """
+    registers = {}
+    next_address = 0
+    for i in range(count):
+        value_type = rng.choice(VALUE_TYPES)
+        size = ValueType.from_str(value_type).registers_required()
+        reg: Dict[str, Any] = {"name": f"{prefix} {i}"}
+        if rng.random() < explicit_ratio:
+            next_address += rng.randint(0, 3)
+            reg[address_key] = next_address
+        else:
+            reg[address_key] = "auto"
+        reg["ValueType"] = value_type
+        reg["description"] = f"Synthetic {prefix.lower()} register {i} of type `{value_type}`."
+        unit = rng.choice(UNITS)
+        if unit is not None:
+            reg["unit"] = unit
+        if rng.random() < coil_ratio:
+            reg["hardware_support_register"] = "auto"
+        registers[f"{prefix}_{i}"] = reg
+        next_address += size
+    return registers
+
+def synthetic_data(general_registers: int, cell_fields: int, seed: int = 0, explicit_ratio: float = 0.2, coil_ratio: float = 0.3) -> Dict[str, Any]:
+    """
+    Creates the data of a synthetic, valid ``data.yaml``.
+
+    :param general_registers: The number of general registers.
+    :param cell_fields: The number of cell registers per cell.
+    :param seed: Seed of the random generator, equal seeds give equal maps.
+    :param explicit_ratio: Share of registers with explicit instead of ``auto`` address.
+    :param coil_ratio: Share of registers with a hardware support coil.
+    """
+    rng = random.Random(seed)
+    return {
+        "version": "1.0.0",
+        "general": {"registers": synthetic_registers(general_registers, "address", rng, explicit_ratio, coil_ratio, "General")},
+        "cells": {"address": "auto", "registers": synthetic_registers(cell_fields, "offset", rng, explicit_ratio, coil_ratio, "Cell")},
+    }
+
+def write_synthetic_yaml(path: str, general_registers: int, cell_fields: int, seed: int = 0) -> int:
+    """
+    Writes a synthetic ``data.yaml``.
+
+    :return: The size of the file in bytes.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(synthetic_data(general_registers, cell_fields, seed), f, sort_keys=False, allow_unicode=True)
+    return os.path.getsize(path)
+
+def time_stage(function: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """
+    Runs a stage ``repeat`` times after one untimed warm-up run, with its console output suppressed.
+
+    :return: Minimum, median and maximum wall time in seconds.
+    """
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        function()
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - start)
+    return {"min": min(times), "median": statistics.median(times), "max": max(times)}
+
+def run_benchmark(name: str, general_registers: int, cell_fields: int, number_of_cells: int, schema: Dict[str, Any], directory: str, repeat: int = 5, seed: int = 0) -> Dict[str, Any]:
+    """
+    Times each stage of the validate/generate pipeline on one synthetic map.
+    """
+    data_file = os.path.join(directory, f"{name}.yaml")
+    yaml_bytes = write_synthetic_yaml(data_file, general_registers, cell_fields, seed)
+    output_file = os.path.join(directory, f"{name}.md")
+    data = load_yaml(data_file)
+    registers = generate_registers(data)
+    timings = {
+        "load_yaml": time_stage(lambda: load_yaml(data_file), repeat),
+        "validate_schema": time_stage(lambda: validate_schema(data, schema), repeat),
+        "generate_registers": time_stage(lambda: generate_registers(data), repeat),
+        "validate_address_overlaps": time_stage(lambda: registers.validate_address_overlaps(number_of_cells), repeat),
+        "get_all_registers": time_stage(lambda: registers.get_all_registers(number_of_cells), repeat),
+        "generate_markdown": time_stage(lambda: generate_markdown(data, output_file), repeat),
+    }
+    return {
+        "name": name,
+        "general_registers": general_registers,
+        "cell_fields": cell_fields,
+        "cells": number_of_cells,
+        "yaml_bytes": yaml_bytes,
+        "timings": timings,
+    }
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Lists the stages whose median time grew by more than ``threshold`` compared to a baseline run.
+    """
+    regressions = []
+    previous = {run["name"]: run for run in baseline.get("runs", [])}
+    for run in results["runs"]:
+        old = previous.get(run["name"])
+        if old is None:
+            continue
+        for stage, timing in run["timings"].items():
+            old_timing = old["timings"].get(stage)
+            if old_timing and timing["median"] > old_timing["median"] * threshold:
+                regressions.append(f"{run['name']}/{stage}: {old_timing['median'] * 1000:.2f} ms -> {timing['median'] * 1000:.2f} ms")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the validate/generate pipeline on synthetic register maps.")
+    parser.add_argument("--schema", default="schema.json", help="Path to the JSON schema file (default: schema.json)")
+    parser.add_argument("--sizes", nargs="+", choices=sorted(SIZES), default=["small", "medium", "large"], help="Preset map sizes to run")
+    parser.add_argument("--general", type=int, help="Run a custom size with this many general registers instead of the presets")
+    parser.add_argument("--cell-fields", type=int, default=50, help="Cell registers per cell of the custom size (default: 50)")
+    parser.add_argument("--cells", type=int, default=100, help="Number of cells of the custom size (default: 100)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per stage (default: 5)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic maps (default: 0)")
+    parser.add_argument("--output", "-o", default="-", help="JSON results file, '-' for stdout (default)")
+    parser.add_argument("--keep", help="Keep the synthetic YAML files in this directory")
+    parser.add_argument("--baseline", help="Compare with the JSON results of an earlier run and fail on regressions")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Allowed slowdown factor against the baseline (default: 1.25)")
+    args = parser.parse_args()
+
+    with open(args.schema, "r", encoding="utf-8") as f:
+        schema = json.load(f)
+    if args.general is not None:
+        sizes = {"custom": (args.general, args.cell_fields, args.cells)}
+    else:
+        sizes = {name: SIZES[name] for name in args.sizes}
+
+    results: Dict[str, Any] = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "repeat": args.repeat,
+        "runs": [],
+    }
+    with contextlib.ExitStack() as stack:
+        directory = args.keep or stack.enter_context(tempfile.TemporaryDirectory())
+        os.makedirs(directory, exist_ok=True)
+        for name, (general_registers, cell_fields, number_of_cells) in sizes.items():
+            print(f"Benchmark '{name}': {general_registers} general registers, {cell_fields} cell registers, {number_of_cells} cells", file=sys.stderr)
+            run = run_benchmark(name, general_registers, cell_fields, number_of_cells, schema, directory, args.repeat, args.seed)
+            for stage, timing in run["timings"].items():
+                print(f"  {stage:<26} {timing['median'] * 1000:10.2f} ms", file=sys.stderr)
+            results["runs"].append(run)
+
+    report = json.dumps(results, indent=2)
+    if args.output == "-":
+        print(report)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+from typing import Iterable, List, Optional, Tuple
+from modbus_tcp import MAX_READ_COILS, ModbusTcpClient
+from validate_yaml import RegisterList
+
+# Distinguishes unknown ids from fields without hardware support coil
+_MISSING = object()
+
+def coil_range(registers: RegisterList) -> Tuple[int, int]:
+    """
+    Returns the range of hardware support coils used by the register map.
+
+    :return: The first coil address and the number of coils (0 if there are no coils).
+    """
+    if not registers.coils:
+        return 0, 0
+    addresses = [coil.address for coil in registers.coils]
+    start = min(addresses)
+    return start, max(addresses) - start + 1
+
+class Capabilities:
+    """
+    The hardware support coils of one device, decoded into a bitset.
+
+    Fields without hardware support register are always supported.
+    """
+    def __init__(self, registers: RegisterList, bits: int, start: int = 0):
+        """
+        :param registers: The register map.
+        :param bits: The coil states, bit ``i`` being coil ``start + i``.
+        :param start: The address of the first coil in ``bits``.
+        """
+        self.registers: RegisterList = registers
+        self.bits: int = bits
+        self.start: int = start
+        self._coils = {reg.id: reg.hardware_support_register for reg in registers.general_registers + registers.cell_registers}
+
+    @classmethod
+    def all_supported(cls, registers: RegisterList) -> "Capabilities":
+        """Returns capabilities supporting every field, for devices without hardware support coils."""
+        start, count = coil_range(registers)
+        return cls(registers, (1 << count) - 1, start)
+
+    @classmethod
+    def from_coil_bytes(cls, registers: RegisterList, data: bytes, start: int = 0) -> "Capabilities":
+        """
+        Decodes the payload of a Read Coils response, packed eight per byte, least significant bit first.
+        """
+        return cls(registers, int.from_bytes(data, "little"), start)
+
+    def coil(self, address: int) -> bool:
+        offset = address - self.start
+        return offset >= 0 and bool(self.bits >> offset & 1)
+
+    def supports(self, register_id: str) -> bool:
+        """
+        Tells whether the device supports a general or cell register, with or without cell number.
+
+        :raises KeyError: If the register id is unknown.
+        """
+        coil = self._coils.get(register_id, _MISSING)
+        if coil is _MISSING:
+            base, _, number = register_id.rpartition("_")
+            if not number.isdigit() or base not in self._coils:
+                raise KeyError(register_id)
+            coil = self._coils[base]
+        return coil is None or self.coil(coil)
+
+    def supported_register_ids(self, register_ids: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Filters register ids down to the ones the device supports.
+
+        :param register_ids: General and cell register ids, with or without cell number. Defaults to all registers.
+        :return: The supported register ids, in the given order.
+        """
+        if register_ids is None:
+            register_ids = self._coils.keys()
+        return [id for id in register_ids if self.supports(id)]
+
+    def unsupported_register_ids(self) -> List[str]:
+        return [id for id in self._coils if not self.supports(id)]
+
+async def read_capabilities(client: ModbusTcpClient, registers: RegisterList, unit_id: int = 1) -> Capabilities:
+    """
+    Reads the hardware support coils of a device once.
+
+    :param client: A connected or connectable client.
+    :param registers: The register map.
+    :param unit_id: The unit identifier of the device.
+    :return: The decoded capabilities.
+    """
+    start, count = coil_range(registers)
+    bits = 0
+    for offset in range(0, count, MAX_READ_COILS):
+        chunk = min(MAX_READ_COILS, count - offset)
+        data = await client.read_coils(start + offset, chunk, unit_id)
+        bits |= (int.from_bytes(data, "little") & ((1 << chunk) - 1)) << offset
+    return Capabilities(registers, bits, start)
@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+import argparse
+import bisect
+import ipaddress
+import json
+import mmap
+import struct
+import sys
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple, Union
+from decoder import BlockLayout, json_safe
+from modbus_tcp import MBAP_HEADER, READ_HOLDING_REGISTERS, READ_REQUEST
+from map_cache import add_map_arguments, register_map_from_args
+from validate_yaml import RegisterList
+
+PCAP_MAGIC = 0xA1B2C3D4
+PCAP_MAGIC_NS = 0xA1B23C4D
+PCAPNG_MAGIC = 0x0A0D0D0A
+# Global header without magic: version major/minor, zone, sigfigs, snaplen, link type
+PCAP_HEADER = "HHiIII"
+# Record header: seconds, fraction, captured length, original length
+PCAP_RECORD = "IIII"
+
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86DD
+ETHERTYPE_VLAN = (0x8100, 0x88A8)
+IP_PROTOCOL_TCP = 6
+TCP_FIN = 0x01
+TCP_SYN = 0x02
+TCP_RST = 0x04
+SEQUENCE_MODULUS = 1 << 32
+
+MAX_MBAP_FRAME = 260
+MAX_RTU_FRAME = 256
+# Requests without response kept per connection before the oldest are dropped
+MAX_PENDING_REQUESTS = 256
+# Segments after a gap kept per direction before the missing bytes are given up as not captured
+MAX_HELD_SEGMENTS = 16
+# Compiled address ranges kept, polls repeat the same few ranges
+MAX_RANGE_PLANS = 1024
+
+Buffer = Union[bytes, memoryview]
+Flow = Tuple[bytes, int, bytes, int]
+
+def _crc16_table() -> List[int]:
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+CRC16_TABLE = _crc16_table()
+
+def crc16(data: Buffer) -> int:
+    """Computes the Modbus RTU CRC (transmitted little-endian)."""
+    crc = 0xFFFF
+    for byte in data:
+        crc = (crc >> 8) ^ CRC16_TABLE[(crc ^ byte) & 0xFF]
+    return crc
+
+class PcapReader:
+    """
+    Reads a classic pcap file through a memory map.
+
+    Packets are returned as memoryview slices of the map, so no packet data is copied.
+    Views must not be kept after the reader is closed.
+    """
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view: memoryview = memoryview(self._mmap)
+        for endian in ("<", ">"):
+            magic = struct.unpack_from(endian + "I", self._view)[0]
+            if magic in (PCAP_MAGIC, PCAP_MAGIC_NS):
+                break
+        else:
+            self.close()
+            if magic == PCAPNG_MAGIC:
+                raise ValueError(f"'{path}' is a pcapng file, convert it to pcap first (editcap -F pcap)")
+            raise ValueError(f"'{path}' is not a pcap file")
+        self._fraction: float = 1e-9 if magic == PCAP_MAGIC_NS else 1e-6
+        self._record = struct.Struct(endian + PCAP_RECORD)
+        self.link_type: int = struct.unpack_from(endian + PCAP_HEADER, self._view, 4)[5] & 0x0FFFFFFF
+
+    def __iter__(self) -> Iterator[Tuple[float, memoryview]]:
+        """Yields the timestamp and the captured bytes of each packet."""
+        view = self._view
+        record = self._record
+        fraction = self._fraction
+        position = 24
+        end = len(view) - record.size
+        while position <= end:
+            seconds, frac, length, _ = record.unpack_from(view, position)
+            position += record.size
+            if position + length > len(view):
+                break  # truncated capture
+            yield seconds + frac * fraction, view[position:position + length]
+            position += length
+
+    def close(self):
+        self._view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # packet views are still referenced; the map is unmapped once they are freed
+        self._file.close()
+
+    def __enter__(self) -> "PcapReader":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def tcp_segment(packet: memoryview, link_type: int) -> Optional[Tuple[bytes, int, bytes, int, int, int, memoryview]]:
+    """
+    Extracts a TCP segment from a captured packet.
+
+    :return: Source address, source port, destination address, destination port, TCP flags, sequence number
+             and the payload, or None for other packets and IP fragments.
+    """
+    if link_type == LINKTYPE_ETHERNET:
+        offset = 14
+        ethertype = int.from_bytes(packet[12:14], "big")
+        while ethertype in ETHERTYPE_VLAN and len(packet) >= offset + 4:
+            ethertype = int.from_bytes(packet[offset + 2:offset + 4], "big")
+            offset += 4
+    elif link_type == LINKTYPE_LINUX_SLL:
+        offset = 16
+        ethertype = int.from_bytes(packet[14:16], "big")
+    elif link_type == LINKTYPE_RAW:
+        offset = 0
+        ethertype = ETHERTYPE_IPV4 if packet and packet[0] >> 4 == 4 else ETHERTYPE_IPV6
+    else:
+        raise ValueError(f"Unsupported link type {link_type}")
+    ip = packet[offset:]
+    if ethertype == ETHERTYPE_IPV4 and len(ip) >= 20:
+        header_length = (ip[0] & 0x0F) * 4
+        if ip[9] != IP_PROTOCOL_TCP or int.from_bytes(ip[6:8], "big") & 0x3FFF:
+            return None
+        ip = ip[:int.from_bytes(ip[2:4], "big")]  # strips Ethernet padding
+        source, destination = bytes(ip[12:16]), bytes(ip[16:20])
+    elif ethertype == ETHERTYPE_IPV6 and len(ip) >= 40:
+        # Extension headers are not followed
+        if ip[6] != IP_PROTOCOL_TCP:
+            return None
+        header_length = 40
+        ip = ip[:40 + int.from_bytes(ip[4:6], "big")]
+        source, destination = bytes(ip[8:24]), bytes(ip[24:40])
+    else:
+        return None
+    tcp = ip[header_length:]
+    if len(tcp) < 20:
+        return None
+    source_port, destination_port, sequence = struct.unpack_from(">HHI", tcp)
+    return source, source_port, destination, destination_port, tcp[13], sequence, tcp[(tcp[12] >> 4) * 4:]
+
+class StreamFramer:
+    """
+    Splits the payloads of one TCP direction into Modbus frames.
+
+    Frames within a segment are returned as views of the segment; only frames split
+    across segments are copied into a small reassembly buffer. Given the sequence numbers,
+    retransmitted bytes are dropped and segments arriving after a gap are held until the
+    gap is filled. If the gap is never filled, e.g. because the capture lost packets, the
+    framer continues after it once ``MAX_HELD_SEGMENTS`` segments are held.
+    """
+    def __init__(self, rtu: bool = False, request: bool = False, sequence: Optional[int] = None):
+        """
+        :param rtu: Frames are Modbus RTU frames with CRC instead of Modbus TCP frames.
+        :param request: The direction carries requests (only relevant for RTU).
+        :param sequence: The sequence number of the first payload byte, if known from the SYN.
+                         Defaults to the sequence number of the first segment fed.
+        """
+        self.rtu: bool = rtu
+        self.request: bool = request
+        self._pending: bytes = b""
+        self._next_sequence: Optional[int] = sequence
+        self._held: Dict[int, bytes] = {}
+
+    def _frame_length(self, data: Buffer, position: int) -> Optional[int]:
+        """Returns the length of the frame at ``position``, None if incomplete and 0 if invalid."""
+        available = len(data) - position
+        if not self.rtu:
+            if available < MBAP_HEADER.size:
+                return None
+            _, protocol_id, length, _ = MBAP_HEADER.unpack_from(data, position)
+            if protocol_id != 0 or not 2 <= length <= MAX_MBAP_FRAME - 6:
+                return 0
+            return 6 + length
+        if available < 3:
+            return None
+        function_code = data[position + 1]
+        if function_code & 0x80:
+            return 5
+        if self.request:
+            return 8
+        return 5 + data[position + 2]
+
+    def _distance(self, sequence: int) -> int:
+        """Returns how many bytes a sequence number lies after the next expected one, negative if before."""
+        return (sequence - self._next_sequence + SEQUENCE_MODULUS // 2) % SEQUENCE_MODULUS - SEQUENCE_MODULUS // 2
+
+    def feed(self, payload: Buffer, sequence: Optional[int] = None) -> Iterator[Buffer]:
+        """
+        Yields the complete frames available after a segment.
+
+        :param payload: The TCP payload of the segment.
+        :param sequence: The TCP sequence number of the segment. Without it, segments are taken as they come.
+        """
+        if sequence is None:
+            yield from self._frames(payload)
+            return
+        if self._next_sequence is None:
+            self._next_sequence = sequence
+        if self._distance(sequence) > 0:
+            held = self._held.get(sequence)
+            if held is None or len(held) < len(payload):
+                self._held[sequence] = bytes(payload)
+            if len(self._held) <= MAX_HELD_SEGMENTS:
+                return
+            # The missing bytes are not in the capture; drop the frame they belong to
+            self._pending = b""
+            self._next_sequence = min(self._held, key=self._distance)
+        else:
+            yield from self._accept(sequence, payload)
+        while self._held:
+            sequence = min(self._held, key=self._distance)
+            if self._distance(sequence) > 0:
+                break
+            yield from self._accept(sequence, self._held.pop(sequence))
+
+    def _accept(self, sequence: int, payload: Buffer) -> Iterator[Buffer]:
+        """Frames the part of an in-order segment that was not seen yet."""
+        seen = -self._distance(sequence)
+        if seen >= len(payload):
+            return  # retransmission
+        self._next_sequence = (sequence + len(payload)) % SEQUENCE_MODULUS
+        yield from self._frames(payload[seen:])
+
+    def _frames(self, payload: Buffer) -> Iterator[Buffer]:
+        if self._pending:
+            data: Buffer = self._pending + bytes(payload)
+            self._pending = b""
+        else:
+            data = payload
+        position = 0
+        while position < len(data):
+            length = self._frame_length(data, position)
+            if length is None or position + length > len(data):
+                if len(data) - position < (MAX_RTU_FRAME if self.rtu else MAX_MBAP_FRAME):
+                    self._pending = bytes(data[position:])
+                return
+            if length == 0:
+                return  # not in sync; drop the rest of the segment
+            frame = data[position:position + length]
+            position += length
+            if self.rtu and crc16(frame[:-2]) != int.from_bytes(frame[-2:], "little"):
+                return
+            yield frame
+
+class Record:
+    """One decoded read response."""
+    def __init__(self, timestamp: float, server: str, unit_id: int, address: int, count: int, values: Dict[str, Any], error: Optional[str] = None):
+        """
+        :param timestamp: Unix time of the response.
+        :param server: Address and port of the device or gateway.
+        :param unit_id: The unit identifier of the device.
+        :param address: The first register read.
+        :param count: The number of registers read.
+        :param values: Decoded values of the fields fully covered by the response, cell values with ids like ``Cell_Voltage_3``.
+        :param error: The Modbus exception of a failed read.
+        """
+        self.timestamp: float = timestamp
+        self.server: str = server
+        self.unit_id: int = unit_id
+        self.address: int = address
+        self.count: int = count
+        self.values: Dict[str, Any] = values
+        self.error: Optional[str] = error
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {"timestamp": self.timestamp, "server": self.server, "unit_id": self.unit_id, "address": self.address, "count": self.count, "values": self.values}
+        if self.error is not None:
+            result["error"] = self.error
+        return result
+
+class CaptureDecoder:
+    """
+    Decodes the Read Holding Registers responses of a capture through the register map.
+
+    The capture is read in one streaming pass. Memory is bounded by the number of open
+    connections: each keeps at most one partial frame, ``MAX_HELD_SEGMENTS`` segments
+    received after a gap per direction and ``MAX_PENDING_REQUESTS`` unanswered requests. Responses are matched to their request by transaction id for
+    Modbus TCP, and in order for Modbus RTU over TCP.
+    """
+    def __init__(self, registers: RegisterList, port: int = 502, rtu: bool = False):
+        """
+        :param registers: The register map.
+        :param port: The TCP port of the devices or gateways.
+        :param rtu: The traffic is Modbus RTU encapsulated in TCP instead of Modbus TCP.
+        """
+        self.registers: RegisterList = registers
+        self.port: int = port
+        self.rtu: bool = rtu
+        self.cell_start_address: int = registers.effective_cell_start_address()
+        self.cell_size: int = registers.get_cell_registers_size()
+        self._general = [(reg.address, reg.value_type.registers_required(), reg.id, BlockLayout([reg], reg.address)) for reg in registers.general_registers]
+        self._general_addresses = [item[0] for item in self._general]
+        self._cells = [(reg.address, reg.value_type.registers_required(), reg.id, BlockLayout([reg], reg.address)) for reg in registers.cell_registers]
+        self._plans: "OrderedDict[Tuple[int, int], List[Tuple[str, str, BlockLayout, int]]]" = OrderedDict()
+        self._servers: Dict[Tuple[bytes, int], str] = {}
+
+    def plan(self, address: int, count: int) -> List[Tuple[str, str, BlockLayout, int]]:
+        """
+        Returns the fields fully covered by a read.
+
+        :return: The output id, the register id, the compiled field layout and the byte offset of the field in the response data.
+        """
+        key = (address, count)
+        plan = self._plans.get(key)
+        if plan is not None:
+            self._plans.move_to_end(key)
+            return plan
+        end = address + count
+        plan = []
+        for i in range(bisect.bisect_left(self._general_addresses, address), len(self._general)):
+            reg_address, size, id, layout = self._general[i]
+            if reg_address + size > end:
+                if reg_address >= end:
+                    break
+                continue
+            plan.append((id, id, layout, 2 * (reg_address - address)))
+        if self._cells and self.cell_size:
+            first = max((address - self.cell_start_address) // self.cell_size, 0)
+            for cell in range(first, max((end - self.cell_start_address) // self.cell_size + 1, 0)):
+                base = self.cell_start_address + cell * self.cell_size
+                for offset, size, id, layout in self._cells:
+                    if base + offset >= address and base + offset + size <= end:
+                        plan.append((f"{id}_{cell + 1}", id, layout, 2 * (base + offset - address)))
+        self._plans[key] = plan
+        if len(self._plans) > MAX_RANGE_PLANS:
+            self._plans.popitem(last=False)
+        return plan
+
+    def decode_range(self, address: int, data: Buffer) -> Dict[str, Any]:
+        """
+        Decodes the fields fully covered by the register data of a response.
+
+        :param address: The first register of the data.
+        :param data: Big-endian register bytes.
+        """
+        values = {}
+        for id, field_id, layout, offset in self.plan(address, len(data) // 2):
+            values[id] = layout.decode(data, offset)[field_id]
+        return values
+
+    def _server(self, address: bytes, port: int) -> str:
+        key = (address, port)
+        name = self._servers.get(key)
+        if name is None:
+            ip = ipaddress.ip_address(address)
+            name = f"[{ip}]:{port}" if ip.version == 6 else f"{ip}:{port}"
+            self._servers[key] = name
+        return name
+
+    def _response(self, timestamp: float, server: str, unit_id: int, request: Tuple[int, int], pdu: Buffer) -> Optional[Record]:
+        address, count = request
+        function_code = pdu[0]
+        if function_code == READ_HOLDING_REGISTERS | 0x80:
+            return Record(timestamp, server, unit_id, address, count, {}, f"Modbus exception {pdu[1]}")
+        if function_code != READ_HOLDING_REGISTERS or len(pdu) < 2 or pdu[1] != 2 * count or len(pdu) < 2 + 2 * count:
+            return None
+        return Record(timestamp, server, unit_id, address, count, self.decode_range(address, pdu[2:2 + 2 * count]))
+
+    def records(self, path: str) -> Iterator[Record]:
+        """
+        Streams the decoded responses of a pcap capture.
+
+        :param path: Path of a classic pcap file with Ethernet, Linux cooked or raw IP link type.
+        """
+        framers: Dict[Tuple[Flow, bool], StreamFramer] = {}
+        # Modbus TCP: (transaction id, unit id) -> (address, count); RTU: queue of (unit id, address, count)
+        pending: Dict[Flow, Any] = {}
+        with PcapReader(path) as reader:
+            for timestamp, packet in reader:
+                segment = tcp_segment(packet, reader.link_type)
+                if segment is None:
+                    continue
+                source, source_port, destination, destination_port, flags, sequence, payload = segment
+                if destination_port == self.port:
+                    flow, is_request = (source, source_port, destination, destination_port), True
+                elif source_port == self.port:
+                    flow, is_request = (destination, destination_port, source, source_port), False
+                else:
+                    continue
+                if flags & TCP_SYN:
+                    # A new connection on the same ports; the SYN takes one sequence number
+                    framers[(flow, is_request)] = StreamFramer(self.rtu, is_request, (sequence + 1) % SEQUENCE_MODULUS)
+                    pending.pop(flow, None)
+                # The last response often shares its segment with the FIN; a reset discards the payload
+                if payload and not flags & TCP_RST:
+                    framer = framers.get((flow, is_request))
+                    if framer is None:
+                        framer = framers[(flow, is_request)] = StreamFramer(self.rtu, is_request)
+                    for frame in framer.feed(payload, sequence):
+                        if self.rtu:
+                            record = self._rtu_frame(timestamp, flow, is_request, frame, pending)
+                        else:
+                            record = self._tcp_frame(timestamp, flow, is_request, frame, pending)
+                        if record is not None:
+                            yield record
+                if flags & (TCP_FIN | TCP_RST):
+                    framers.pop((flow, True), None)
+                    framers.pop((flow, False), None)
+                    pending.pop(flow, None)
+
+    def _tcp_frame(self, timestamp: float, flow: Flow, is_request: bool, frame: Buffer, pending: Dict[Flow, Any]) -> Optional[Record]:
+        transaction_id, _, _, unit_id = MBAP_HEADER.unpack_from(frame)
+        pdu = frame[MBAP_HEADER.size:]
+        if is_request:
+            if pdu[0] == READ_HOLDING_REGISTERS and len(pdu) >= READ_REQUEST.size:
+                requests = pending.setdefault(flow, OrderedDict())
+                requests[(transaction_id, unit_id)] = READ_REQUEST.unpack_from(pdu)[1:]
+                if len(requests) > MAX_PENDING_REQUESTS:
+                    requests.popitem(last=False)
+            return None
+        request = pending.get(flow, {}).pop((transaction_id, unit_id), None)
+        if request is None:
+            return None
+        return self._response(timestamp, self._server(flow[2], flow[3]), unit_id, request, pdu)
+
+    def _rtu_frame(self, timestamp: float, flow: Flow, is_request: bool, frame: Buffer, pending: Dict[Flow, Any]) -> Optional[Record]:
+        unit_id = frame[0]
+        pdu = frame[1:-2]
+        requests: Deque[Tuple[int, int, int]] = pending.setdefault(flow, deque(maxlen=MAX_PENDING_REQUESTS))
+        if is_request:
+            if pdu[0] == READ_HOLDING_REGISTERS:
+                requests.append((unit_id, *READ_REQUEST.unpack_from(pdu)[1:]))
+            return None
+        # Drop requests that were never answered, e.g. to a unit that is offline
+        while requests and requests[0][0] != unit_id:
+            requests.popleft()
+        if not requests:
+            return None
+        _, address, count = requests.popleft()
+        return self._response(timestamp, self._server(flow[2], flow[3]), unit_id, (address, count), pdu)
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode the Modbus register reads of a capture file into JSON lines.")
+    parser.add_argument("yaml_file", help="Path to the YAML configuration file")
+    parser.add_argument("capture_file", help="Path to a pcap capture")
+    parser.add_argument("-p", "--port", type=int, default=502, help="TCP port of the devices or gateways (default: 502)")
+    parser.add_argument("--rtu", action="store_true", help="Traffic is Modbus RTU over TCP instead of Modbus TCP")
+    parser.add_argument("-o", "--output", default="-", help="Output file for the JSON lines, '-' for stdout (default)")
+    add_map_arguments(parser)
+    args = parser.parse_args()
+
+    decoder = CaptureDecoder(register_map_from_args(args.yaml_file, args), args.port, args.rtu)
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    count = 0
+    try:
+        for record in decoder.records(args.capture_file):
+            result = record.to_dict()
+            # Invalid float readings are NaN, which is not valid JSON
+            result["values"] = json_safe(result["values"])
+            output.write(json.dumps(result, ensure_ascii=False, allow_nan=False))
+            output.write("\n")
+            count += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"{count} responses decoded.", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
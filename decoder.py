@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+import math
+import struct
+import sys
+from array import array
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from validate_yaml import BaseType, Register, RegisterList
+
+# struct format characters for the numeric base types. All values are
+# transmitted big-endian with the most significant register first.
+STRUCT_CODES = {
+    BaseType.INT8: "b",
+    BaseType.UINT8: "B",
+    BaseType.INT16: "h",
+    BaseType.UINT16: "H",
+    BaseType.INT32: "i",
+    BaseType.UINT32: "I",
+    BaseType.INT64: "q",
+    BaseType.UINT64: "Q",
+    BaseType.FLOAT32: "f",
+    BaseType.FLOAT64: "d",
+}
+
+Words = Union[bytes, bytearray, memoryview, Sequence[int]]
+
+def words_to_bytes(words: Words) -> bytes:
+    """
+    Converts a buffer of 16-bit register values into their big-endian byte representation.
+
+    Byte-like buffers are assumed to already be in wire order and are returned unchanged.
+
+    :param words: The register values, e.g. ``response.registers`` of a Modbus client.
+    :return: The registers as big-endian bytes.
+    """
+    if isinstance(words, (bytes, bytearray, memoryview)):
+        return words
+    buffer = array("H", words)
+    if sys.byteorder == "little":
+        buffer.byteswap()
+    return buffer.tobytes()
+
+def json_safe(value: Any) -> Any:
+    """
+    Replaces NaN and infinite floats in a decoded value with None, as JSON cannot represent them.
+
+    :param value: A decoded value, or a list or dictionary of them.
+    :return: The value with non-finite floats replaced, suitable for ``json.dumps(..., allow_nan=False)``.
+    """
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, list):
+        return [json_safe(item) for item in value]
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    return value
+
+def _decode_char(value: bytes) -> str:
+    return value.split(b"\0", 1)[0].decode("ascii", errors="replace")
+
+def _bool_decoder(dimension: int) -> Callable[[Tuple[int, ...]], Any]:
+    if dimension == 1:
+        return lambda words: bool(words[0] & 1)
+    return lambda words: [bool(words[i // 16] >> (i % 16) & 1) for i in range(dimension)]
+
+def field_format(register: Register) -> Tuple[str, int, Optional[Callable[[Tuple[Any, ...]], Any]]]:
+    """
+    Determines how a single field is laid out in its registers.
+
+    Layout rules:
+      - 8-bit scalars occupy the low byte of their register.
+      - 8-bit arrays are packed two elements per register, high byte first.
+        ``char`` arrays are returned as strings, terminated at the first NUL byte.
+      - Wider types are big-endian with the most significant register first.
+      - ``bool`` values are bit fields, element ``i`` being bit ``i % 16`` of register ``i // 16``.
+
+    :param register: The register to describe.
+    :return: The struct format, the number of unpacked items and an optional converter
+             that turns those items into the final value.
+    """
+    vt = register.value_type
+    base_type = vt.base_type
+    dimension = vt.dimension
+    if base_type == BaseType.BOOL:
+        count = vt.registers_required()
+        return f"{count}H", count, _bool_decoder(dimension)
+    if base_type == BaseType.CHAR:
+        padding = "x" if dimension % 2 else ""
+        if dimension == 1:
+            return "xs", 1, lambda items: _decode_char(items[0])
+        return f"{dimension}s{padding}", 1, lambda items: _decode_char(items[0])
+    code = STRUCT_CODES[base_type]
+    if vt.bit_size_map[base_type] == 8:
+        if dimension == 1:
+            return f"x{code}", 1, None
+        padding = "x" if dimension % 2 else ""
+        return f"{dimension}{code}{padding}", dimension, list
+    if dimension == 1:
+        return code, 1, None
+    return f"{dimension}{code}", dimension, list
+
+def _bool_encoder(dimension: int, count: int) -> Callable[[Any], Tuple[int, ...]]:
+    if dimension == 1:
+        return lambda value: (1 if value else 0,) + (0,) * (count - 1)
+    def encode(values: Any) -> Tuple[int, ...]:
+        words = [0] * count
+        for i, value in enumerate(values[:dimension]):
+            if value:
+                words[i // 16] |= 1 << (i % 16)
+        return tuple(words)
+    return encode
+
+def field_encoder(register: Register) -> Callable[[Any], Tuple[Any, ...]]:
+    """
+    Returns the inverse of the converter from ``field_format``.
+
+    :param register: The register to describe.
+    :return: A callable turning a value into the items packed by the field's struct format.
+    """
+    vt = register.value_type
+    base_type = vt.base_type
+    dimension = vt.dimension
+    if base_type == BaseType.BOOL:
+        return _bool_encoder(dimension, vt.registers_required())
+    if base_type == BaseType.CHAR:
+        return lambda value: (str(value).encode("ascii", errors="replace")[:dimension],)
+    if dimension == 1:
+        return lambda value: (value,)
+    return lambda values: tuple(values[:dimension]) + (0,) * (dimension - len(values))
+
+class BlockLayout:
+    """
+    A precompiled unpack plan for a contiguous block of registers.
+
+    All fields of the block are decoded by a single ``struct.Struct``; addresses that are
+    not covered by a field are skipped as padding.
+    """
+    def __init__(self, registers: Iterable[Register], start: int = 0, size: Optional[int] = None):
+        """
+        Compiles the block layout.
+
+        :param registers: The fields of the block. Their addresses are absolute
+                          (or offsets, for the cell block).
+        :param start: The address of the first register of the block.
+        :param size: The number of registers of the block. Defaults to the end of the last field.
+        """
+        fmt = [">"]
+        position = start
+        index = 0
+        self.plain_ids: List[str] = []
+        plain_indices: List[int] = []
+        self.converted: List[Tuple[str, int, int, Callable[[Tuple[Any, ...]], Any]]] = []
+        self.encoders: List[Tuple[str, Tuple[Any, ...], Callable[[Any], Tuple[Any, ...]]]] = []
+        for reg in sorted(registers, key=lambda x: x.address):
+            if reg.address < position:
+                raise ValueError(f"Register '{reg.id}' overlaps the previous field at address {reg.address}")
+            if reg.address > position:
+                fmt.append(f"{2 * (reg.address - position)}x")
+            field_fmt, count, converter = field_format(reg)
+            fmt.append(field_fmt)
+            if converter is None:
+                self.plain_ids.append(reg.id)
+                plain_indices.append(index)
+            else:
+                self.converted.append((reg.id, index, count, converter))
+            # Fields missing from the values to encode are written as zero registers
+            field_struct = struct.Struct(">" + field_fmt)
+            self.encoders.append((reg.id, field_struct.unpack(bytes(field_struct.size)), field_encoder(reg)))
+            index += count
+            position = reg.address + reg.value_type.registers_required()
+        if size is not None:
+            if start + size < position:
+                raise ValueError(f"Block size {size} is smaller than its fields")
+            if start + size > position:
+                fmt.append(f"{2 * (start + size - position)}x")
+            position = start + size
+        self.start: int = start
+        self.size: int = position - start
+        self.struct: struct.Struct = struct.Struct("".join(fmt))
+        if len(plain_indices) == 1:
+            single = plain_indices[0]
+            self._plain_getter = lambda values: (values[single],)
+        elif plain_indices:
+            self._plain_getter = itemgetter(*plain_indices)
+        else:
+            self._plain_getter = lambda values: ()
+
+    def decode(self, buffer: bytes, offset: int = 0) -> Dict[str, Any]:
+        """
+        Decodes one instance of the block.
+
+        :param buffer: Big-endian register bytes.
+        :param offset: Byte offset of the block within the buffer.
+        :return: A dictionary mapping field ids to their values.
+        """
+        values = self.struct.unpack_from(buffer, offset)
+        result = dict(zip(self.plain_ids, self._plain_getter(values)))
+        for id, index, count, converter in self.converted:
+            result[id] = converter(values[index:index + count])
+        return result
+
+    def decode_repeated(self, buffer: bytes, count: int, offset: int = 0) -> Dict[str, List[Any]]:
+        """
+        Decodes ``count`` consecutive instances of the block in one pass.
+
+        :param buffer: Big-endian register bytes.
+        :param count: The number of block instances.
+        :param offset: Byte offset of the first instance within the buffer.
+        :return: A dictionary mapping field ids to a list with one value per instance.
+        """
+        if count <= 0:
+            return {id: [] for id in self.plain_ids + [c[0] for c in self.converted]}
+        length = self.struct.size * count
+        view = memoryview(buffer)[offset:offset + length]
+        if len(view) < length:
+            raise ValueError(f"Buffer too short for {count} blocks of {self.size} registers")
+        columns = list(zip(*self.struct.iter_unpack(view)))
+        result = {id: list(column) for id, column in zip(self.plain_ids, self._plain_getter(columns))}
+        for id, index, count_, converter in self.converted:
+            if count_ == 1:
+                result[id] = [converter((value,)) for value in columns[index]]
+            else:
+                result[id] = [converter(items) for items in zip(*columns[index:index + count_])]
+        return result
+
+    def encode_into(self, buffer: bytearray, values: Dict[str, Any], offset: int = 0):
+        """
+        Encodes one instance of the block, the inverse of ``decode``.
+
+        :param buffer: The writable buffer of big-endian register bytes.
+        :param values: A dictionary mapping field ids to their values. Missing fields are written as zero.
+        :param offset: Byte offset of the block within the buffer.
+        """
+        items = []
+        for id, default, encoder in self.encoders:
+            value = values.get(id)
+            items.extend(default if value is None else encoder(value))
+        self.struct.pack_into(buffer, offset, *items)
+
+    def encode_repeated_into(self, buffer: bytearray, values: Dict[str, Sequence[Any]], count: int, offset: int = 0):
+        """
+        Encodes ``count`` consecutive instances of the block, the inverse of ``decode_repeated``.
+
+        :param buffer: The writable buffer of big-endian register bytes.
+        :param values: A dictionary mapping field ids to a sequence with one value per instance.
+        :param count: The number of block instances.
+        :param offset: Byte offset of the first instance within the buffer.
+        """
+        for i in range(count):
+            self.encode_into(buffer, {id: column[i] for id, column in values.items() if i < len(column)}, offset + i * self.struct.size)
+
+class RegisterDecoder:
+    """
+    Decodes raw holding-register buffers into typed values using precompiled unpack plans
+    for the general block and for one cell stride.
+    """
+    def __init__(self, registers: RegisterList, register_ids: Optional[Iterable[str]] = None):
+        """
+        Compiles the decoder for the given register map.
+
+        :param registers: The register map created by ``generate_registers``.
+        :param register_ids: Optional subset of general register ids and cell register ids
+                             (without cell number) to decode. All other fields are skipped.
+        """
+        selected = set(register_ids) if register_ids is not None else None
+        general = [reg for reg in registers.general_registers if selected is None or reg.id in selected]
+        cells = [reg for reg in registers.cell_registers if selected is None or reg.id in selected]
+        self.registers: RegisterList = registers
+        # The general block starts at its first selected field, so buffers may start there too
+        self.general: BlockLayout = BlockLayout(general, min((reg.address for reg in general), default=0))
+        self.cell_start_address: int = registers.effective_cell_start_address()
+        self.cell_size: int = registers.get_cell_registers_size()
+        self.cell: BlockLayout = BlockLayout(cells, 0, self.cell_size)
+
+    def decode_general(self, words: Words, start: int = 0) -> Dict[str, Any]:
+        """
+        Decodes all general registers.
+
+        :param words: Register buffer covering the general block.
+        :param start: The address of the first register in the buffer, at most the address of the first decoded field.
+        :return: A dictionary mapping register ids to their values.
+        """
+        if start > self.general.start:
+            raise ValueError(f"Buffer starts at {start}, after the first general field at {self.general.start}")
+        return self.general.decode(words_to_bytes(words), 2 * (self.general.start - start))
+
+    def decode_cells(self, words: Words, number_of_cells: int, start: Optional[int] = None) -> Dict[str, List[Any]]:
+        """
+        Decodes all cells at once.
+
+        :param words: Register buffer covering the cell block.
+        :param number_of_cells: The number of cells to decode.
+        :param start: The address of the first register in the buffer, at most the cell start address.
+                      Defaults to the cell start address.
+        :return: A dictionary mapping cell register ids to a list of values, index 0 being cell 1.
+        """
+        if start is None:
+            start = self.cell_start_address
+        elif start > self.cell_start_address:
+            raise ValueError(f"Buffer starts at {start}, after the cell start address {self.cell_start_address}")
+        return self.cell.decode_repeated(words_to_bytes(words), number_of_cells, 2 * (self.cell_start_address - start))
+
+    def decode(self, words: Words, number_of_cells: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Decodes a complete register image starting at address 0.
+
+        :param words: Register buffer starting at address 0.
+        :param number_of_cells: The number of cells to decode. Defaults to as many cells as the buffer holds.
+        :return: A dictionary with the general registers and, for each cell register, a list of cell values.
+        """
+        buffer = words_to_bytes(words)
+        if number_of_cells is None:
+            available = len(buffer) // 2 - self.cell_start_address
+            number_of_cells = max(available // self.cell_size, 0) if self.cell_size else 0
+        result = self.general.decode(buffer, 2 * self.general.start)
+        result.update(self.cell.decode_repeated(buffer, number_of_cells, 2 * self.cell_start_address))
+        return result
+
+    def image_size(self, number_of_cells: int) -> int:
+        """Returns the number of registers from address 0 to the end of the last cell."""
+        return max(self.general.start + self.general.size, self.cell_start_address + number_of_cells * self.cell_size)
+
+    def encode(self, values: Dict[str, Any], number_of_cells: int) -> bytearray:
+        """
+        Encodes a complete register image starting at address 0, the inverse of ``decode``.
+
+        :param values: General register values and, for each cell register, a sequence of cell values.
+        :param number_of_cells: The number of cells to encode.
+        :return: The register image as big-endian bytes.
+        """
+        buffer = bytearray(2 * self.image_size(number_of_cells))
+        self.general.encode_into(buffer, values, 2 * self.general.start)
+        self.cell.encode_repeated_into(buffer, {reg.id: values[reg.id] for reg in self.registers.cell_registers if reg.id in values}, number_of_cells, 2 * self.cell_start_address)
+        return buffer
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+import argparse
+import re
+from typing import List
+from decoder import BlockLayout, field_format
+from generate_doc import write_if_changed
+from map_cache import add_map_arguments, register_map_from_args
+from validate_yaml import BaseType, Register, RegisterList
+
+# C types used for one element of each base type in the packed cell struct
+C_TYPES = {
+    BaseType.INT8: "int8_t",
+    BaseType.UINT8: "uint8_t",
+    BaseType.CHAR: "char",
+    BaseType.INT16: "int16_t",
+    BaseType.UINT16: "uint16_t",
+    BaseType.INT32: "int32_t",
+    BaseType.UINT32: "uint32_t",
+    BaseType.INT64: "int64_t",
+    BaseType.UINT64: "uint64_t",
+    BaseType.FLOAT32: "float",
+    BaseType.FLOAT64: "double",
+}
+
+HEADER_NOTE = "Generated from the YAML configuration file by generate_code.py. Do not edit."
+
+def c_name(id: str) -> str:
+    """Converts a register id into an upper-case C identifier."""
+    return re.sub(r"\W", "_", id).upper()
+
+def c_member(reg: Register) -> str:
+    """
+    Declares a cell field as member of the packed cell struct, occupying exactly its registers.
+    """
+    vt = reg.value_type
+    name = re.sub(r"\W", "_", reg.id).lower()
+    if vt.base_type == BaseType.BOOL:
+        return f"uint16_t {name}[{vt.registers_required()}];" if vt.registers_required() > 1 else f"uint16_t {name};"
+    if vt.bit_size_map[vt.base_type] == 8:
+        if vt.dimension == 1:
+            # 8-bit scalars occupy the low byte of a full register
+            return f"uint16_t {name};"
+        return f"{C_TYPES[vt.base_type]} {name}[{2 * vt.registers_required()}];"
+    if vt.dimension == 1:
+        return f"{C_TYPES[vt.base_type]} {name};"
+    return f"{C_TYPES[vt.base_type]} {name}[{vt.dimension}];"
+
+def generate_c_header(registers: RegisterList) -> str:
+    """
+    Renders a C header with addresses, sizes and coil indices and a packed struct for one cell.
+    """
+    cell_start_address = registers.effective_cell_start_address()
+    version = registers.version
+    out: List[str] = []
+    w = out.append
+    w(f"/* {HEADER_NOTE} */\n")
+    w("#ifndef IROCK_MODBUS_H\n#define IROCK_MODBUS_H\n\n#include <stdint.h>\n\n")
+    w(f"#define IROCK_MODBUS_VERSION \"{version}\"\n")
+    w(f"#define IROCK_MODBUS_VERSION_MAJOR {version.major}\n")
+    w(f"#define IROCK_MODBUS_VERSION_MINOR {version.minor}\n")
+    w(f"#define IROCK_MODBUS_VERSION_PATCH {version.patch}\n\n")
+
+    w("/* Holding register addresses of the general fields */\nenum irock_register {\n")
+    for reg in registers.general_registers:
+        w(f"    IROCK_REG_{c_name(reg.id)} = {reg.address},\n")
+    w("};\n\n/* Number of holding registers of the general fields */\n")
+    for reg in registers.general_registers:
+        w(f"#define IROCK_REG_{c_name(reg.id)}_SIZE {reg.value_type.registers_required()}\n")
+
+    w("\n/* Cell fields: offsets within one cell */\n")
+    w(f"#define IROCK_CELL_START_ADDRESS {cell_start_address}\n")
+    w(f"#define IROCK_CELL_SIZE {registers.get_cell_registers_size()}\n")
+    # C has no empty enums or structs, so both are left out of maps without coils or cells
+    if registers.cell_registers:
+        w("enum irock_cell_register {\n")
+        for reg in registers.cell_registers:
+            w(f"    IROCK_CELL_{c_name(reg.id)} = {reg.address},\n")
+        w("};\n")
+    for reg in registers.cell_registers:
+        w(f"#define IROCK_CELL_{c_name(reg.id)}_SIZE {reg.value_type.registers_required()}\n")
+    w("/* Holding register address of a cell field, cell numbering starts with 1 */\n")
+    w("#define IROCK_CELL_ADDRESS(cell, offset) (IROCK_CELL_START_ADDRESS + (offset) + IROCK_CELL_SIZE * ((cell) - 1))\n\n")
+
+    coil_registers = [reg for reg in registers.general_registers + registers.cell_registers if reg.hardware_support_register is not None]
+    if coil_registers:
+        w("/* Hardware support coils */\nenum irock_coil {\n")
+        for reg in coil_registers:
+            w(f"    IROCK_COIL_{c_name(reg.id)} = {reg.hardware_support_register},\n")
+        w("};\n\n")
+
+    if registers.cell_registers:
+        w("/*\n * Register layout of one cell. Members are in host byte order; on the wire, values are\n")
+        w(" * big-endian with the most significant register first.\n */\n")
+        w("#pragma pack(push, 1)\ntypedef struct {\n")
+        position = 0
+        for reg in registers.cell_registers:
+            if reg.address > position:
+                w(f"    uint16_t reserved_{position}[{reg.address - position}];\n")
+            w(f"    {c_member(reg)}\n")
+            position = reg.address + reg.value_type.registers_required()
+        cell_size = registers.get_cell_registers_size()
+        if cell_size > position:
+            w(f"    uint16_t reserved_{position}[{cell_size - position}];\n")
+        w("} irock_cell_t;\n#pragma pack(pop)\n\n")
+        w("_Static_assert(sizeof(irock_cell_t) == 2 * IROCK_CELL_SIZE, \"irock_cell_t must match IROCK_CELL_SIZE\");\n\n")
+    w("#endif /* IROCK_MODBUS_H */\n")
+    return "".join(out)
+
+def generate_python_module(registers: RegisterList) -> str:
+    """
+    Renders a Python module with addresses, struct formats and offsets that needs no YAML parsing.
+    """
+    cell_start_address = registers.effective_cell_start_address()
+    general = BlockLayout(registers.general_registers)
+    cell_size = registers.get_cell_registers_size()
+    cell = BlockLayout(registers.cell_registers, 0, cell_size)
+
+    def items(regs: List[Register]) -> List[str]:
+        # The id of each item unpacked by the block struct, repeated for array fields
+        ids = []
+        for reg in sorted(regs, key=lambda x: x.address):
+            ids.extend([reg.id] * field_format(reg)[1])
+        return ids
+
+    out: List[str] = []
+    w = out.append
+    w(f"# {HEADER_NOTE}\n")
+    w("import struct\n\n")
+    w(f"VERSION = {str(registers.version)!r}\n\n")
+    w("# Register id -> (address, number of registers, struct format of the field)\n")
+    w("REGISTERS = {\n")
+    for reg in registers.general_registers:
+        w(f"    {reg.id!r}: ({reg.address}, {reg.value_type.registers_required()}, {'>' + field_format(reg)[0]!r}),\n")
+    w("}\n\n")
+    w("# Cell register id -> (offset, number of registers, struct format of the field)\n")
+    w("CELL_REGISTERS = {\n")
+    for reg in registers.cell_registers:
+        w(f"    {reg.id!r}: ({reg.address}, {reg.value_type.registers_required()}, {'>' + field_format(reg)[0]!r}),\n")
+    w("}\n\n")
+    w("# Register id -> hardware support coil\nCOILS = {\n")
+    for reg in registers.general_registers + registers.cell_registers:
+        if reg.hardware_support_register is not None:
+            w(f"    {reg.id!r}: {reg.hardware_support_register},\n")
+    w("}\n\n")
+    w(f"CELL_START_ADDRESS = {cell_start_address}\n")
+    w(f"CELL_SIZE = {cell_size}\n\n")
+    w("# Struct of all general registers starting at address 0, and of one cell\n")
+    w(f"GENERAL_FORMAT = {general.struct.format!r}\n")
+    w(f"GENERAL_SIZE = {general.size}\n")
+    w(f"GENERAL_ITEMS = {items(registers.general_registers)!r}\n")
+    w(f"CELL_FORMAT = {cell.struct.format!r}\n")
+    w(f"CELL_ITEMS = {items(registers.cell_registers)!r}\n")
+    w("GENERAL_STRUCT = struct.Struct(GENERAL_FORMAT)\n")
+    w("CELL_STRUCT = struct.Struct(CELL_FORMAT)\n\n")
+    w("def cell_address(cell: int, offset: int) -> int:\n")
+    w("    \"\"\"Returns the holding register address of a cell field, cell numbering starts with 1.\"\"\"\n")
+    w("    return CELL_START_ADDRESS + offset + CELL_SIZE * (cell - 1)\n\n")
+    w("def cell_register_address(id: str, cell: int) -> int:\n")
+    w("    \"\"\"Returns the holding register address of a cell register id for a cell.\"\"\"\n")
+    w("    return cell_address(cell, CELL_REGISTERS[id][0])\n")
+    return "".join(out)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a C header and a Python module with the register map.")
+    parser.add_argument("yaml_file", help="Path to the YAML configuration file")
+    parser.add_argument("--c-header", help="Write a C header to this file")
+    parser.add_argument("--python", help="Write a Python module to this file")
+    add_map_arguments(parser)
+    args = parser.parse_args()
+    if not args.c_header and not args.python:
+        parser.error("At least one of --c-header and --python is required")
+
+    registers = register_map_from_args(args.yaml_file, args)
+    outputs = []
+    if args.c_header:
+        outputs.append((args.c_header, generate_c_header(registers)))
+    if args.python:
+        outputs.append((args.python, generate_python_module(registers)))
+    for output_file, content in outputs:
+        if write_if_changed(output_file, content):
+            print(f"Code generated in '{output_file}'.")
+        else:
+            print(f"Code in '{output_file}' is up to date.")
+
+if __name__ == "__main__":
+    main()
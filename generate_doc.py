@@ -1,131 +1,282 @@
 #!/usr/bin/env python3
 import argparse
-import yaml
-from validate_yaml import ValueType, load_yaml, generate_registers # Import from your existing script
+import csv
+import hashlib
+import html
+import io
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+from map_cache import DEFAULT_CACHE_DIR, DEFAULT_SCHEMA_FILE, add_map_arguments, load_register_map, register_map_from_args
+from profiling import add_profile_arguments, check_profile_arguments, profiled, staged
+from validate_yaml import ValueType, RegisterList, generate_registers # Import from your existing script
+
+class DocumentLayout:
+    """
+    Everything the documentation renderers need, computed once from the register map.
+    """
+    def __init__(self, registers: RegisterList):
+        self.registers: RegisterList = registers
+        self.version: Optional[str] = str(registers.version) if registers.version is not None else None
+        self.overview = self.registers.view(3)
+        self.cell_start_address: int = self.registers.effective_cell_start_address()
+        self.cell_size: int = self.registers.get_cell_registers_size()
+        last_cell = self.registers.cell_registers[-1] if self.registers.cell_registers else None
+        self.last_cell_offset: int = last_cell.address if last_cell is not None else 0
+        self.last_cell_size: int = last_cell.value_type.registers_required() if last_cell is not None else 0
+
+@staged("render_markdown")
+def render_markdown(layout: DocumentLayout) -> str:
+    out: List[str] = []
+    w = out.append
+    registers = layout.registers
+    w("# iRock Modbus Registers")
+    if layout.version:
+        w(f" {layout.version}")
+    w("\n\nAll provided fields will be accessible in the Holding Registers. Each field can be split into multiple registers depending on its length. Fields that are not supported by all hardware will additionally write to a coil to indicate whether this function is supported.\n\n")
+    w("## Table of Contents\n\n")
+    w("- [Versioning](#versioning)\n")
+    w("- [Overview](#overview)\n")
+    w("- [Supported Data Types](#supported-data-types)\n")
+    w("- [Register Allocation](#register-allocation)\n")
+    w("- [Hardware Support Register](#hardware-support-register)\n")
+    w("- [Fields](#fields)\n")
+    w("  - [Cells](#cells)\n")
+    w("\n")
+    w("## Versioning\n\n")
+    w(f"This table version is \"{layout.version}\". Future changes to the table will follow semantic versioning:\n\n")
+    w("- Patch version (0.0.x): Compatible changes, such as adding new fields or minor adjustments that do not affect existing registers.\n")
+    w("- Minor version (0.x.0): Changes that may alter values but keep the same position and length, such as updating default values or improving data types.\n")
+    w("- Major version (x.0.0): Comprehensive changes that may alter the position of fields, remove deprecated fields, or introduce breaking changes that require client updates.\n\n")
+    w("## Overview\n\n")
+    w("| |Register|Type|[Hardware Supported Register](#hardware-support-register)|\n|-|-|-|-|\n")
+    for reg in layout.overview:
+        w(f"|[{reg.name}](#{reg.name.lower().replace(' ', '-')})|{reg.address}|{reg.value_type}|{reg.hardware_support_register}|\n")
+    w("|...| | | |\n\n")
+    w("## Supported Data Types\n\n")
+    w("In this documentation, we support a fixed set of data types. Each type has a defined bit width, and **all types can also be defined as arrays**.  \n")
+    w("Arrays are declared using the notation `Type[N]`, where `N` is the number of elements. For example, `char[10]` represents an array of 10 characters, with each character occupying 8 bits.\n\n")
+
+    w("### Data Types Overview\n\n")
+
+    w("- **int8 / uint8**  \n")
+    w("  8-bit signed and unsigned integers.  \n\n")
+
+    w("- **int16 / uint16**  \n")
+    w("  16-bit signed and unsigned integers.  \n\n")
+
+    w("- **int32 / uint32**  \n")
+    w("  32-bit signed and unsigned integers.  \n\n")
+
+    w("- **int64 / uint64**  \n")
+    w("  64-bit signed and unsigned integers.  \n\n")
+
+    w("- **float32**  \n")
+    w("  32-bit floating point number (commonly referred to as `float`).  \n\n")
+
+    w("- **float64**  \n")
+    w("  64-bit floating point number (similar to `double` in many languages).  \n\n")
+
+    w("- **bool**  \n")
+    w("  Boolean value, represented as 1 bit.  `true` is represented as `1`, and `false` is represented as `0`.  \n\n")
+
+    w("- **char**  \n")
+    w("  8-bit character. See the ASCII table for character representation.  \n\n")
+
+    w("> **Note:**  \n")
+    w("> All the data types listed above can be used as arrays. For example, `int16[5]` is interpreted as an array with 5 elements of type `int16`. The total bit size is calculated by multiplying the bit size of the base type by the number of elements.\n\n")
+
+    w("## Register Allocation\n\n")
+    w("All registers are fixed at 16 bits in length. This means that regardless of the bit width of a data type, the allocation in registers is as follows:\n\n")
+    w("- If a data type occupies less than 16 bits (e.g., a single `char` of 8 bits), it will still use one full 16-bit register. \n")
+    w("- Consequently, `char[1]` and `char[2]` both fit within one register since 1 or 2 characters at 8 bits each do not exceed 16 bits.\n")
+    w("- When the total bit size of a data element (or array element) exceeds 16 bits, additional registers are allocated. For example, `char[3]` (24 bits) will require 2 registers, since one register can only hold 16 bits.\n")
+    w("- For all data types, the number of registers used is determined by dividing the total required bit size by 16 and rounding up to the next whole number.\n")
+
+    w("## Hardware Support Register\n\n")
+    w("All fields provided via Modbus, regardless of their function and type, are holding registers. These are 16-bit read-write registers.\n\n")
+    w("The hardware support registers are the only values written to the coil, which are 1-bit read-write registers. Each register indicates whether a specific function is supported on the hardware.\n\n")
+    w("Functions without a defined hardware support register are supported by all hardware.\n\n")
+    w("> **Note:** Currently, changes written to both holding registers and coils are not evaluated and will be overwritten.\n\n")
+
+    w("## Fields\n\n")
+    for reg in registers.general_registers:
+        w(f"### {reg.name}")
+        if reg.unit is not None:
+            w(f" [{reg.unit}]\n\n")
+        else:
+            w("\n\n")
+        vt = reg.value_type
+        reg_count = vt.registers_required()
+        w(f"| Register | Type           | Size |\n|-|-|-|\n|{reg.address}| `{vt}` | {reg_count} |\n\n")
+        w(f"{reg.description}\n")
+        if reg.hardware_support_register is not None:
+            w(f"iRock may set coil {reg.hardware_support_register} to true if function is supported.\n")
+        w("\n")
+
+    w("### Cells\n\n")
+    start = layout.cell_start_address
+    w(f"The cell fields repeat as many times as there are cells in the corresponding iRock. Cell numbering starts with 1. The starting address for cell 1 is {start}, and the starting address for each subsequent cell is the next available free address. So a Cell Register is calculated as follows:\n\n")
+    w(f"$$Starting Address + Offset + \\left(Last Cell Offset + Last Cell Size\\right) * \\left( Cell Number -1 \\right)$$\n$$={start} + Offset + \\left({layout.last_cell_offset} + {layout.last_cell_size}\\right) * \\left( Cell Number -1 \\right)$$\n$$={start} + Offset + {layout.cell_size} * \\left( Cell Number -1 \\right)$$\n\n")
+
+    for reg in registers.cell_registers:
+        w(f"#### {reg.name}")
+        if reg.unit is not None:
+            w(f" [{reg.unit}]\n\n")
+        else:
+            w("\n\n")
+        vt = reg.value_type
+        reg_count = vt.registers_required()
+        w(f"| Offset | Type           | Size |\n|-|-|-|\n|{reg.address}|`{vt}`|{reg_count}|\n\n")
+        w(f"{reg.description}\n")
+        if reg.hardware_support_register is not None:
+            w(f"iRock may set coil {reg.hardware_support_register} to true if function is supported.\n")
+        w("\n")
+
+    w("_This documentation was automatically generated from the YAML configuration file._\n")
+    return "".join(out)
+
+@staged("render_html")
+def render_html(layout: DocumentLayout) -> str:
+    e = html.escape
+    out: List[str] = []
+    w = out.append
+    title = f"iRock Modbus Registers {layout.version}" if layout.version else "iRock Modbus Registers"
+    w(f"<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n<title>{e(title)}</title>\n</head>\n<body>\n<h1>{e(title)}</h1>\n")
+
+    def table(header: str, rows: List[List[Any]]):
+        w("<table>\n<tr>" + "".join(f"<th>{e(column)}</th>" for column in header.split("|")) + "</tr>\n")
+        for row in rows:
+            w("<tr>" + "".join(f"<td>{e(str(value))}</td>" if value is not None else "<td></td>" for value in row) + "</tr>\n")
+        w("</table>\n")
+
+    w("<h2>Fields</h2>\n")
+    table("Name|Register|Type|Size|Unit|Hardware Support Register|Description", [
+        [reg.name, reg.address, reg.value_type, reg.value_type.registers_required(), reg.unit, reg.hardware_support_register, reg.description]
+        for reg in layout.registers.general_registers
+    ])
+    w("<h2>Cells</h2>\n")
+    w(f"<p>Address of a cell field: {layout.cell_start_address} + Offset + {layout.cell_size} &times; (Cell Number &minus; 1)</p>\n")
+    table("Name|Offset|Type|Size|Unit|Hardware Support Register|Description", [
+        [reg.name, reg.address, reg.value_type, reg.value_type.registers_required(), reg.unit, reg.hardware_support_register, reg.description]
+        for reg in layout.registers.cell_registers
+    ])
+    w("<p><em>This documentation was automatically generated from the YAML configuration file.</em></p>\n</body>\n</html>\n")
+    return "".join(out)
+
+@staged("render_csv")
+def render_csv(layout: DocumentLayout) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(["id", "name", "block", "address", "type", "size", "unit", "hardware_support_register", "description"])
+    for block, regs in (("general", layout.registers.general_registers), ("cell", layout.registers.cell_registers)):
+        for reg in regs:
+            writer.writerow([reg.id, reg.name, block, reg.address, reg.value_type, reg.value_type.registers_required(), reg.unit, reg.hardware_support_register, reg.description])
+    return buffer.getvalue()
+
+@staged("render_json")
+def render_json(layout: DocumentLayout) -> str:
+    general = layout.registers.register_to_dict()
+    cells = layout.registers.cell_register_to_dict()
+    document = {
+        "version": str(general["version"]),
+        "register": general["register"],
+        "cells": {"offset": cells["offset"], "length": cells["length"], "register": cells["register"]},
+    }
+    return json.dumps(document, ensure_ascii=False, indent=2) + "\n"
+
+# Renderers by output format
+RENDERERS: Dict[str, Callable[[DocumentLayout], str]] = {
+    "markdown": render_markdown,
+    "html": render_html,
+    "csv": render_csv,
+    "json": render_json,
+}
+
+def write_if_changed(output_file: str, content: str) -> bool:
+    """
+    Writes the content only if it differs from the current file content.
+
+    :return: True if the file was written.
+    """
+    new_hash = hashlib.sha256(content.encode("utf-8")).digest()
+    try:
+        with open(output_file, "r", encoding="utf-8", newline="") as f:
+            if hashlib.sha256(f.read().encode("utf-8")).digest() == new_hash:
+                return False
+    except (OSError, UnicodeDecodeError):
+        pass
+    with open(output_file, "w", encoding="utf-8", newline="") as f:
+        f.write(content)
+    return True
+
+def generate_documents(registers: RegisterList, outputs: Dict[str, str]) -> Dict[str, bool]:
+    """
+    Builds the layout once and renders it to every requested format.
+
+    :param registers: The register map, e.g. from ``map_cache.load_register_map``.
+    :param outputs: Output file per format (see ``RENDERERS``).
+    :return: For each output file, whether it was written.
+    """
+    layout = DocumentLayout(registers)
+    written = {}
+    for fmt, output_file in outputs.items():
+        written[output_file] = write_if_changed(output_file, RENDERERS[fmt](layout))
+        if written[output_file]:
+            print(f"Documentation generated in '{output_file}'.")
+        else:
+            print(f"Documentation in '{output_file}' is up to date.")
+    return written
 
 def generate_markdown(data, output_file):
-    with open(output_file, 'w', encoding='utf-8') as f:
-        registers = generate_registers(data)
-        f.write("# iRock Modbus Registers")
-        if data.get("version"):
-            f.write(f" {data.get('version')}")
-        f.write("\n\nAll provided fields will be accessible in the Holding Registers. Each field can be split into multiple registers depending on its length. Fields that are not supported by all hardware will additionally write to a coil to indicate whether this function is supported.\n\n")
-        f.write("## Table of Contents\n\n")
-        f.write("- [Versioning](#versioning)\n")
-        f.write("- [Overview](#overview)\n")
-        f.write("- [Supported Data Types](#supported-data-types)\n")
-        f.write("- [Register Allocation](#register-allocation)\n")
-        f.write("- [Hardware Support Register](#hardware-support-register)\n")
-        f.write("- [Fields](#fields)\n")
-        f.write("  - [Cells](#cells)\n")
-        f.write("\n")
-        f.write("## Versioning\n\n")
-        f.write(f"This table version is \"{data.get('version')}\". Future changes to the table will follow semantic versioning:\n\n")
-        f.write("- Patch version (0.0.x): Compatible changes, such as adding new fields or minor adjustments that do not affect existing registers.\n")
-        f.write("- Minor version (0.x.0): Changes that may alter values but keep the same position and length, such as updating default values or improving data types.\n")
-        f.write("- Major version (x.0.0): Comprehensive changes that may alter the position of fields, remove deprecated fields, or introduce breaking changes that require client updates.\n\n")
-        f.write("## Overview\n\n")
-        f.write("| |Register|Type|[Hardware Supported Register](#hardware-support-register)|\n|-|-|-|-|\n")
-        for reg in registers.get_all_registers(3):
-            f.write(f"|[{reg.name}](#{reg.name.lower().replace(' ', '-')})|{reg.address}|{reg.value_type}|{reg.hardware_support_register}|\n")
-        f.write("|...| | | |\n\n")
-        f.write("## Supported Data Types\n\n")
-        f.write("In this documentation, we support a fixed set of data types. Each type has a defined bit width, and **all types can also be defined as arrays**.  \n")
-        f.write("Arrays are declared using the notation `Type[N]`, where `N` is the number of elements. For example, `char[10]` represents an array of 10 characters, with each character occupying 8 bits.\n\n")
-        
-        f.write("### Data Types Overview\n\n")
-        
-        f.write("- **int8 / uint8**  \n")
-        f.write("  8-bit signed and unsigned integers.  \n\n")
-        
-        f.write("- **int16 / uint16**  \n")
-        f.write("  16-bit signed and unsigned integers.  \n\n")
-                    
-        f.write("- **int32 / uint32**  \n")
-        f.write("  32-bit signed and unsigned integers.  \n\n")
-                    
-        f.write("- **int64 / uint64**  \n")
-        f.write("  64-bit signed and unsigned integers.  \n\n")
-        
-        f.write("- **float32**  \n")
-        f.write("  32-bit floating point number (commonly referred to as `float`).  \n\n")
-        
-        f.write("- **float64**  \n")
-        f.write("  64-bit floating point number (similar to `double` in many languages).  \n\n")
-        
-        f.write("- **bool**  \n")
-        f.write("  Boolean value, represented as 1 bit.  `true` is represented as `1`, and `false` is represented as `0`.  \n\n")
-        
-        f.write("- **char**  \n")
-        f.write("  8-bit character. See the ASCII table for character representation.  \n\n")
-        
-        f.write("> **Note:**  \n")
-        f.write("> All the data types listed above can be used as arrays. For example, `int16[5]` is interpreted as an array with 5 elements of type `int16`. The total bit size is calculated by multiplying the bit size of the base type by the number of elements.\n\n")
-        
-        f.write("## Register Allocation\n\n")
-        f.write("All registers are fixed at 16 bits in length. This means that regardless of the bit width of a data type, the allocation in registers is as follows:\n\n")
-        f.write("- If a data type occupies less than 16 bits (e.g., a single `char` of 8 bits), it will still use one full 16-bit register. \n")
-        f.write("- Consequently, `char[1]` and `char[2]` both fit within one register since 1 or 2 characters at 8 bits each do not exceed 16 bits.\n")
-        f.write("- When the total bit size of a data element (or array element) exceeds 16 bits, additional registers are allocated. For example, `char[3]` (24 bits) will require 2 registers, since one register can only hold 16 bits.\n")
-        f.write("- For all data types, the number of registers used is determined by dividing the total required bit size by 16 and rounding up to the next whole number.\n")
-        
-        f.write("## Hardware Support Register\n\n")
-        f.write("All fields provided via Modbus, regardless of their function and type, are holding registers. These are 16-bit read-write registers.\n\n")
-        f.write("The hardware support registers are the only values written to the coil, which are 1-bit read-write registers. Each register indicates whether a specific function is supported on the hardware.\n\n")
-        f.write("Functions without a defined hardware support register are supported by all hardware.\n\n")
-        f.write("> **Note:** Currently, changes written to both holding registers and coils are not evaluated and will be overwritten.\n\n")
-        
-        f.write("## Fields\n\n")
-        for reg in registers.general_registers:
-            f.write(f"### {reg.name}")
-            if reg.unit is not None:
-                f.write(f" [{reg.unit}]\n\n")
-            else:
-                f.write("\n\n")
-            vt = reg.value_type
-            reg_count = reg.value_type.registers_required()
-            f.write(f"| Register | Type           | Size |\n|-|-|-|\n|{reg.address}| `{vt}` | {reg_count} |\n\n")
-            f.write(f"{reg.description}\n")
-            if reg.hardware_support_register is not None:
-                f.write(f"iRock may set coil {reg.hardware_support_register} to true if function is supported.\n")
-            f.write("\n")
-        
-        f.write("### Cells\n\n")
-        last_cell_offset = 0
-        last_cell_size = 0
-        for reg in registers.cell_registers:
-            if reg.address > last_cell_offset:
-                last_cell_offset = reg.address
-                last_cell_size = reg.value_type.registers_required()
-        total_size = last_cell_offset + last_cell_size
-        f.write(f"The cell fields repeat as many times as there are cells in the corresponding iRock. Cell numbering starts with 1. The starting address for cell 1 is {registers.cell_start_address}, and the starting address for each subsequent cell is the next available free address. So a Cell Register is calculated as follows:\n\n")
-        f.write(f"$$Starting Address + Offset + \\left(Last Cell Offset + Last Cell Size\\right) * \\left( Cell Number -1 \\right)$$\n$$={registers.cell_start_address} + Offset + \\left({last_cell_offset} + {last_cell_size}\\right) * \\left( Cell Number -1 \\right)$$\n$$={registers.cell_start_address} + Offset + {last_cell_offset + last_cell_size} * \\left( Cell Number -1 \\right)$$\n\n")
-        
-        for reg in registers.cell_registers:
-            f.write(f"#### {reg.name}")
-            if reg.unit is not None:
-                f.write(f" [{reg.unit}]\n\n")
-            else:
-                f.write("\n\n")
-            vt = reg.value_type
-            reg_count = vt.registers_required()
-            f.write(f"| Offset | Type           | Size |\n|-|-|-|\n|{reg.address}|`{vt}`|{reg_count}|\n\n")
-            f.write(f"{reg.description}\n")
-            if reg.hardware_support_register is not None:
-                f.write(f"iRock may set coil {reg.hardware_support_register} to true if function is supported.\n")
-            f.write("\n")
-        
-        f.write("_This documentation was automatically generated from the YAML configuration file._\n")
-    print(f"Documentation generated in '{output_file}'.")
+    generate_documents(generate_registers(data), {"markdown": output_file})
+
+def watch(yaml_file: str, outputs: Dict[str, str], interval: float = 1.0, schema_file: str = DEFAULT_SCHEMA_FILE, cache_dir: Optional[str] = DEFAULT_CACHE_DIR):
+    """
+    Regenerates the documentation whenever the YAML file changes. Stops on Ctrl+C.
+    """
+    last_state = None
+    while True:
+        try:
+            stat = os.stat(yaml_file)
+            state = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            state = None
+        if state is not None and state != last_state:
+            last_state = state
+            try:
+                generate_documents(load_register_map(yaml_file, schema_file, cache_dir), outputs)
+            except Exception as e:
+                print(f"Could not generate documentation: {e}")
+        time.sleep(interval)
 
 def main():
     parser = argparse.ArgumentParser(description="Generate documentation from YAML configuration file.")
     parser.add_argument("yaml_file", help="Path to the YAML configuration file")
     parser.add_argument("--output", "-o", default="documentation.md", help="Output Markdown file (default: documentation.md)")
+    parser.add_argument("--html", help="Also write an HTML document to this file")
+    parser.add_argument("--csv", help="Also write the register table as CSV to this file")
+    parser.add_argument("--json", help="Also write the register map as JSON to this file")
+    parser.add_argument("--watch", "-w", action="store_true", help="Regenerate whenever the YAML file changes")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between checks in watch mode (default: 1.0)")
+    add_map_arguments(parser)
+    add_profile_arguments(parser)
     args = parser.parse_args()
-    
-    data = load_yaml(args.yaml_file)
-    generate_markdown(data, args.output)
+    check_profile_arguments(parser, args)
+
+    outputs = {"markdown": args.output}
+    for fmt in ("html", "csv", "json"):
+        if getattr(args, fmt):
+            outputs[fmt] = getattr(args, fmt)
+    if args.watch:
+        try:
+            watch(args.yaml_file, outputs, args.interval, args.schema, None if args.no_cache else args.cache_dir)
+        except KeyboardInterrupt:
+            pass
+    else:
+        with profiled(args.profile, args.profile_format):
+            generate_documents(register_map_from_args(args.yaml_file, args), outputs)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from semantic_version import Version
+from typing import Any, Dict, Optional
+from validate_yaml import Coil, Register, RegisterList, ValueType, load_yaml, generate_registers
+
+# Increase when the layout of the cache files changes
+CACHE_FORMAT = 1
+
+DEFAULT_CACHE_DIR = os.environ.get("IROCK_MODBUS_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "irock-modbus"))
+
+DEFAULT_SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.json")
+
+# Cache files kept; the least recently used ones are deleted beyond this
+MAX_CACHE_FILES = 32
+
+# Source files whose content determines how a register map is resolved
+TOOL_SOURCES = [os.path.abspath(__file__), os.path.join(os.path.dirname(os.path.abspath(__file__)), "validate_yaml.py")]
+
+def tool_version() -> str:
+    """
+    Returns a fingerprint of the cache format and of the code resolving the register map.
+    """
+    digest = hashlib.sha256(str(CACHE_FORMAT).encode())
+    for path in TOOL_SOURCES:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def cache_key(data_file: str, schema_file: str) -> str:
+    """
+    Computes the cache key of a register map from the data file, the schema file and the tool version.
+    """
+    digest = hashlib.sha256(tool_version().encode())
+    for path in (data_file, schema_file):
+        with open(path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+def registers_to_dict(registers: RegisterList) -> Dict[str, Any]:
+    """
+    Serializes a resolved register map, with all ``auto`` addresses and coils resolved.
+    """
+    def register_row(reg: Register) -> list:
+        return [reg.id, reg.name, str(reg.value_type), reg.address, reg.unit, reg.hardware_support_register, reg.description]
+
+    return {
+        "format": CACHE_FORMAT,
+        "version": str(registers.version) if registers.version is not None else None,
+        "cell_start_address": registers.cell_start_address,
+        "general": [register_row(reg) for reg in registers.general_registers],
+        "cells": [register_row(reg) for reg in registers.cell_registers],
+        "coils": [[coil.parent_address, coil.address] for coil in registers.coils],
+    }
+
+def registers_from_dict(data: Dict[str, Any]) -> RegisterList:
+    """
+    Restores a register map serialized with ``registers_to_dict``.
+    """
+    if data.get("format") != CACHE_FORMAT:
+        raise ValueError(f"Unsupported cache format: {data.get('format')}")
+
+    def register(row: list) -> Register:
+        id, name, value_type, address, unit, coil, description = row
+        return Register(id, name, ValueType.from_str(value_type), address, unit, coil, description)
+
+    registers = RegisterList()
+    registers.version = Version(data["version"]) if data["version"] is not None else None
+    registers.cell_start_address = data["cell_start_address"]
+    registers.general_registers = [register(row) for row in data["general"]]
+    registers.cell_registers = [register(row) for row in data["cells"]]
+    registers.coils = [Coil(parent_address, address) for parent_address, address in data["coils"]]
+    return registers
+
+def build_register_map(data_file: str, schema_file: str) -> RegisterList:
+    """
+    Loads, validates and resolves a register map without using the cache.
+
+    :raises jsonschema.ValidationError: If the data does not match the schema.
+    :raises ValueError: If register addresses overlap.
+    """
+    import jsonschema
+    schema = load_yaml(schema_file)
+    data = load_yaml(data_file)
+    jsonschema.validate(instance=data, schema=schema)
+    registers = generate_registers(data)
+    conflicts = registers.find_address_overlaps()
+    if conflicts:
+        raise ValueError("\n".join(conflicts))
+    return registers
+
+def cache_path(data_file: str, schema_file: str, cache_dir: str) -> str:
+    """Returns the path of the cache file of a data file and schema."""
+    return os.path.join(cache_dir, cache_key(data_file, schema_file) + ".json")
+
+def read_cached_map(path: str) -> Optional[RegisterList]:
+    """
+    Returns the register map stored in a cache file, or None if it is missing or unreadable.
+
+    Only maps that passed validation are stored, so a hit needs no further validation.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            registers = registers_from_dict(json.load(f))
+        # Mark the file as recently used for prune_cache
+        os.utime(path)
+        return registers
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def write_cached_map(path: str, registers: RegisterList):
+    """
+    Stores a validated register map in a cache file and prunes the cache directory.
+
+    Failures are reported on stderr but not raised, as the cache is optional.
+    """
+    cache_dir = os.path.dirname(path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write to a temporary file first so concurrent readers never see a partial cache file
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(registers_to_dict(registers), f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        prune_cache(cache_dir)
+    except OSError as e:
+        print(f"Could not write register map cache: {e}", file=sys.stderr)
+
+def load_register_map(data_file: str, schema_file: str, cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> RegisterList:
+    """
+    Returns the validated register map of a data file, using the cache when possible.
+
+    On a cache miss the map is loaded, validated and resolved, then stored in the cache.
+    Only maps that passed validation are cached.
+
+    :param data_file: Path to the YAML data file.
+    :param schema_file: Path to the JSON schema.
+    :param cache_dir: Directory of the cache files, or None to disable the cache.
+    :return: The resolved register map.
+    """
+    if cache_dir is None:
+        return build_register_map(data_file, schema_file)
+    path = cache_path(data_file, schema_file, cache_dir)
+    registers = read_cached_map(path)
+    if registers is None:
+        registers = build_register_map(data_file, schema_file)
+        write_cached_map(path, registers)
+    return registers
+
+def prune_cache(cache_dir: str, keep: int = MAX_CACHE_FILES):
+    """
+    Deletes the least recently used cache files beyond ``keep``.
+
+    Every change of a data file, the schema or the tool adds a cache file, so old ones are removed here.
+    """
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.endswith(".json"):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass
+    entries.sort(reverse=True)
+    for _, path in entries[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def add_map_arguments(parser):
+    """Adds the ``--schema``, ``--cache-dir`` and ``--no-cache`` options used by ``register_map_from_args``."""
+    parser.add_argument("--schema", default=DEFAULT_SCHEMA_FILE, help="Path to the JSON schema (default: schema.json next to the tools)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help=f"Compiled-map cache directory (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--no-cache", action="store_true", help="Always load and validate the YAML file")
+
+def register_map_from_args(data_file: str, args) -> RegisterList:
+    """
+    Loads the validated register map for a command line tool, exiting with a message if it is invalid.
+    """
+    try:
+        return load_register_map(data_file, args.schema, None if args.no_cache else args.cache_dir)
+    except OSError as e:
+        sys.exit(f"Could not load register map: {e}")
+    except ValueError as e:
+        sys.exit(f"Invalid register map '{data_file}':\n{e}")
+    except Exception as e:
+        import jsonschema
+        if not isinstance(e, jsonschema.ValidationError):
+            raise
+        sys.exit(f"Invalid register map '{data_file}':\n{e.message}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate a register map and store it in the compiled-map cache.")
+    parser.add_argument("schema_file", help="Path to the JSON schema")
+    parser.add_argument("yaml_file", help="Path to the YAML configuration file")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help=f"Cache directory (default: {DEFAULT_CACHE_DIR})")
+    args = parser.parse_args()
+
+    import jsonschema
+    try:
+        registers = load_register_map(args.yaml_file, args.schema_file, args.cache_dir)
+    except (jsonschema.ValidationError, ValueError) as e:
+        print("Validation failed:")
+        print(e)
+        sys.exit(1)
+    print(f"Register map {registers.version} cached as {cache_key(args.yaml_file, args.schema_file)}.")
+
+if __name__ == "__main__":
+    main()
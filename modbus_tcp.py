@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+import asyncio
+import struct
+from typing import Optional, Tuple
+
+READ_COILS = 0x01
+READ_HOLDING_REGISTERS = 0x03
+
+# Exception codes
+ILLEGAL_FUNCTION = 0x01
+ILLEGAL_DATA_ADDRESS = 0x02
+ILLEGAL_DATA_VALUE = 0x03
+
+# Maximum number of coils a single Read Coils (0x01) request may return.
+MAX_READ_COILS = 2000
+
+# MBAP header: transaction id, protocol id, length (unit id + PDU), unit id
+MBAP_HEADER = struct.Struct(">HHHB")
+READ_REQUEST = struct.Struct(">BHH")
+
+class ModbusError(Exception):
+    """Raised when a device answers with a Modbus exception response."""
+    def __init__(self, function_code: int, exception_code: int):
+        super().__init__(f"Modbus exception {exception_code} for function {function_code:#04x}")
+        self.function_code: int = function_code
+        self.exception_code: int = exception_code
+
+def build_frame(transaction_id: int, unit_id: int, pdu: bytes) -> bytes:
+    """
+    Builds a Modbus TCP frame.
+
+    :param transaction_id: The transaction identifier echoed by the peer.
+    :param unit_id: The unit identifier (slave address behind a gateway).
+    :param pdu: The protocol data unit (function code and data).
+    :return: The frame including the MBAP header.
+    """
+    return MBAP_HEADER.pack(transaction_id, 0, len(pdu) + 1, unit_id) + pdu
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[int, int, bytes]:
+    """
+    Reads one Modbus TCP frame from a stream.
+
+    :param reader: The stream to read from.
+    :return: The transaction id, the unit id and the PDU.
+    """
+    header = await reader.readexactly(MBAP_HEADER.size)
+    transaction_id, protocol_id, length, unit_id = MBAP_HEADER.unpack(header)
+    if protocol_id != 0 or length < 2:
+        raise ConnectionError(f"Invalid MBAP header: protocol {protocol_id}, length {length}")
+    pdu = await reader.readexactly(length - 1)
+    return transaction_id, unit_id, pdu
+
+class ModbusTcpClient:
+    """
+    A minimal asyncio Modbus TCP client holding one persistent connection.
+
+    Requests on the same client are serialized; use several clients for concurrent requests.
+    The connection is re-established on the next request after any error.
+    """
+    def __init__(self, host: str, port: int = 502, timeout: float = 3.0):
+        """
+        :param host: Host name or IP address of the device or gateway.
+        :param port: TCP port (default 502).
+        :param timeout: Timeout in seconds for connecting and for each request.
+        """
+        self.host: str = host
+        self.port: int = port
+        self.timeout: float = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+        self._transaction_id = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self):
+        if not self.connected:
+            self._reader, self._writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+
+    async def close(self):
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    async def request(self, unit_id: int, pdu: bytes) -> bytes:
+        """
+        Sends a request and waits for the matching response.
+
+        :param unit_id: The unit identifier.
+        :param pdu: The request PDU.
+        :return: The response PDU.
+        """
+        async with self._lock:
+            try:
+                await self.connect()
+                self._transaction_id = (self._transaction_id + 1) & 0xFFFF
+                self._writer.write(build_frame(self._transaction_id, unit_id, pdu))
+                await self._writer.drain()
+                while True:
+                    transaction_id, _, response = await asyncio.wait_for(read_frame(self._reader), self.timeout)
+                    if transaction_id == self._transaction_id:
+                        break
+            except BaseException:
+                await self.close()
+                raise
+        if response[0] & 0x80:
+            raise ModbusError(response[0] & 0x7F, response[1] if len(response) > 1 else 0)
+        if response[0] != pdu[0]:
+            raise ConnectionError(f"Unexpected function code {response[0]:#04x} in response")
+        return response
+
+    async def read_holding_registers(self, address: int, count: int, unit_id: int = 1) -> bytes:
+        """
+        Reads holding registers.
+
+        :param address: The first register address.
+        :param count: The number of registers.
+        :param unit_id: The unit identifier.
+        :return: The register values as big-endian bytes.
+        """
+        response = await self.request(unit_id, READ_REQUEST.pack(READ_HOLDING_REGISTERS, address, count))
+        if len(response) < 2 or response[1] != 2 * count or len(response) != 2 + 2 * count:
+            raise ConnectionError(f"Expected {count} registers, got {len(response) - 2} bytes")
+        return response[2:]
+
+    async def read_coils(self, address: int, count: int, unit_id: int = 1) -> bytes:
+        """
+        Reads coils.
+
+        :param address: The first coil address.
+        :param count: The number of coils.
+        :param unit_id: The unit identifier.
+        :return: The coil states packed eight per byte, least significant bit first.
+        """
+        response = await self.request(unit_id, READ_REQUEST.pack(READ_COILS, address, count))
+        length = (count + 7) // 8
+        if len(response) < 2 or response[1] != length or len(response) != 2 + length:
+            raise ConnectionError(f"Expected {length} coil bytes, got {len(response) - 2}")
+        return response[2:]
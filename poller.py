@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from capabilities import Capabilities, read_capabilities
+from decoder import RegisterDecoder, json_safe
+from modbus_tcp import ILLEGAL_FUNCTION, ModbusError, ModbusTcpClient
+from read_plan import ReadRequest, plan_reads, register_spans
+from map_cache import add_map_arguments, register_map_from_args
+from validate_yaml import RegisterList
+
+class Device:
+    """An iRock unit reachable over Modbus TCP, directly or behind a gateway."""
+    def __init__(self, name: str, host: str, port: int = 502, unit_id: int = 1, number_of_cells: int = 16):
+        self.name: str = name
+        self.host: str = host
+        self.port: int = port
+        self.unit_id: int = unit_id
+        self.number_of_cells: int = number_of_cells
+
+    @property
+    def gateway(self) -> Tuple[str, int]:
+        return (self.host, self.port)
+
+    def __repr__(self) -> str:
+        return f"Device({self.name!r}, {self.host}:{self.port}, unit={self.unit_id})"
+
+class Sample:
+    """The decoded register values of one device at one point in time."""
+    def __init__(self, device: Device, timestamp: float, values: Dict[str, Any], duration: float = 0.0, error: Optional[Exception] = None):
+        """
+        :param device: The polled device.
+        :param timestamp: Unix time at the start of the poll.
+        :param values: The decoded values. Cell registers map to a list, index 0 being cell 1.
+        :param duration: Time in seconds the poll took.
+        :param error: The error that made the poll fail, if any. ``values`` is empty in that case.
+        """
+        self.device: Device = device
+        self.timestamp: float = timestamp
+        self.values: Dict[str, Any] = values
+        self.duration: float = duration
+        self.error: Optional[Exception] = error
+
+class GatewayPool:
+    """
+    A pool of persistent connections to one gateway.
+
+    The pool size limits the number of concurrent requests to the gateway.
+    """
+    def __init__(self, host: str, port: int = 502, size: int = 1, timeout: float = 3.0):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.host: str = host
+        self.port: int = port
+        self._clients: List[ModbusTcpClient] = [ModbusTcpClient(host, port, timeout) for _ in range(size)]
+        self._idle: asyncio.Queue = asyncio.Queue()
+        for client in self._clients:
+            self._idle.put_nowait(client)
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[ModbusTcpClient]:
+        client = await self._idle.get()
+        try:
+            yield client
+        finally:
+            self._idle.put_nowait(client)
+
+    async def close(self):
+        for client in self._clients:
+            await client.close()
+
+class Poller:
+    """
+    Polls the register map of many devices concurrently and yields decoded samples.
+
+    Reads are planned once per cell count and register selection with ``plan_reads`` and
+    decoded with a precompiled ``RegisterDecoder``. With ``probe_capabilities`` the hardware
+    support coils of each device are read once, and fields the device does not support are
+    neither requested nor decoded.
+    """
+    def __init__(self, registers: RegisterList, devices: Iterable[Device], interval: float = 1.0, connections_per_gateway: int = 1, max_gap: int = 0, timeout: float = 3.0, register_ids: Optional[Iterable[str]] = None, probe_capabilities: bool = False):
+        """
+        :param registers: The register map created by ``generate_registers``.
+        :param devices: The devices to poll.
+        :param interval: Poll interval in seconds per device.
+        :param connections_per_gateway: Number of connections, and thus concurrent requests, per gateway.
+        :param max_gap: Number of unused registers that may be read to join two fields.
+        :param timeout: Timeout in seconds per request.
+        :param register_ids: Optional subset of general and cell register ids (without cell number) to poll.
+        :param probe_capabilities: Read the hardware support coils of each device and skip unsupported fields.
+        """
+        if interval <= 0:
+            raise ValueError("Interval must be positive")
+        self.registers: RegisterList = registers
+        self.devices: List[Device] = list(devices)
+        self.interval: float = interval
+        self.connections_per_gateway: int = connections_per_gateway
+        self.max_gap: int = max_gap
+        self.timeout: float = timeout
+        self.register_ids: Optional[List[str]] = list(register_ids) if register_ids is not None else None
+        if self.register_ids is not None:
+            # Raises ValueError for unknown ids and cell numbers beyond a device's cells
+            for number_of_cells in {device.number_of_cells for device in self.devices}:
+                register_spans(registers, number_of_cells, self.register_ids)
+        self.probe_capabilities: bool = probe_capabilities
+        self.capabilities: Dict[str, Capabilities] = {}
+        self._decoders: Dict[Optional[FrozenSet[str]], Tuple[RegisterDecoder, Dict[str, Set[int]]]] = {}
+        self.decoder: RegisterDecoder = self._decoder(None)[0]
+        self._plans: Dict[Tuple[int, Optional[FrozenSet[str]]], Tuple[List[ReadRequest], int, RegisterDecoder]] = {}
+        self._pools: Dict[Tuple[str, int], GatewayPool] = {}
+
+    def pool(self, device: Device) -> GatewayPool:
+        pool = self._pools.get(device.gateway)
+        if pool is None:
+            pool = GatewayPool(device.host, device.port, self.connections_per_gateway, self.timeout)
+            self._pools[device.gateway] = pool
+        return pool
+
+    def _decoder(self, key: Optional[FrozenSet[str]]) -> Tuple[RegisterDecoder, Dict[str, Set[int]]]:
+        """
+        Returns the decoder for a register selection and the selected cells of cell registers given with cell number.
+        """
+        entry = self._decoders.get(key)
+        if entry is None:
+            register_ids = key if key is not None else self.register_ids
+            decode_ids: Optional[Set[str]] = None
+            cells: Dict[str, Set[int]] = {}
+            if register_ids is not None:
+                cell_ids = {reg.id for reg in self.registers.cell_registers}
+                decode_ids = set()
+                for id in register_ids:
+                    base, _, number = id.rpartition("_")
+                    if id not in cell_ids and base in cell_ids and number.isdigit():
+                        decode_ids.add(base)
+                        cells.setdefault(base, set()).add(int(number))
+                    else:
+                        decode_ids.add(id)
+                # A cell register without cell number selects all cells
+                for id in decode_ids & cell_ids:
+                    if id in register_ids:
+                        cells.pop(id, None)
+            entry = (RegisterDecoder(self.registers, decode_ids), cells)
+            self._decoders[key] = entry
+        return entry
+
+    def plan(self, number_of_cells: int, register_ids: Optional[Iterable[str]] = None) -> Tuple[List[ReadRequest], int, RegisterDecoder]:
+        """
+        Returns the read requests, the register image size and the decoder for a cell count.
+
+        :param number_of_cells: The number of cells of the device.
+        :param register_ids: The register ids to poll. Defaults to the ids given to the poller.
+        """
+        key = frozenset(register_ids) if register_ids is not None else None
+        plan = self._plans.get((number_of_cells, key))
+        if plan is None:
+            decoder = self._decoder(key)[0]
+            requests = plan_reads(self.registers, number_of_cells, key if key is not None else self.register_ids, self.max_gap)
+            size = max([decoder.image_size(number_of_cells)] + [r.end for r in requests])
+            plan = (requests, size, decoder)
+            self._plans[(number_of_cells, key)] = plan
+        return plan
+
+    async def device_capabilities(self, device: Device) -> Capabilities:
+        """
+        Returns the capabilities of a device, reading its hardware support coils on first use.
+
+        Devices that do not implement Read Coils are assumed to support every field.
+        """
+        capabilities = self.capabilities.get(device.name)
+        if capabilities is None:
+            try:
+                async with self.pool(device).connection() as client:
+                    capabilities = await read_capabilities(client, self.registers, device.unit_id)
+            except ModbusError as e:
+                if e.exception_code != ILLEGAL_FUNCTION:
+                    raise
+                capabilities = Capabilities.all_supported(self.registers)
+            self.capabilities[device.name] = capabilities
+        return capabilities
+
+    async def poll_device(self, device: Device) -> Sample:
+        """
+        Reads and decodes the register map of one device once.
+
+        :param device: The device to poll.
+        :return: The decoded sample, or a sample carrying the error.
+        """
+        timestamp = time.time()
+        start = time.perf_counter()
+        pool = self.pool(device)
+        register_ids = None
+        if self.probe_capabilities:
+            try:
+                capabilities = await self.device_capabilities(device)
+            except (OSError, EOFError, asyncio.TimeoutError, ModbusError) as e:
+                return Sample(device, timestamp, {}, time.perf_counter() - start, e)
+            register_ids = capabilities.supported_register_ids(self.register_ids)
+        requests, size, decoder = self.plan(device.number_of_cells, register_ids)
+        cells = self._decoder(frozenset(register_ids) if register_ids is not None else None)[1]
+        image = bytearray(2 * size)
+
+        async def fetch(request: ReadRequest):
+            async with pool.connection() as client:
+                data = await client.read_holding_registers(request.address, request.count, device.unit_id)
+            image[2 * request.address:2 * request.end] = data
+
+        fetches = [asyncio.ensure_future(fetch(request)) for request in requests]
+        try:
+            await asyncio.gather(*fetches)
+            values = decoder.decode(image, device.number_of_cells)
+            for id, numbers in cells.items():
+                # Cells that were not read are None
+                values[id] = [value if i in numbers else None for i, value in enumerate(values[id], 1)]
+        except (OSError, EOFError, asyncio.TimeoutError, ModbusError, ValueError) as e:
+            return Sample(device, timestamp, {}, time.perf_counter() - start, e)
+        finally:
+            # Stop the other reads of a failed poll and collect their errors
+            for fetch_task in fetches:
+                fetch_task.cancel()
+            await asyncio.gather(*fetches, return_exceptions=True)
+        return Sample(device, timestamp, values, time.perf_counter() - start)
+
+    async def _poll_forever(self, device: Device, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        next_poll = loop.time()
+        while True:
+            start = time.perf_counter()
+            try:
+                sample = await self.poll_device(device)
+            except Exception as e:
+                # Keep polling the device; the error is reported like a failed read
+                sample = Sample(device, time.time(), {}, time.perf_counter() - start, e)
+            await queue.put(sample)
+            next_poll += self.interval
+            now = loop.time()
+            if next_poll < now:
+                # Skip missed cycles instead of bursting to catch up
+                next_poll += (now - next_poll) // self.interval * self.interval + self.interval
+            await asyncio.sleep(next_poll - now)
+
+    async def samples(self) -> AsyncIterator[Sample]:
+        """
+        Polls all devices on their schedule and yields the samples as they arrive.
+
+        Raises the exception of a poll task that died, instead of waiting for its samples forever.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(len(self.devices), 1) * 4)
+        tasks = [asyncio.create_task(self._poll_forever(device, queue)) for device in self.devices]
+        failures: List[asyncio.Task] = []
+
+        def task_done(task: asyncio.Task):
+            if not task.cancelled() and task.exception() is not None:
+                # Queued behind the pending samples; the consumer raises it
+                failures.append(asyncio.ensure_future(queue.put(task)))
+
+        for task in tasks:
+            task.add_done_callback(task_done)
+        try:
+            while True:
+                item = await queue.get()
+                if isinstance(item, asyncio.Task):
+                    raise item.exception()
+                yield item
+        finally:
+            for task in tasks + failures:
+                task.cancel()
+            await asyncio.gather(*tasks, *failures, return_exceptions=True)
+
+    async def close(self):
+        for pool in self._pools.values():
+            await pool.close()
+        self._pools.clear()
+
+def parse_device(spec: str) -> Device:
+    """
+    Parses a device specification of the form ``host[:port][/unit_id][@cells]``.
+    """
+    cells = 16
+    if "@" in spec:
+        spec, cells_str = spec.rsplit("@", 1)
+        cells = int(cells_str)
+    unit_id = 1
+    if "/" in spec:
+        spec, unit_str = spec.rsplit("/", 1)
+        unit_id = int(unit_str)
+    host, _, port_str = spec.partition(":")
+    port = int(port_str) if port_str else 502
+    return Device(f"{host}:{port}/{unit_id}", host, port, unit_id, cells)
+
+async def run(registers: RegisterList, devices: List[Device], args):
+    poller = Poller(registers, devices, args.interval, args.connections, args.gap, args.timeout, probe_capabilities=args.probe_capabilities)
+    samples = poller.samples()
+    if args.record:
+        from recorder import record
+        samples = record(samples, args.record, registers, args.record_capacity)
+    if args.deadband or args.unit_deadband or args.changes_only:
+        # Imported here as subscription builds on this module
+        from subscription import ChangeFilter, parse_deadband, subscribe
+        change_filter = ChangeFilter(registers, dict(map(parse_deadband, args.deadband)), dict(map(parse_deadband, args.unit_deadband)))
+        samples = subscribe(samples, change_filter)
+    count = 0
+    try:
+        async for sample in samples:
+            line = {"device": sample.device.name, "timestamp": sample.timestamp, "duration": sample.duration}
+            if sample.error is not None:
+                line["error"] = str(sample.error) or type(sample.error).__name__
+            else:
+                # Invalid float readings are NaN, which is not valid JSON
+                line["values"] = json_safe(sample.values)
+            print(json.dumps(line, allow_nan=False))
+            count += 1
+            if args.count and count >= args.count:
+                break
+    finally:
+        await poller.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Poll iRock units over Modbus TCP and print decoded samples as JSON lines.")
+    parser.add_argument("yaml_file", help="Path to the YAML configuration file")
+    parser.add_argument("devices", nargs="+", help="Devices as host[:port][/unit_id][@cells]")
+    parser.add_argument("--interval", "-i", type=float, default=1.0, help="Poll interval in seconds (default: 1.0)")
+    parser.add_argument("--connections", type=int, default=1, help="Connections per gateway (default: 1)")
+    parser.add_argument("--gap", "-g", type=int, default=0, help="Unused registers that may be read to join two fields (default: 0)")
+    parser.add_argument("--timeout", type=float, default=3.0, help="Request timeout in seconds (default: 3.0)")
+    parser.add_argument("--probe-capabilities", action="store_true", help="Skip fields the hardware support coils mark as unsupported")
+    parser.add_argument("--changes-only", action="store_true", help="Only print values that changed")
+    parser.add_argument("--deadband", action="append", default=[], help="Deadband as REGISTER_ID=VALUE, implies --changes-only (may be repeated)")
+    parser.add_argument("--unit-deadband", action="append", default=[], help="Deadband as UNIT=VALUE, implies --changes-only (may be repeated)")
+    parser.add_argument("--record", metavar="DIR", help="Record all samples into memory-mapped ring buffers in this directory")
+    parser.add_argument("--record-capacity", type=int, default=86400, help="Samples kept per device when recording (default: 86400)")
+    parser.add_argument("--count", "-n", type=int, default=0, help="Stop after this many samples (default: run forever)")
+    add_map_arguments(parser)
+    args = parser.parse_args()
+    if args.interval <= 0:
+        parser.error("--interval must be positive")
+
+    registers = register_map_from_args(args.yaml_file, args)
+    devices = [parse_device(spec) for spec in args.devices]
+    try:
+        asyncio.run(run(registers, devices, args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
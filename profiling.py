@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+import cProfile
+import functools
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+class StageResult:
+    """Wall time, memory and object counts of one run of a pipeline stage."""
+    def __init__(self, name: str, wall_time: float, peak_memory: Optional[int] = None, memory_delta: Optional[int] = None, objects_delta: Optional[int] = None, error: Optional[str] = None):
+        """
+        :param name: The stage name, e.g. ``load_yaml``.
+        :param wall_time: Wall time in seconds.
+        :param peak_memory: Peak traced memory in bytes during the stage above the memory at its start, if tracemalloc is tracing.
+        :param memory_delta: Change of traced memory in bytes, if tracemalloc is tracing.
+        :param objects_delta: Change of the number of GC-tracked objects, if object counting is enabled.
+        :param error: The name of the exception that ended the stage, if any.
+        """
+        self.name: str = name
+        self.wall_time: float = wall_time
+        self.peak_memory: Optional[int] = peak_memory
+        self.memory_delta: Optional[int] = memory_delta
+        self.objects_delta: Optional[int] = objects_delta
+        self.error: Optional[str] = error
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "wall_time": self.wall_time,
+            "peak_memory": self.peak_memory,
+            "memory_delta": self.memory_delta,
+            "objects_delta": self.objects_delta,
+            "error": self.error,
+        }
+
+Hook = Callable[[StageResult], None]
+
+# Registered hooks and whether they want object counts
+_hooks: List[Tuple[Hook, bool]] = []
+_count_objects: bool = False
+# Peak memory seen by each enclosing stage before a nested stage reset the peak
+_peak_stack: List[int] = []
+
+def add_hook(hook: Hook, count_objects: bool = False):
+    """
+    Registers a function called with a StageResult after each stage.
+
+    Memory is reported while tracemalloc is tracing. Counting objects walks the whole
+    heap twice per stage, so it is only done if a hook asks for it.
+    """
+    global _count_objects
+    _hooks.append((hook, count_objects))
+    _count_objects = any(count for _, count in _hooks)
+
+def remove_hook(hook: Hook):
+    global _count_objects
+    _hooks[:] = [(h, count) for h, count in _hooks if h != hook]
+    _count_objects = any(count for _, count in _hooks)
+
+class stage:
+    """
+    Measures a pipeline stage and reports it to the registered hooks.
+
+    Does nothing but a list check while no hook is registered.
+
+        with stage("load_yaml"):
+            data = load_yaml(path)
+    """
+    __slots__ = ("name", "_start", "_memory", "_objects")
+
+    def __init__(self, name: str):
+        self.name: str = name
+        self._start: Optional[float] = None
+
+    def __enter__(self) -> "stage":
+        if not _hooks:
+            return self
+        self._objects = len(gc.get_objects()) if _count_objects else None
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if _peak_stack:
+                _peak_stack[-1] = max(_peak_stack[-1], peak)
+            _peak_stack.append(0)
+            tracemalloc.reset_peak()
+            self._memory = current
+        else:
+            self._memory = None
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._start is None:
+            return
+        wall_time = time.perf_counter() - self._start
+        self._start = None
+        peak_memory = memory_delta = objects_delta = None
+        if self._memory is not None:
+            nested_peak = _peak_stack.pop()
+            if tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                peak_memory = max(peak, nested_peak) - self._memory
+                memory_delta = current - self._memory
+        if self._objects is not None:
+            objects_delta = len(gc.get_objects()) - self._objects
+        result = StageResult(self.name, wall_time, peak_memory, memory_delta, objects_delta, exc_type.__name__ if exc_type is not None else None)
+        for hook, _ in list(_hooks):
+            hook(result)
+
+def staged(name: str) -> Callable[[Callable], Callable]:
+    """Decorator running a function as a stage."""
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _hooks:
+                return function(*args, **kwargs)
+            with stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class StageRecorder:
+    """
+    Collects the results of all stages while it is active, e.g. for a JSON report.
+    """
+    def __init__(self, memory: bool = True, objects: bool = True):
+        """
+        :param memory: Trace memory with tracemalloc while active. Slows the stages down noticeably.
+        :param objects: Count GC-tracked objects before and after each stage.
+        """
+        self.memory: bool = memory
+        self.objects: bool = objects
+        self.results: List[StageResult] = []
+        self._started_tracing: bool = False
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        add_hook(self.results.append, self.objects)
+
+    def stop(self):
+        remove_hook(self.results.append)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def totals(self) -> Dict[str, float]:
+        """Returns the summed wall time per stage name."""
+        totals: Dict[str, float] = {}
+        for result in self.results:
+            totals[result.name] = totals.get(result.name, 0.0) + result.wall_time
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"stages": [result.to_dict() for result in self.results], "totals": self.totals()}
+
+    def write(self, output_file: str):
+        """Writes the JSON report to a file, '-' for stderr."""
+        if output_file == "-":
+            json.dump(self.to_dict(), sys.stderr, indent=2)
+            print(file=sys.stderr)
+        else:
+            with open(output_file, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, indent=2)
+
+    def __enter__(self) -> "StageRecorder":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def add_profile_arguments(parser):
+    """Adds the ``--profile`` and ``--profile-format`` options to a command line parser."""
+    parser.add_argument("--profile", metavar="FILE", help="Write a profile of the run to this file ('-' for stderr, JSON only)")
+    parser.add_argument("--profile-format", choices=["json", "cprofile"], default="json", help="JSON stage report with wall time, peak memory and object counts, or a cProfile dump for pstats/snakeviz (default: json)")
+
+def check_profile_arguments(parser, args):
+    """Rejects option combinations ``profiled`` cannot write."""
+    if args.profile == "-" and args.profile_format == "cprofile":
+        parser.error("--profile-format cprofile needs an output file, not '-'")
+
+class profiled:
+    """
+    Profiles a command line run according to ``--profile`` and ``--profile-format``.
+
+    The profile is written when the block ends, also on ``sys.exit``.
+    """
+    def __init__(self, output_file: Optional[str], fmt: str = "json"):
+        self.output_file: Optional[str] = output_file
+        self.fmt: str = fmt
+        self._profiler: Optional[cProfile.Profile] = None
+        self._recorder: Optional[StageRecorder] = None
+
+    def __enter__(self) -> "profiled":
+        if self.output_file is None:
+            return self
+        if self.fmt == "cprofile":
+            if self.output_file == "-":
+                raise ValueError("A cProfile dump needs an output file")
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._recorder = StageRecorder()
+            self._recorder.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.output_file)
+        if self._recorder is not None:
+            self._recorder.stop()
+            self._recorder.write(self.output_file)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+import argparse
+from typing import Iterable, List, Optional, Tuple
+from map_cache import add_map_arguments, register_map_from_args
+from validate_yaml import RegisterList
+
+# Maximum number of registers a single Read Holding Registers (0x03) request may return.
+MAX_READ_REGISTERS = 125
+
+class ReadRequest:
+    """
+    A single Read Holding Registers request covering one or more fields.
+    """
+    def __init__(self, address: int, count: int, register_ids: List[str]):
+        """
+        :param address: The first register address to read.
+        :param count: The number of registers to read.
+        :param register_ids: The ids of the fields (with cell number for cell fields) covered by this request.
+        """
+        self.address: int = address
+        self.count: int = count
+        self.register_ids: List[str] = register_ids
+
+    @property
+    def end(self) -> int:
+        """The address following the last register of this request."""
+        return self.address + self.count
+
+    def __repr__(self) -> str:
+        return f"ReadRequest(address={self.address}, count={self.count}, registers={len(self.register_ids)})"
+
+def register_spans(registers: RegisterList, number_of_cells: int, register_ids: Optional[Iterable[str]] = None) -> List[Tuple[int, int, str]]:
+    """
+    Lists the address spans of the selected fields, sorted by address.
+
+    Register ids may name general registers, cell registers without cell number (all cells)
+    or cell registers with cell number (e.g. ``Cell_Voltage_17``).
+
+    :param registers: The register map.
+    :param number_of_cells: The number of cells of the device.
+    :param register_ids: Optional subset of register ids. Defaults to all registers.
+    :return: A list of (address, size, id) tuples.
+    """
+    cell_start_address = registers.effective_cell_start_address()
+    cell_size = registers.get_cell_registers_size()
+    selected_general = None
+    selected_cells = None
+    if register_ids is not None:
+        general_ids = {reg.id for reg in registers.general_registers}
+        cell_ids = {reg.id for reg in registers.cell_registers}
+        selected_general = set()
+        selected_cells = set()
+        for id in register_ids:
+            if id in general_ids:
+                selected_general.add(id)
+            elif id in cell_ids:
+                selected_cells.update((id, i) for i in range(1, number_of_cells + 1))
+            else:
+                base, _, number = id.rpartition("_")
+                if base in cell_ids and number.isdigit() and 1 <= int(number) <= number_of_cells:
+                    selected_cells.add((base, int(number)))
+                else:
+                    raise ValueError(f"Unknown register id: {id}")
+    spans = []
+    for reg in registers.general_registers:
+        if selected_general is None or reg.id in selected_general:
+            spans.append((reg.address, reg.value_type.registers_required(), reg.id))
+    for i in range(1, number_of_cells + 1):
+        base_address = cell_start_address + (i - 1) * cell_size
+        for reg in registers.cell_registers:
+            if selected_cells is None or (reg.id, i) in selected_cells:
+                spans.append((base_address + reg.address, reg.value_type.registers_required(), f"{reg.id}_{i}"))
+    spans.sort()
+    return spans
+
+def plan_reads(registers: RegisterList, number_of_cells: int, register_ids: Optional[Iterable[str]] = None, max_gap: int = 0, max_count: int = MAX_READ_REGISTERS) -> List[ReadRequest]:
+    """
+    Merges the selected fields into the fewest Read Holding Registers requests.
+
+    Neighbouring fields are combined into one request as long as the unused addresses between
+    them do not exceed ``max_gap`` and the request does not exceed ``max_count`` registers.
+    Fields larger than ``max_count`` are split across several requests.
+
+    :param registers: The register map.
+    :param number_of_cells: The number of cells of the device.
+    :param register_ids: Optional subset of register ids, see ``register_spans``.
+    :param max_gap: Number of unused registers that may be read to join two fields.
+    :param max_count: Maximum number of registers per request (125 per the Modbus specification).
+    :return: The read requests, sorted by address.
+    """
+    if not 1 <= max_count <= MAX_READ_REGISTERS:
+        raise ValueError(f"max_count must be between 1 and {MAX_READ_REGISTERS}")
+    if max_gap < 0:
+        raise ValueError("max_gap must not be negative")
+    requests: List[ReadRequest] = []
+    current: Optional[ReadRequest] = None
+    for address, size, id in register_spans(registers, number_of_cells, register_ids):
+        end = address + size
+        if current is not None and address - current.end <= max_gap and end - current.address <= max_count:
+            current.count = max(current.end, end) - current.address
+            current.register_ids.append(id)
+            continue
+        if current is not None and address < current.end:
+            # Overlapping field that does not fit: continue after what is already read
+            address = current.end
+        while end - address > max_count:
+            requests.append(ReadRequest(address, max_count, [id]))
+            address += max_count
+        current = ReadRequest(address, end - address, [id])
+        requests.append(current)
+    return requests
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the Modbus read plan for a register map.")
+    parser.add_argument("yaml_file", help="Path to the YAML configuration file")
+    parser.add_argument("--cells", "-c", type=int, default=16, help="Number of cells (default: 16)")
+    parser.add_argument("--gap", "-g", type=int, default=0, help="Unused registers that may be read to join two fields (default: 0)")
+    parser.add_argument("--max-count", type=int, default=MAX_READ_REGISTERS, help=f"Maximum registers per request (default: {MAX_READ_REGISTERS})")
+    parser.add_argument("--register", "-r", action="append", dest="register_ids", help="Only plan the given register id (may be repeated)")
+    add_map_arguments(parser)
+    args = parser.parse_args()
+
+    registers = register_map_from_args(args.yaml_file, args)
+    try:
+        requests = plan_reads(registers, args.cells, args.register_ids, args.gap, args.max_count)
+    except ValueError as e:
+        parser.error(str(e))
+    for request in requests:
+        print(f"{request.address:>6} {request.count:>4}  {', '.join(request.register_ids)}")
+    print(f"{len(requests)} requests, {sum(r.count for r in requests)} registers.")
+
+if __name__ == "__main__":
+    main()
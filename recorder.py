@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+import bisect
+import json
+import math
+import mmap
+import os
+import re
+import struct
+from array import array
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional
+from validate_yaml import BaseType, Register, RegisterList
+
+# array/memoryview type codes per base type; strings are stored as raw bytes
+TYPE_CODES = {
+    BaseType.INT8: "b",
+    BaseType.UINT8: "B",
+    BaseType.CHAR: "B",
+    BaseType.INT16: "h",
+    BaseType.UINT16: "H",
+    BaseType.INT32: "i",
+    BaseType.UINT32: "I",
+    BaseType.INT64: "q",
+    BaseType.UINT64: "Q",
+    BaseType.FLOAT32: "f",
+    BaseType.FLOAT64: "d",
+    BaseType.BOOL: "B",
+}
+
+# Ring position: index of the next row to write and number of valid rows
+HEADER = struct.Struct("<QQ")
+LAYOUT_FILE = "layout.json"
+HEADER_FILE = "header.bin"
+TIMESTAMP_COLUMN = "timestamp"
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w.-]", "_", name)
+
+def _missing_value(code: str) -> Any:
+    """Returns the value stored for readings that are missing: NaN for floats, zero otherwise."""
+    return math.nan if code in "fd" else 0
+
+class Column:
+    """
+    A memory-mapped ring buffer column holding ``width`` values of one type per row.
+    """
+    def __init__(self, path: str, code: str, width: int, capacity: int):
+        self.code: str = code
+        self.width: int = width
+        self.capacity: int = capacity
+        itemsize = array(code).itemsize
+        size = capacity * width * itemsize
+        mode = "r+b" if os.path.exists(path) else "w+b"
+        self._file = open(path, mode)
+        if os.fstat(self._file.fileno()).st_size != size:
+            self._file.truncate(size)
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+        self._row_size: int = width * itemsize
+        self._raw: memoryview = memoryview(self._mmap)
+        self.values: memoryview = self._raw.cast(code)
+
+    def write(self, row: int, value: Any):
+        if self.width == 1:
+            self.values[row] = value
+        else:
+            self.values[row * self.width:(row + 1) * self.width] = value
+
+    def read(self, first: int, count: int) -> array:
+        """
+        Copies ``count`` rows starting at ring position ``first`` into a flat array, handling wrap-around.
+        """
+        result = array(self.code)
+        end = first + count
+        if end <= self.capacity:
+            result.frombytes(self._raw[first * self._row_size:end * self._row_size])
+        else:
+            result.frombytes(self._raw[first * self._row_size:])
+            result.frombytes(self._raw[:(end - self.capacity) * self._row_size])
+        return result
+
+    def flush(self):
+        self._mmap.flush()
+
+    def close(self):
+        self.values.release()
+        self._raw.release()
+        self._mmap.close()
+        self._file.close()
+
+class Window:
+    """
+    The rows of one column within a time window, oldest first.
+    """
+    def __init__(self, timestamps: array, values: array, width: int):
+        """
+        :param timestamps: One timestamp per row.
+        :param values: The values of all rows, ``width`` values per row.
+        :param width: Values per row, e.g. the number of cells of a cell column.
+        """
+        self.timestamps: array = timestamps
+        self.values: array = values
+        self.width: int = width
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def rows(self) -> List[array]:
+        return [self.values[i * self.width:(i + 1) * self.width] for i in range(len(self))]
+
+    def column(self, index: int) -> array:
+        """Returns the values of one position of each row, e.g. one cell, as a time series."""
+        return self.values[index::self.width]
+
+class Recorder:
+    """
+    Records decoded samples of one device into memory-mapped, columnar ring buffers on disk.
+
+    Each general register gets a column with one value per sample, each cell register a
+    column with one value per cell and sample. The oldest samples are overwritten once
+    ``capacity`` samples are stored. An existing recording with the same layout is continued.
+    """
+    def __init__(self, directory: str, registers: RegisterList, number_of_cells: int, capacity: int, register_ids: Optional[Iterable[str]] = None):
+        """
+        :param directory: Directory of the recording, created if needed.
+        :param registers: The register map.
+        :param number_of_cells: The number of cells of the device.
+        :param capacity: The number of samples kept.
+        :param register_ids: Optional subset of general and cell register ids (without cell number) to record.
+        """
+        if capacity < 1:
+            raise ValueError("Capacity must be at least 1")
+        selected = set(register_ids) if register_ids is not None else None
+        layout: Dict[str, Any] = {"capacity": capacity, "number_of_cells": number_of_cells, "columns": {TIMESTAMP_COLUMN: ["d", 1]}}
+        self._encoders: Dict[str, Callable[[Any], Any]] = {}
+        for cells, regs in ((1, registers.general_registers), (number_of_cells, registers.cell_registers)):
+            for reg in regs:
+                if selected is not None and reg.id not in selected:
+                    continue
+                layout["columns"][reg.id] = [TYPE_CODES[reg.value_type.base_type], reg.value_type.dimension * cells]
+                encoder = self._encoder(reg, regs is registers.cell_registers)
+                if encoder is not None:
+                    self._encoders[reg.id] = encoder
+        os.makedirs(directory, exist_ok=True)
+        layout_path = os.path.join(directory, LAYOUT_FILE)
+        if os.path.exists(layout_path):
+            with open(layout_path, "r", encoding="utf-8") as f:
+                existing = json.load(f)
+            if existing != layout:
+                raise ValueError(f"Recording in '{directory}' has a different layout")
+        else:
+            with open(layout_path, "w", encoding="utf-8") as f:
+                json.dump(layout, f, indent=2)
+        self.directory: str = directory
+        self.capacity: int = capacity
+        self.number_of_cells: int = number_of_cells
+        self.columns: Dict[str, Column] = {
+            id: Column(os.path.join(directory, _safe_name(id) + ".col"), code, width, capacity)
+            for id, (code, width) in layout["columns"].items()
+        }
+        header_path = os.path.join(directory, HEADER_FILE)
+        self._header_file = open(header_path, "r+b" if os.path.exists(header_path) else "w+b")
+        if os.fstat(self._header_file.fileno()).st_size != HEADER.size:
+            self._header_file.truncate(HEADER.size)
+        self._header = mmap.mmap(self._header_file.fileno(), HEADER.size)
+        self.head, self.count = HEADER.unpack_from(self._header)
+        # Row written for columns without value in a sample, so no value of an earlier lap remains
+        self._missing_rows: Dict[str, Any] = {
+            id: _missing_value(column.code) if column.width == 1 else array(column.code, [_missing_value(column.code)] * column.width)
+            for id, column in self.columns.items() if id != TIMESTAMP_COLUMN
+        }
+
+    @staticmethod
+    def _encoder(reg: Register, is_cell: bool) -> Optional[Callable[[Any], Any]]:
+        """
+        Returns a converter from decoded values to the column row, or None if none is needed.
+        """
+        vt = reg.value_type
+        if vt.base_type == BaseType.CHAR:
+            # Strings are stored as fixed-size, NUL-padded bytes
+            def encode_str(value: Any) -> bytes:
+                return str(value).encode("ascii", errors="replace")[:vt.dimension].ljust(vt.dimension, b"\0")
+            if is_cell:
+                return lambda values: b"".join(map(encode_str, values))
+            if vt.dimension == 1:
+                return lambda value: encode_str(value)[0]
+            return encode_str
+        code = TYPE_CODES[vt.base_type]
+        # Cells that were not polled are None; they are stored as NaN or zero
+        missing = _missing_value(code)
+        if is_cell and vt.dimension > 1:
+            return lambda values: array(code, [item for value in values for item in (value if value is not None else [missing] * vt.dimension)])
+        if is_cell:
+            return lambda values: array(code, [value if value is not None else missing for value in values])
+        if vt.dimension > 1:
+            return lambda values: array(code, values)
+        return None
+
+    def append(self, timestamp: float, values: Dict[str, Any]):
+        """
+        Appends one decoded sample.
+
+        :param timestamp: Unix time of the sample.
+        :param values: Decoded values as returned by ``RegisterDecoder.decode``. Columns without value are stored as NaN or zero.
+        """
+        row = self.head
+        self.columns[TIMESTAMP_COLUMN].write(row, timestamp)
+        for id, missing in self._missing_rows.items():
+            value = values.get(id)
+            if value is None:
+                self.columns[id].write(row, missing)
+                continue
+            encoder = self._encoders.get(id)
+            self.columns[id].write(row, value if encoder is None else encoder(value))
+        self.head = (row + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        HEADER.pack_into(self._header, 0, self.head, self.count)
+
+    def _first(self) -> int:
+        return (self.head - self.count) % self.capacity
+
+    def window(self, id: str, start: Optional[float] = None, end: Optional[float] = None) -> Window:
+        """
+        Reads the samples of a column with ``start <= timestamp < end``.
+
+        Timestamps are expected to increase; the window is located by binary search.
+
+        :param id: A general or cell register id (without cell number).
+        :param start: Start of the window as Unix time. Defaults to the oldest sample.
+        :param end: End of the window as Unix time. Defaults to after the newest sample.
+        """
+        timestamps = self.columns[TIMESTAMP_COLUMN].values
+        first = self._first()
+
+        def timestamp_at(i: int) -> float:
+            return timestamps[(first + i) % self.capacity]
+
+        low = 0 if start is None else bisect.bisect_left(range(self.count), start, key=timestamp_at)
+        high = self.count if end is None else bisect.bisect_left(range(self.count), end, key=timestamp_at)
+        count = max(high - low, 0)
+        column = self.columns[id]
+        position = (first + low) % self.capacity
+        return Window(self.columns[TIMESTAMP_COLUMN].read(position, count), column.read(position, count), column.width)
+
+    def last(self, id: str, seconds: float) -> Window:
+        """
+        Reads the samples of a column from the last ``seconds`` before the newest sample.
+        """
+        if self.count == 0:
+            return self.window(id)
+        newest = self.columns[TIMESTAMP_COLUMN].values[(self.head - 1) % self.capacity]
+        return self.window(id, newest - seconds)
+
+    def flush(self):
+        for column in self.columns.values():
+            column.flush()
+        self._header.flush()
+
+    def close(self):
+        self.flush()
+        for column in self.columns.values():
+            column.close()
+        self._header.close()
+        self._header_file.close()
+
+    def __enter__(self) -> "Recorder":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+async def record(samples: AsyncIterator[Any], directory: str, registers: RegisterList, capacity: int, register_ids: Optional[Iterable[str]] = None) -> AsyncIterator[Any]:
+    """
+    Records each successful sample into one Recorder per device and passes all samples on.
+
+    :param samples: The samples, e.g. from ``Poller.samples()``.
+    :param directory: Base directory; each device is recorded in a subdirectory named after it.
+    :param registers: The register map.
+    :param capacity: The number of samples kept per device.
+    :param register_ids: Optional subset of general and cell register ids (without cell number) to record.
+    """
+    recorders: Dict[str, Recorder] = {}
+    try:
+        async for sample in samples:
+            if sample.error is None:
+                recorder = recorders.get(sample.device.name)
+                if recorder is None:
+                    recorder = Recorder(os.path.join(directory, _safe_name(sample.device.name)), registers, sample.device.number_of_cells, capacity, register_ids)
+                    recorders[sample.device.name] = recorder
+                recorder.append(sample.timestamp, sample.values)
+            yield sample
+    finally:
+        for recorder in recorders.values():
+            recorder.close()
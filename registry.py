@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+import argparse
+import sys
+from collections import OrderedDict
+from semantic_version import Version
+from typing import Dict, List, Optional, Union
+from decoder import BlockLayout, RegisterDecoder
+from modbus_tcp import ModbusTcpClient
+from map_cache import DEFAULT_CACHE_DIR, DEFAULT_SCHEMA_FILE, add_map_arguments, load_register_map, register_map_from_args
+from validate_yaml import Register, RegisterList
+
+VERSION_REGISTER_ID = "Modbus_Version"
+
+class FieldChange:
+    """A difference of one field between two register maps."""
+    ADDED = "added"
+    REMOVED = "removed"
+    MOVED = "moved"
+    RESIZED = "resized"
+    RETYPED = "retyped"
+
+    def __init__(self, id: str, kind: str, block: str, old: Optional[Register], new: Optional[Register]):
+        """
+        :param id: The register id.
+        :param kind: One of ``added``, ``removed``, ``moved``, ``resized`` and ``retyped``.
+        :param block: ``general`` or ``cell``.
+        :param old: The field in the old map, if present.
+        :param new: The field in the new map, if present.
+        """
+        self.id: str = id
+        self.kind: str = kind
+        self.block: str = block
+        self.old: Optional[Register] = old
+        self.new: Optional[Register] = new
+
+    def __str__(self) -> str:
+        if self.old is None and self.new is None:
+            return f"{self.kind:<8} {self.block:<7} {self.id}"
+        if self.old is None:
+            return f"{self.kind:<8} {self.block:<7} {self.id}: {self.new.address} {self.new.value_type}"
+        if self.new is None:
+            return f"{self.kind:<8} {self.block:<7} {self.id}: {self.old.address} {self.old.value_type}"
+        return f"{self.kind:<8} {self.block:<7} {self.id}: {self.old.address} {self.old.value_type} -> {self.new.address} {self.new.value_type}"
+
+def diff_register_maps(old: RegisterList, new: RegisterList) -> List[FieldChange]:
+    """
+    Lists the fields that were added, removed, moved, resized or retyped between two maps.
+
+    A field that changed in several ways is listed once per kind of change.
+    The start of the cell block is reported as a change of the pseudo field ``cells``.
+    """
+    changes: List[FieldChange] = []
+    for block, old_regs, new_regs in (("general", old.general_registers, new.general_registers), ("cell", old.cell_registers, new.cell_registers)):
+        old_by_id = {reg.id: reg for reg in old_regs}
+        new_by_id = {reg.id: reg for reg in new_regs}
+        for id, reg in old_by_id.items():
+            other = new_by_id.get(id)
+            if other is None:
+                changes.append(FieldChange(id, FieldChange.REMOVED, block, reg, None))
+                continue
+            if other.address != reg.address:
+                changes.append(FieldChange(id, FieldChange.MOVED, block, reg, other))
+            if other.value_type.registers_required() != reg.value_type.registers_required():
+                changes.append(FieldChange(id, FieldChange.RESIZED, block, reg, other))
+            if other.value_type is not reg.value_type:
+                changes.append(FieldChange(id, FieldChange.RETYPED, block, reg, other))
+        for id, reg in new_by_id.items():
+            if id not in old_by_id:
+                changes.append(FieldChange(id, FieldChange.ADDED, block, None, reg))
+    old_view, new_view = old.view(1), new.view(1)
+    if old_view.cell_start_address != new_view.cell_start_address or old_view.cell_size != new_view.cell_size:
+        changes.append(FieldChange("cells", FieldChange.MOVED, "cell", None, None))
+    return changes
+
+def breaking_changes(changes: List[FieldChange]) -> List[FieldChange]:
+    """
+    Returns the changes that require a new major version.
+
+    A changed data type is allowed within a major version as long as the field keeps
+    its position and length, so it only counts together with a move or resize.
+    """
+    relocated = {(c.block, c.id) for c in changes if c.kind in (FieldChange.MOVED, FieldChange.RESIZED)}
+    return [c for c in changes if c.kind not in (FieldChange.ADDED, FieldChange.RETYPED) or (c.block, c.id) in relocated]
+
+class DecoderRegistry:
+    """
+    Holds the register maps of several table versions and compiles their decoders on demand.
+
+    Compiled decoders are kept in an LRU cache. Devices are matched to a map by their
+    ``Modbus_Version`` register: an exact version match is preferred, otherwise the newest
+    known map of the same major version that is not newer than the device. Newer maps may
+    contain fields the device does not have, as every patch release may add fields.
+    """
+    def __init__(self, cache_size: int = 8, allow_newer: bool = False):
+        """
+        :param cache_size: Number of compiled decoders to keep.
+        :param allow_newer: Use the oldest newer map of the same major version for devices older than all known maps.
+        """
+        if cache_size < 1:
+            raise ValueError("Cache size must be at least 1")
+        self.cache_size: int = cache_size
+        self.allow_newer: bool = allow_newer
+        self.maps: Dict[Version, RegisterList] = {}
+        self._decoders: "OrderedDict[Version, RegisterDecoder]" = OrderedDict()
+        self._device_versions: Dict[str, Version] = {}
+
+    def add(self, registers: RegisterList):
+        if registers.version is None:
+            raise ValueError("Register map has no version")
+        self.maps[registers.version] = registers
+        self._decoders.pop(registers.version, None)
+
+    def add_file(self, data_file: str, schema_file: str = DEFAULT_SCHEMA_FILE, cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> Version:
+        """
+        Adds the validated register map of a data file, loaded through the compiled-map cache.
+        """
+        registers = load_register_map(data_file, schema_file, cache_dir)
+        self.add(registers)
+        return registers.version
+
+    def versions(self) -> List[Version]:
+        return sorted(self.maps)
+
+    def resolve(self, version: Union[str, Version]) -> Version:
+        """
+        Returns the registered version to use for a device version.
+
+        :raises KeyError: If no suitable map is registered.
+        """
+        if not isinstance(version, Version):
+            version = Version.coerce(version)
+        if version in self.maps:
+            return version
+        same_major = [v for v in self.maps if v.major == version.major]
+        older = [v for v in same_major if v <= version]
+        if older:
+            return max(older)
+        if self.allow_newer and same_major:
+            return min(same_major)
+        raise KeyError(f"No register map for version {version}")
+
+    def decoder(self, version: Union[str, Version]) -> RegisterDecoder:
+        """
+        Returns the compiled decoder for a device version.
+        """
+        version = self.resolve(version)
+        decoder = self._decoders.get(version)
+        if decoder is None:
+            decoder = RegisterDecoder(self.maps[version])
+            self._decoders[version] = decoder
+            if len(self._decoders) > self.cache_size:
+                self._decoders.popitem(last=False)
+        else:
+            self._decoders.move_to_end(version)
+        return decoder
+
+    def _version_register(self) -> Register:
+        for version in reversed(self.versions()):
+            for reg in self.maps[version].general_registers:
+                if reg.id == VERSION_REGISTER_ID:
+                    return reg
+        raise KeyError(f"No register map defines {VERSION_REGISTER_ID}")
+
+    async def read_version(self, client: ModbusTcpClient, unit_id: int = 1) -> Version:
+        """
+        Reads the ``Modbus_Version`` register of a device.
+        """
+        reg = self._version_register()
+        data = await client.read_holding_registers(reg.address, reg.value_type.registers_required(), unit_id)
+        text = BlockLayout([reg], reg.address).decode(data)[reg.id]
+        try:
+            return Version(text.strip())
+        except ValueError:
+            return Version.coerce(text.strip())
+
+    async def decoder_for_device(self, client: ModbusTcpClient, device_key: str, unit_id: int = 1) -> RegisterDecoder:
+        """
+        Returns the decoder for a device, reading its version only on first use.
+
+        :param client: A client connected to the device or its gateway.
+        :param device_key: Identifies the device, e.g. its name.
+        :param unit_id: The unit identifier of the device.
+        """
+        version = self._device_versions.get(device_key)
+        if version is None:
+            version = await self.read_version(client, unit_id)
+            self._device_versions[device_key] = version
+        return self.decoder(version)
+
+    def forget_device(self, device_key: str):
+        """Reads the version of the device again on next use, e.g. after a firmware update."""
+        self._device_versions.pop(device_key, None)
+
+def main():
+    parser = argparse.ArgumentParser(description="List the differences between two register map versions.")
+    parser.add_argument("old_yaml_file", help="Path to the old YAML configuration file")
+    parser.add_argument("new_yaml_file", help="Path to the new YAML configuration file")
+    add_map_arguments(parser)
+    args = parser.parse_args()
+
+    old = register_map_from_args(args.old_yaml_file, args)
+    new = register_map_from_args(args.new_yaml_file, args)
+    changes = diff_register_maps(old, new)
+    for change in changes:
+        print(change)
+    print(f"{old.version} -> {new.version}: {len(changes)} changes.")
+    if breaking_changes(changes) and new.version.major == old.version.major:
+        print("Breaking changes require a new major version.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
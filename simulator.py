@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import math
+import random
+import time
+from typing import Any, Dict, Iterable, List, Optional
+from decoder import RegisterDecoder
+from modbus_tcp import ILLEGAL_DATA_ADDRESS, ILLEGAL_DATA_VALUE, ILLEGAL_FUNCTION, MAX_READ_COILS, READ_COILS, READ_HOLDING_REGISTERS, READ_REQUEST, build_frame, read_frame
+from read_plan import MAX_READ_REGISTERS
+from map_cache import add_map_arguments, register_map_from_args
+from validate_yaml import BaseType, Register, RegisterList
+
+GATEWAY_TARGET_FAILED = 0x0B
+
+# Nominal value and amplitude of synthetic values per unit
+UNIT_RANGES = {
+    "V": (3.3, 0.05),
+    "A": (0.0, 20.0),
+    "%": (60.0, 30.0),
+    "Ah": (100.0, 0.0),
+    "°C": (25.0, 5.0),
+}
+
+class SyntheticBattery:
+    """
+    Generates plausible, slowly changing values for every field of the register map.
+    """
+    def __init__(self, registers: RegisterList, number_of_cells: int, seed: Optional[int] = None, unsupported: Iterable[str] = ()):
+        """
+        :param registers: The register map.
+        :param number_of_cells: The number of simulated cells.
+        :param seed: Seed for the per-unit phase offsets.
+        :param unsupported: Register ids whose hardware support coil is cleared.
+        """
+        self.registers: RegisterList = registers
+        self.number_of_cells: int = number_of_cells
+        self.unsupported: set = set(unsupported)
+        self._random = random.Random(seed)
+        self._phase: float = self._random.uniform(0, 2 * math.pi)
+        self._cell_phases: List[float] = [self._random.uniform(0, 2 * math.pi) for _ in range(number_of_cells)]
+
+    def _wave(self, t: float, phase: float, period: float = 60.0) -> float:
+        return math.sin(2 * math.pi * t / period + phase)
+
+    def _value(self, reg: Register, t: float, phase: float) -> Any:
+        vt = reg.value_type
+        if vt.base_type == BaseType.CHAR:
+            return (str(self.registers.version) if reg.id == "Modbus_Version" else reg.id)[:vt.dimension]
+        if vt.base_type == BaseType.BOOL:
+            value = self._wave(t, phase, 30.0) > 0
+            return value if vt.dimension == 1 else [value] * vt.dimension
+        if vt.base_type in (BaseType.FLOAT32, BaseType.FLOAT64):
+            nominal, amplitude = UNIT_RANGES.get(reg.unit, (0.0, 1.0))
+            value = nominal + amplitude * self._wave(t, phase)
+        else:
+            value = 0
+        return value if vt.dimension == 1 else [value] * vt.dimension
+
+    def values(self, t: float) -> Dict[str, Any]:
+        """
+        Computes the values of all fields at time ``t``.
+
+        :param t: Time in seconds.
+        :return: General register values and, for each cell register, a list of cell values.
+        """
+        values = {reg.id: self._value(reg, t, self._phase) for reg in self.registers.general_registers}
+        for reg in self.registers.cell_registers:
+            values[reg.id] = [self._value(reg, t, phase) for phase in self._cell_phases]
+        values["Number_of_Cells"] = self.number_of_cells
+        if "Cell_Voltage" in values:
+            cell_voltages = values["Cell_Voltage"]
+            values["Battery_Voltage"] = sum(cell_voltages)
+            values["Max_Cell_Voltage"] = max(cell_voltages, default=0.0)
+            values["Min_Cell_Voltage"] = min(cell_voltages, default=0.0)
+        return values
+
+    def coils(self) -> bytearray:
+        """
+        Returns the hardware support coils packed eight per byte, least significant bit first.
+        """
+        size = max((coil.address + 1 for coil in self.registers.coils), default=0)
+        coils = bytearray((size + 7) // 8)
+        for reg in self.registers.general_registers + self.registers.cell_registers:
+            if reg.hardware_support_register is not None and reg.id not in self.unsupported:
+                coils[reg.hardware_support_register // 8] |= 1 << (reg.hardware_support_register % 8)
+        return coils
+
+class SimulatedUnit:
+    """The holding register and coil image of one simulated iRock."""
+    def __init__(self, decoder: RegisterDecoder, battery: SyntheticBattery):
+        self.decoder: RegisterDecoder = decoder
+        self.battery: SyntheticBattery = battery
+        self.coils: bytearray = battery.coils()
+        self.coil_count: int = max((coil.address + 1 for coil in battery.registers.coils), default=0)
+        self.holding_registers: bytes = b""
+        self.update(time.time())
+
+    def update(self, t: float):
+        # Requests are served from the previous image until the new one is complete
+        self.holding_registers = bytes(self.decoder.encode(self.battery.values(t), self.battery.number_of_cells))
+
+    def read_coils(self, address: int, count: int) -> bytes:
+        result = bytearray((count + 7) // 8)
+        for i in range(count):
+            bit = address + i
+            if self.coils[bit // 8] >> (bit % 8) & 1:
+                result[i // 8] |= 1 << (i % 8)
+        return bytes(result)
+
+class Simulator:
+    """
+    A Modbus TCP server exposing simulated iRock units built from the register map.
+    """
+    def __init__(self, registers: RegisterList, number_of_cells: int = 16, units: int = 1, host: str = "127.0.0.1", port: int = 5020, update_interval: float = 1.0, unsupported: Iterable[str] = ()):
+        """
+        :param registers: The register map created by ``generate_registers``.
+        :param number_of_cells: The number of cells per unit.
+        :param units: The number of units, served as unit ids 1 to ``units``.
+        :param host: The address to listen on.
+        :param port: The TCP port to listen on. Use 0 to pick a free port.
+        :param update_interval: Seconds between value updates.
+        :param unsupported: Register ids whose hardware support coil is cleared.
+        """
+        decoder = RegisterDecoder(registers)
+        self.units: Dict[int, SimulatedUnit] = {
+            unit_id: SimulatedUnit(decoder, SyntheticBattery(registers, number_of_cells, unit_id, unsupported))
+            for unit_id in range(1, units + 1)
+        }
+        self.host: str = host
+        self.port: int = port
+        self.update_interval: float = update_interval
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._updater: Optional[asyncio.Task] = None
+
+    def handle_request(self, unit_id: int, pdu: bytes) -> bytes:
+        """
+        Answers one request PDU.
+
+        :param unit_id: The unit identifier of the request.
+        :param pdu: The request PDU.
+        :return: The response PDU.
+        """
+        function_code = pdu[0]
+        unit = self.units.get(unit_id)
+        if unit is None:
+            return bytes([function_code | 0x80, GATEWAY_TARGET_FAILED])
+        if function_code not in (READ_COILS, READ_HOLDING_REGISTERS):
+            return bytes([function_code | 0x80, ILLEGAL_FUNCTION])
+        if len(pdu) != READ_REQUEST.size:
+            return bytes([function_code | 0x80, ILLEGAL_DATA_VALUE])
+        _, address, count = READ_REQUEST.unpack(pdu)
+        if function_code == READ_HOLDING_REGISTERS:
+            if not 1 <= count <= MAX_READ_REGISTERS:
+                return bytes([function_code | 0x80, ILLEGAL_DATA_VALUE])
+            if 2 * (address + count) > len(unit.holding_registers):
+                return bytes([function_code | 0x80, ILLEGAL_DATA_ADDRESS])
+            return bytes([function_code, 2 * count]) + unit.holding_registers[2 * address:2 * (address + count)]
+        if not 1 <= count <= MAX_READ_COILS:
+            return bytes([function_code | 0x80, ILLEGAL_DATA_VALUE])
+        if address + count > unit.coil_count:
+            return bytes([function_code | 0x80, ILLEGAL_DATA_ADDRESS])
+        data = unit.read_coils(address, count)
+        return bytes([function_code, len(data)]) + data
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                transaction_id, unit_id, pdu = await read_frame(reader)
+                writer.write(build_frame(transaction_id, unit_id, self.handle_request(unit_id, pdu)))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _update_forever(self):
+        while True:
+            await asyncio.sleep(self.update_interval)
+            now = time.time()
+            for unit in self.units.values():
+                unit.update(now)
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._updater = asyncio.create_task(self._update_forever())
+
+    async def close(self):
+        if self._updater is not None:
+            self._updater.cancel()
+            await asyncio.gather(self._updater, return_exceptions=True)
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve simulated iRock units over Modbus TCP.")
+    parser.add_argument("yaml_file", help="Path to the YAML configuration file")
+    parser.add_argument("--cells", "-c", type=int, default=16, help="Number of cells per unit (default: 16)")
+    parser.add_argument("--units", "-u", type=int, default=1, help="Number of units, served as unit ids 1..N (default: 1)")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", "-p", type=int, default=5020, help="TCP port (default: 5020)")
+    parser.add_argument("--update-interval", type=float, default=1.0, help="Seconds between value updates (default: 1.0)")
+    parser.add_argument("--unsupported", action="append", default=[], help="Register id reported as unsupported by its coil (may be repeated)")
+    add_map_arguments(parser)
+    args = parser.parse_args()
+
+    registers = register_map_from_args(args.yaml_file, args)
+    simulator = Simulator(registers, args.cells, args.units, args.host, args.port, args.update_interval, args.unsupported)
+    print(f"Simulating {args.units} iRock(s) with {args.cells} cells on {args.host}:{args.port}.")
+    try:
+        asyncio.run(simulator.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+import math
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from poller import Sample
+from validate_yaml import BaseType, Register, RegisterList
+
+# Marks fields that were not emitted yet
+_MISSING = object()
+
+class ChangeFilter:
+    """
+    Reduces decoded samples to the values that changed since they were last emitted.
+
+    Numeric scalar fields are emitted when they move by more than their deadband from the
+    last emitted value, so slow drifts are still reported once they add up. Deadbands are
+    looked up by register id first, then by unit. Booleans are emitted on every edge,
+    strings and arrays on every change. A float turning NaN or back is always emitted.
+    """
+    def __init__(self, registers: RegisterList, deadbands: Optional[Dict[str, float]] = None, unit_deadbands: Optional[Dict[str, float]] = None, default_deadband: float = 0.0):
+        """
+        :param registers: The register map.
+        :param deadbands: Deadband per register id (cell registers without cell number), e.g. ``{"Cell_Voltage": 0.005}``.
+        :param unit_deadbands: Deadband per unit, e.g. ``{"%": 0.1}``.
+        :param default_deadband: Deadband of numeric fields without a specific deadband.
+        """
+        self.registers: RegisterList = registers
+        self.deadbands: Dict[str, float] = dict(deadbands or {})
+        self.unit_deadbands: Dict[str, float] = dict(unit_deadbands or {})
+        self.default_deadband: float = default_deadband
+        known = {reg.id for reg in registers.general_registers + registers.cell_registers}
+        unknown = set(self.deadbands) - known
+        if unknown:
+            raise ValueError(f"Unknown register ids: {', '.join(sorted(unknown))}")
+        # Deadband per register id, None for fields compared for equality
+        self._general: Dict[str, Optional[float]] = {reg.id: self._deadband(reg) for reg in registers.general_registers}
+        self._cells: Dict[str, Optional[float]] = {reg.id: self._deadband(reg) for reg in registers.cell_registers}
+        self._cell_ids: Dict[str, List[str]] = {reg.id: [] for reg in registers.cell_registers}
+        self._last: Dict[str, Dict[str, Any]] = {}
+
+    def _deadband(self, reg: Register) -> Optional[float]:
+        vt = reg.value_type
+        if vt.dimension != 1 or vt.base_type in (BaseType.BOOL, BaseType.CHAR):
+            return None
+        if reg.id in self.deadbands:
+            return self.deadbands[reg.id]
+        return self.unit_deadbands.get(reg.unit, self.default_deadband)
+
+    def _cell_id(self, id: str, index: int) -> str:
+        ids = self._cell_ids[id]
+        while len(ids) <= index:
+            ids.append(f"{id}_{len(ids) + 1}")
+        return ids[index]
+
+    def changes(self, key: str, values: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Returns the changed values of one sample and remembers them as emitted.
+
+        :param key: Identifies the source of the sample, e.g. the device name.
+        :param values: Decoded values as returned by ``RegisterDecoder.decode``.
+        :return: The changed values, with cell values flattened to ids like ``Cell_Voltage_3``.
+        """
+        last = self._last.setdefault(key, {})
+        changed: Dict[str, Any] = {}
+
+        def check(id: str, value: Any, deadband: Optional[float]):
+            previous = last.get(id, _MISSING)
+            if previous is _MISSING:
+                emit = True
+            elif deadband is None:
+                emit = previous != value
+            else:
+                # NaN marks an invalid reading; entering or leaving it is always a change
+                value_nan, previous_nan = math.isnan(value), math.isnan(previous)
+                emit = value_nan != previous_nan if value_nan or previous_nan else abs(value - previous) > deadband
+            if emit:
+                last[id] = value
+                changed[id] = value
+
+        for id, value in values.items():
+            deadband = self._general.get(id, self._cells.get(id))
+            if id in self._cells:
+                for index, cell_value in enumerate(value):
+                    # None marks cells that were not polled
+                    if cell_value is not None:
+                        check(self._cell_id(id, index), cell_value, deadband)
+            else:
+                check(id, value, deadband)
+        return changed
+
+    def reset(self, key: Optional[str] = None):
+        """
+        Forgets the emitted values, so the next sample is emitted completely.
+
+        :param key: The source to reset. Defaults to all sources.
+        """
+        if key is None:
+            self._last.clear()
+        else:
+            self._last.pop(key, None)
+
+async def subscribe(samples: AsyncIterator[Sample], change_filter: ChangeFilter) -> AsyncIterator[Sample]:
+    """
+    Yields only the changed values of each sample, skipping samples without changes.
+
+    Failed samples are passed through unchanged.
+
+    :param samples: The samples, e.g. from ``Poller.samples()``.
+    :param change_filter: The filter holding the deadbands and the last emitted values.
+    """
+    async for sample in samples:
+        if sample.error is not None:
+            yield sample
+            continue
+        changed = change_filter.changes(sample.device.name, sample.values)
+        if changed:
+            yield Sample(sample.device, sample.timestamp, changed, sample.duration)
+
+def parse_deadband(spec: str) -> Tuple[str, float]:
+    """
+    Parses a deadband specification of the form ``NAME=VALUE``.
+    """
+    name, separator, value = spec.rpartition("=")
+    if not separator or not name:
+        raise ValueError(f"Invalid deadband: {spec}")
+    return name, float(value)
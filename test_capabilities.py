@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+import unittest
+from capabilities import Capabilities, coil_range
+from test_registers import DATA_FILE
+from validate_yaml import generate_registers, load_yaml
+
+class CapabilitiesTest(unittest.TestCase):
+    def setUp(self):
+        self.registers = generate_registers(load_yaml(DATA_FILE))
+        self.coils = {reg.id: reg.hardware_support_register for reg in self.registers.general_registers if reg.hardware_support_register is not None}
+
+    def without(self, *register_ids: str) -> Capabilities:
+        """Capabilities with every coil set except the ones of the given registers."""
+        start, count = coil_range(self.registers)
+        bits = (1 << count) - 1
+        for id in register_ids:
+            bits &= ~(1 << (self.coils[id] - start))
+        return Capabilities(self.registers, bits, start)
+
+    def test_coil_range(self):
+        self.assertEqual(coil_range(self.registers), (0, 17))
+
+    def test_from_coil_bytes(self):
+        # Coils 0 and 9 set, packed least significant bit first
+        capabilities = Capabilities.from_coil_bytes(self.registers, bytes([0x01, 0x02, 0x00]))
+        self.assertTrue(capabilities.coil(0))
+        self.assertFalse(capabilities.coil(1))
+        self.assertTrue(capabilities.coil(9))
+        self.assertFalse(capabilities.coil(-1))
+        self.assertTrue(capabilities.supports("Battery_Current"))
+        self.assertTrue(capabilities.supports("Charge_FET"))
+        self.assertFalse(capabilities.supports("Battery_SOC"))
+
+    def test_from_coil_bytes_with_start(self):
+        capabilities = Capabilities.from_coil_bytes(self.registers, bytes([0x01]), start=9)
+        self.assertFalse(capabilities.coil(0))
+        self.assertTrue(capabilities.supports("Charge_FET"))
+
+    def test_all_supported(self):
+        capabilities = Capabilities.all_supported(self.registers)
+        self.assertEqual(capabilities.unsupported_register_ids(), [])
+        ids = [reg.id for reg in self.registers.general_registers + self.registers.cell_registers]
+        self.assertEqual(capabilities.supported_register_ids(), ids)
+
+    def test_registers_without_coil_are_supported(self):
+        capabilities = Capabilities(self.registers, 0)
+        self.assertTrue(capabilities.supports("Number_of_Cells"))
+        self.assertTrue(capabilities.supports("Cell_Voltage"))
+        self.assertFalse(capabilities.supports("Battery_SOC"))
+
+    def test_cell_numbered_ids(self):
+        capabilities = self.without("Temperature_Sensor_4")
+        self.assertTrue(capabilities.supports("Cell_Voltage_3"))
+        self.assertTrue(capabilities.supports("Cell_Balance_Status_12"))
+        # General ids ending in a number are looked up as they are
+        self.assertTrue(capabilities.supports("Temperature_Sensor_1"))
+        self.assertFalse(capabilities.supports("Temperature_Sensor_4"))
+
+    def test_unknown_ids(self):
+        capabilities = Capabilities.all_supported(self.registers)
+        for id in ("Nope", "Cell_Voltage_x", "Cell_Voltage_", "Nope_3"):
+            with self.assertRaises(KeyError):
+                capabilities.supports(id)
+
+    def test_supported_register_ids(self):
+        capabilities = self.without("Charge_FET", "Temperature_Sensor_4")
+        self.assertEqual(capabilities.supported_register_ids(["Charge_FET", "Cell_Voltage_2", "Battery_SOC", "Temperature_Sensor_4"]), ["Cell_Voltage_2", "Battery_SOC"])
+        self.assertEqual(capabilities.unsupported_register_ids(), ["Temperature_Sensor_4", "Charge_FET"])
+
+if __name__ == "__main__":
+    unittest.main()
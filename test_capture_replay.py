@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+import contextlib
+import io
+import json
+import math
+import os
+import struct
+import tempfile
+import unittest
+from unittest import mock
+import capture_replay
+from capture_replay import MAX_HELD_SEGMENTS, CaptureDecoder, StreamFramer, crc16
+from decoder import RegisterDecoder
+from modbus_tcp import READ_HOLDING_REGISTERS, READ_REQUEST, build_frame
+from test_registers import DATA_FILE
+from validate_yaml import generate_registers, load_yaml
+
+CLIENT = (bytes([10, 0, 0, 1]), 40000)
+SERVER = (bytes([10, 0, 0, 2]), 502)
+TCP_PSH_ACK = 0x18
+TCP_SYN = 0x02
+
+def ethernet_packet(source, destination, sequence: int, payload: bytes, flags: int = TCP_PSH_ACK) -> bytes:
+    """An Ethernet frame carrying an IPv4 TCP segment, checksums left zero."""
+    tcp = struct.pack(">HHIIBBHHH", source[1], destination[1], sequence, 0, 5 << 4, flags, 65535, 0, 0) + payload
+    ip = struct.pack(">BBHHHBBH4s4s", 0x45, 0, 20 + len(tcp), 0, 0x4000, 64, 6, 0, source[0], destination[0]) + tcp
+    return bytes(12) + b"\x08\x00" + ip
+
+def write_pcap(path: str, packets):
+    with open(path, "wb") as f:
+        f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+        for i, packet in enumerate(packets):
+            f.write(struct.pack("<IIII", 1700000000 + i, 0, len(packet), len(packet)))
+            f.write(packet)
+
+def frames(framer: StreamFramer, *segments):
+    """Feeds ``(sequence, payload)`` segments and returns all frames as bytes."""
+    return [bytes(frame) for sequence, payload in segments for frame in framer.feed(memoryview(payload), sequence)]
+
+class StreamFramerTest(unittest.TestCase):
+    FRAME_1 = build_frame(1, 1, bytes([READ_HOLDING_REGISTERS, 4, 0, 1, 0, 2]))
+    FRAME_2 = build_frame(2, 1, bytes([READ_HOLDING_REGISTERS, 2, 0, 3]))
+
+    def test_frames_across_segments(self):
+        data = self.FRAME_1 + self.FRAME_2
+        self.assertEqual(frames(StreamFramer(), (100, data[:5]), (105, data[5:14]), (114, data[14:])), [self.FRAME_1, self.FRAME_2])
+
+    def test_without_sequence_numbers(self):
+        data = self.FRAME_1 + self.FRAME_2
+        self.assertEqual(frames(StreamFramer(), (None, data[:5]), (None, data[5:])), [self.FRAME_1, self.FRAME_2])
+
+    def test_retransmission_is_dropped(self):
+        half = len(self.FRAME_1) // 2
+        self.assertEqual(frames(StreamFramer(), (0, self.FRAME_1[:half]), (0, self.FRAME_1[:half]), (half, self.FRAME_1[half:])), [self.FRAME_1])
+        self.assertEqual(frames(StreamFramer(), (0, self.FRAME_1), (0, self.FRAME_1)), [self.FRAME_1])
+
+    def test_overlapping_retransmission(self):
+        # The retransmitted segment repeats the end of the first one and carries new bytes
+        data = self.FRAME_1 + self.FRAME_2
+        self.assertEqual(frames(StreamFramer(), (0, data[:8]), (4, data[4:])), [self.FRAME_1, self.FRAME_2])
+
+    def test_out_of_order_segments_are_held(self):
+        data = self.FRAME_1 + self.FRAME_2
+        self.assertEqual(frames(StreamFramer(sequence=0), (10, data[10:]), (5, data[5:10])), [])
+        framer = StreamFramer(sequence=0)
+        self.assertEqual(frames(framer, (10, data[10:]), (5, data[5:10]), (0, data[:5])), [self.FRAME_1, self.FRAME_2])
+
+    def test_lost_bytes_are_given_up(self):
+        framer = StreamFramer(sequence=0)
+        segments = [(len(self.FRAME_1) * (i + 1), self.FRAME_1) for i in range(MAX_HELD_SEGMENTS + 1)]
+        self.assertEqual(frames(framer, *segments), [self.FRAME_1] * (MAX_HELD_SEGMENTS + 1))
+        self.assertEqual(frames(framer, (0, self.FRAME_2)), [])
+
+    def test_sequence_wraps_around(self):
+        data = self.FRAME_1 + self.FRAME_2
+        self.assertEqual(frames(StreamFramer(), ((1 << 32) - 4, data[:10]), (6, data[10:]), (6, data[10:])), [self.FRAME_1, self.FRAME_2])
+
+    def test_rtu(self):
+        request = bytes([1]) + READ_REQUEST.pack(READ_HOLDING_REGISTERS, 0, 2)
+        request += crc16(request).to_bytes(2, "little")
+        self.assertEqual(frames(StreamFramer(rtu=True, request=True), (0, request[:3]), (3, request[3:])), [request])
+        corrupted = request[:-1] + bytes([request[-1] ^ 1])
+        self.assertEqual(frames(StreamFramer(rtu=True, request=True), (0, corrupted)), [])
+
+class CaptureDecoderTest(unittest.TestCase):
+    def setUp(self):
+        self.registers = generate_registers(load_yaml(DATA_FILE))
+        self.decoder = CaptureDecoder(self.registers)
+        self.values = {"Number_of_Cells": 2, "Battery_Voltage": 52.5, "Battery_SOC": 80.0, "Cell_Voltage": [3.25, 3.5], "Cell_Balance_Status": [True, False]}
+        self.image = RegisterDecoder(self.registers).encode(self.values, 2)
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "capture.pcap")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def exchange(self, transaction_id: int, address: int, count: int):
+        request = build_frame(transaction_id, 1, READ_REQUEST.pack(READ_HOLDING_REGISTERS, address, count))
+        response = build_frame(transaction_id, 1, bytes([READ_HOLDING_REGISTERS, 2 * count]) + bytes(self.image[2 * address:2 * (address + count)]))
+        return request, response
+
+    def test_decode_range(self):
+        values = self.decoder.decode_range(38, bytes(self.image[76:86]))
+        self.assertEqual(values["Battery_Voltage"], 52.5)
+        # Fields only partly covered are left out
+        self.assertEqual(set(values), {"Battery_Voltage", "Battery_Current"})
+        values = self.decoder.decode_range(80, bytes(self.image[160:172]))
+        self.assertEqual((values["Cell_Voltage_1"], values["Cell_Voltage_2"]), (3.25, 3.5))
+        self.assertEqual((values["Cell_Balance_Status_1"], values["Cell_Balance_Status_2"]), (True, False))
+
+    def test_retransmitted_response(self):
+        request_1, response_1 = self.exchange(1, 37, 7)
+        request_2, response_2 = self.exchange(2, 80, 6)
+        half = len(response_1) // 2
+        write_pcap(self.path, [
+            ethernet_packet(CLIENT, SERVER, 999, b"", TCP_SYN),
+            ethernet_packet(SERVER, CLIENT, 4999, b"", TCP_SYN | 0x10),
+            ethernet_packet(CLIENT, SERVER, 1000, request_1),
+            ethernet_packet(SERVER, CLIENT, 5000, response_1[:half]),
+            ethernet_packet(SERVER, CLIENT, 5000, response_1[:half]),
+            ethernet_packet(SERVER, CLIENT, 5000 + half, response_1[half:]),
+            ethernet_packet(CLIENT, SERVER, 1000 + len(request_1), request_2),
+            # Out of order: the second half arrives first
+            ethernet_packet(SERVER, CLIENT, 5000 + len(response_1) + 8, response_2[8:]),
+            ethernet_packet(SERVER, CLIENT, 5000 + len(response_1), response_2[:8]),
+        ])
+        records = list(self.decoder.records(self.path))
+        self.assertEqual([(record.address, record.count) for record in records], [(37, 7), (80, 6)])
+        self.assertEqual(records[0].server, "10.0.0.2:502")
+        self.assertEqual(records[0].values, {"Number_of_Cells": 2, "Battery_Voltage": 52.5, "Battery_Current": 0.0, "Battery_SOC": 80.0})
+        self.assertEqual(records[1].values["Cell_Voltage_2"], 3.5)
+
+    def test_main_writes_nan_as_null(self):
+        self.values["Battery_Voltage"] = math.nan
+        self.image = RegisterDecoder(self.registers).encode(self.values, 2)
+        request, response = self.exchange(1, 38, 2)
+        write_pcap(self.path, [ethernet_packet(CLIENT, SERVER, 0, request), ethernet_packet(SERVER, CLIENT, 0, response)])
+        output = os.path.join(self.directory.name, "records.jsonl")
+        with mock.patch("sys.argv", ["capture_replay.py", DATA_FILE, self.path, "-o", output, "--no-cache"]), contextlib.redirect_stderr(io.StringIO()):
+            capture_replay.main()
+        with open(output, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])["values"], {"Battery_Voltage": None})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+import struct
+import unittest
+from typing import Any, Dict
+from decoder import RegisterDecoder, words_to_bytes
+from validate_yaml import BaseType, Register, RegisterList, ValueType, generate_registers, load_yaml
+from test_registers import DATA_FILE, register_map
+
+# General fields at 2..9 with a reserved register at 4, two cell fields from address 12
+GENERAL = {"a": (2, "uint16"), "b": (3, "int8"), "c": (5, "int32"), "d": (7, "char[3]"), "e": (9, "bool[3]")}
+CELLS = {"v": (0, "float32"), "t": (2, "int16")}
+CELL_START = 12
+
+def image(cells):
+    """The register image from address 0 with voltages 3.5 + i and temperatures -i per cell."""
+    words = [0, 0, 513, 0x00FE, 0xFFFF, 0xFFFF, 0xFFFE, 0x4142, 0x4300, 0b101, 0, 0]
+    for i in range(cells):
+        high, low = struct.unpack(">HH", struct.pack(">f", 3.5 + i))
+        words.extend([high, low, (-i) & 0xFFFF])
+    return words
+
+GENERAL_VALUES = {"a": 513, "b": -2, "c": -2, "d": "ABC", "e": [True, False, True]}
+
+class DecoderTest(unittest.TestCase):
+    def setUp(self):
+        self.registers = register_map(GENERAL, CELLS, CELL_START)
+        self.decoder = RegisterDecoder(self.registers)
+
+    def test_words_to_bytes(self):
+        self.assertEqual(words_to_bytes([0x0102, 0xFFFE]), b"\x01\x02\xff\xfe")
+        self.assertEqual(words_to_bytes(b"\x01\x02"), b"\x01\x02")
+
+    def test_decode(self):
+        values = self.decoder.decode(image(3))
+        self.assertEqual(values, dict(GENERAL_VALUES, v=[3.5, 4.5, 5.5], t=[0, -1, -2]))
+        self.assertEqual(self.decoder.decode(image(3), 2)["t"], [0, -1])
+
+    def test_decode_general(self):
+        words = image(0)
+        self.assertEqual(self.decoder.decode_general(words), GENERAL_VALUES)
+        self.assertEqual(self.decoder.decode_general(words[2:], 2), GENERAL_VALUES)
+        with self.assertRaises(ValueError):
+            self.decoder.decode_general(words[3:], 3)
+
+    def test_decode_cells(self):
+        words = image(4)[CELL_START:]
+        self.assertEqual(self.decoder.decode_cells(words, 4), {"v": [3.5, 4.5, 5.5, 6.5], "t": [0, -1, -2, -3]})
+        self.assertEqual(self.decoder.decode_cells(image(2), 2, 0)["v"], [3.5, 4.5])
+        with self.assertRaises(ValueError):
+            self.decoder.decode_cells(words, 5)
+        with self.assertRaises(ValueError):
+            # Would slice the buffer from its end
+            self.decoder.decode_cells(image(10)[CELL_START:], 1, CELL_START + 20)
+
+    def test_register_subset(self):
+        decoder = RegisterDecoder(self.registers, ["c", "t"])
+        self.assertEqual(decoder.decode(image(2)), {"c": -2, "t": [0, -1]})
+        # The general block of the subset starts at its first field
+        self.assertEqual(decoder.decode_general(image(0)[5:], 5), {"c": -2})
+
+def sample_value(reg: Register, seed: int) -> Any:
+    """A value of the register's type that survives encoding unchanged."""
+    vt: ValueType = reg.value_type
+    if vt.base_type == BaseType.CHAR:
+        return "abcdefghijklmnopqrstuvwxyz"[seed % 26:][:vt.dimension]
+    if vt.base_type == BaseType.BOOL:
+        values = [(seed + i) % 3 == 0 for i in range(vt.dimension)]
+    elif vt.base_type in (BaseType.FLOAT32, BaseType.FLOAT64):
+        values = [(seed + i) * 0.5 for i in range(vt.dimension)]
+    elif vt.base_type.value.startswith("int"):
+        values = [-(seed + i) for i in range(vt.dimension)]
+    else:
+        values = [seed + i for i in range(vt.dimension)]
+    return values[0] if vt.dimension == 1 else values
+
+def sample_values(registers: RegisterList, number_of_cells: int) -> Dict[str, Any]:
+    values: Dict[str, Any] = {reg.id: sample_value(reg, seed) for seed, reg in enumerate(registers.general_registers)}
+    for seed, reg in enumerate(registers.cell_registers):
+        values[reg.id] = [sample_value(reg, seed + cell) for cell in range(number_of_cells)]
+    return values
+
+class RoundTripTest(unittest.TestCase):
+    """Checks that ``RegisterDecoder.decode`` inverts ``RegisterDecoder.encode``."""
+
+    def assertRoundTrip(self, registers: RegisterList, number_of_cells: int):
+        decoder = RegisterDecoder(registers)
+        values = sample_values(registers, number_of_cells)
+        image = decoder.encode(values, number_of_cells)
+        self.assertEqual(len(image), 2 * decoder.image_size(number_of_cells))
+        self.assertEqual(decoder.decode(image, number_of_cells), values)
+        self.assertEqual(decoder.decode(image), values)
+
+    def test_data_yaml(self):
+        registers = generate_registers(load_yaml(DATA_FILE))
+        for number_of_cells in (1, 2, 16):
+            self.assertRoundTrip(registers, number_of_cells)
+
+    def test_all_value_types(self):
+        general = {f"g{i}": ("auto", value_type) for i, value_type in enumerate(["int8", "uint8[3]", "char", "char[5]", "int16", "uint32", "int32[2]", "float32[2]", "float64", "bool", "bool[20]"])}
+        cells = {"a": (1, "int32"), "b": ("auto", "char[4]"), "c": (6, "bool[3]"), "d": ("auto", "float64")}
+        self.assertRoundTrip(register_map(general, cells), 3)
+
+    def test_image_size(self):
+        decoder = RegisterDecoder(register_map(GENERAL, CELLS, CELL_START))
+        # The image reaches at least to the cell start address
+        self.assertEqual(decoder.image_size(0), CELL_START)
+        self.assertEqual(decoder.image_size(3), CELL_START + 9)
+        self.assertEqual(RegisterDecoder(register_map(GENERAL, CELLS, 4)).image_size(1), 10)
+
+    def test_encode_matches_hand_packed_image(self):
+        decoder = RegisterDecoder(register_map(GENERAL, CELLS, CELL_START))
+        values = dict(GENERAL_VALUES, v=[3.5, 4.5], t=[0, -1])
+        words = image(2)
+        # Reserved registers are written as zero
+        words[4] = 0
+        self.assertEqual(decoder.encode(values, 2), words_to_bytes(words))
+
+    def test_general_block_not_at_zero(self):
+        registers = register_map({"a": (4, "uint16"), "b": ("auto", "float32")}, {"v": ("auto", "int16")}, 20)
+        self.assertRoundTrip(registers, 2)
+        decoder = RegisterDecoder(registers)
+        image = decoder.encode(sample_values(registers, 2), 2)
+        self.assertEqual(decoder.decode_general(image[8:], 4), {"a": 0, "b": 0.5})
+        with self.assertRaises(ValueError):
+            decoder.decode_general(image[10:], 5)
+
+if __name__ == "__main__":
+    unittest.main()
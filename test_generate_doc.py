@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from generate_doc import generate_documents, write_if_changed
+from test_registers import DATA_FILE
+from validate_yaml import generate_registers, load_yaml
+
+class WriteIfChangedTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "README.md")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def test_new_file(self):
+        self.assertTrue(write_if_changed(self.path, "a\n"))
+        self.assertEqual(self.read(), b"a\n")
+
+    def test_unchanged_file_is_not_touched(self):
+        write_if_changed(self.path, "a\n")
+        os.utime(self.path, (0, 0))
+        self.assertFalse(write_if_changed(self.path, "a\n"))
+        self.assertEqual(os.stat(self.path).st_mtime, 0)
+
+    def test_changed_file(self):
+        write_if_changed(self.path, "a\n")
+        self.assertTrue(write_if_changed(self.path, "b\n"))
+        self.assertEqual(self.read(), b"b\n")
+
+    def test_line_endings_are_kept(self):
+        self.assertTrue(write_if_changed(self.path, "a\r\nb\r\n"))
+        self.assertEqual(self.read(), b"a\r\nb\r\n")
+        self.assertFalse(write_if_changed(self.path, "a\r\nb\r\n"))
+        self.assertTrue(write_if_changed(self.path, "a\nb\n"))
+
+class GenerateDocumentsTest(unittest.TestCase):
+    def test_second_run_writes_nothing(self):
+        registers = generate_registers(load_yaml(DATA_FILE))
+        with tempfile.TemporaryDirectory() as directory:
+            outputs = {fmt: os.path.join(directory, f"registers.{fmt}") for fmt in ("markdown", "html", "csv", "json")}
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertTrue(all(generate_documents(registers, outputs).values()))
+                self.assertFalse(any(generate_documents(registers, outputs).values()))
+
+if __name__ == "__main__":
+    unittest.main()
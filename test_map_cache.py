@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+import map_cache
+import validate_yaml
+from map_cache import DEFAULT_SCHEMA_FILE, load_register_map, prune_cache, registers_from_dict, registers_to_dict
+from test_registers import DATA_FILE
+
+class MapCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.directory, "cache")
+        self.data_file = os.path.join(self.directory, "data.yaml")
+        shutil.copy(DATA_FILE, self.data_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def cache_files(self):
+        return sorted(os.listdir(self.cache_dir)) if os.path.isdir(self.cache_dir) else []
+
+    def assertSameMap(self, registers, other):
+        self.assertEqual(registers_to_dict(registers), registers_to_dict(other))
+
+    def test_round_trip(self):
+        registers = validate_yaml.generate_registers(validate_yaml.load_yaml(DATA_FILE))
+        self.assertSameMap(registers_from_dict(registers_to_dict(registers)), registers)
+
+    def test_miss_then_hit(self):
+        registers = load_register_map(self.data_file, DEFAULT_SCHEMA_FILE, self.cache_dir)
+        self.assertEqual(len(self.cache_files()), 1)
+        with mock.patch.object(map_cache, "build_register_map", side_effect=AssertionError("cache miss")):
+            self.assertSameMap(load_register_map(self.data_file, DEFAULT_SCHEMA_FILE, self.cache_dir), registers)
+
+    def test_changed_file_misses(self):
+        load_register_map(self.data_file, DEFAULT_SCHEMA_FILE, self.cache_dir)
+        with open(self.data_file, "a", encoding="utf-8") as f:
+            f.write("\n# changed\n")
+        with mock.patch.object(map_cache, "build_register_map", wraps=map_cache.build_register_map) as build:
+            load_register_map(self.data_file, DEFAULT_SCHEMA_FILE, self.cache_dir)
+        build.assert_called_once()
+        self.assertEqual(len(self.cache_files()), 2)
+
+    def test_corrupt_cache_file_is_rebuilt(self):
+        registers = load_register_map(self.data_file, DEFAULT_SCHEMA_FILE, self.cache_dir)
+        path = os.path.join(self.cache_dir, self.cache_files()[0])
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("{")
+        self.assertSameMap(load_register_map(self.data_file, DEFAULT_SCHEMA_FILE, self.cache_dir), registers)
+        self.assertIsNotNone(map_cache.read_cached_map(path))
+
+    def test_invalid_map_is_not_cached(self):
+        with open(self.data_file, "a", encoding="utf-8") as f:
+            f.write("# changed\n")
+        with mock.patch.object(validate_yaml.RegisterList, "find_address_overlaps", return_value=["conflict"]):
+            with self.assertRaises(ValueError):
+                load_register_map(self.data_file, DEFAULT_SCHEMA_FILE, self.cache_dir)
+        self.assertEqual(self.cache_files(), [])
+
+    def test_no_cache(self):
+        load_register_map(self.data_file, DEFAULT_SCHEMA_FILE, None)
+        self.assertEqual(self.cache_files(), [])
+
+    def test_prune_cache(self):
+        os.makedirs(self.cache_dir)
+        now = time.time()
+        for i in range(5):
+            path = os.path.join(self.cache_dir, f"{i}.json")
+            open(path, "w").close()
+            os.utime(path, (now - 10 * i, now - 10 * i))
+        prune_cache(self.cache_dir, 2)
+        self.assertEqual(self.cache_files(), ["0.json", "1.json"])
+
+    def test_validate_single_hit_skips_validation(self):
+        schema = validate_yaml.load_yaml(DEFAULT_SCHEMA_FILE)
+        with contextlib.redirect_stdout(io.StringIO()):
+            validate_yaml.validate_single(schema, self.data_file, DEFAULT_SCHEMA_FILE, self.cache_dir)
+        self.assertEqual(len(self.cache_files()), 1)
+        # The map cached by validate_single is a hit for the other tools
+        with mock.patch.object(map_cache, "build_register_map", side_effect=AssertionError("cache miss")):
+            load_register_map(self.data_file, DEFAULT_SCHEMA_FILE, self.cache_dir)
+        output = io.StringIO()
+        with mock.patch.object(validate_yaml, "load_yaml", side_effect=AssertionError("not cached")), contextlib.redirect_stdout(output):
+            validate_yaml.validate_single(schema, self.data_file, DEFAULT_SCHEMA_FILE, self.cache_dir)
+        self.assertIn("Alle Validierungen erfolgreich.", output.getvalue())
+
+if __name__ == "__main__":
+    unittest.main()
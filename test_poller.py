@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import math
+import socket
+import unittest
+from decoder import json_safe
+from modbus_tcp import ModbusError
+from poller import Device, Poller, parse_device
+from simulator import Simulator
+from test_registers import DATA_FILE
+from validate_yaml import generate_registers, load_yaml
+
+CELLS = 4
+
+class PollerTest(unittest.IsolatedAsyncioTestCase):
+    """Polls a local Simulator over TCP."""
+
+    async def asyncSetUp(self):
+        self.registers = generate_registers(load_yaml(DATA_FILE))
+        self.simulator = Simulator(self.registers, CELLS, units=2, port=0, unsupported=["Temperature_Sensor_4"])
+        await self.simulator.start()
+
+    async def asyncTearDown(self):
+        await self.simulator.close()
+
+    def device(self, unit_id: int = 1) -> Device:
+        return Device(f"unit {unit_id}", "127.0.0.1", self.simulator.port, unit_id, CELLS)
+
+    async def poll(self, device: Device, **kwargs):
+        poller = Poller(self.registers, [device], timeout=1.0, **kwargs)
+        try:
+            return await poller.poll_device(device)
+        finally:
+            await poller.close()
+
+    async def test_poll_device(self):
+        sample = await self.poll(self.device())
+        self.assertIsNone(sample.error)
+        self.assertEqual(sample.values["Number_of_Cells"], CELLS)
+        self.assertEqual(len(sample.values["Cell_Voltage"]), CELLS)
+        self.assertAlmostEqual(sample.values["Battery_Voltage"], sum(sample.values["Cell_Voltage"]), places=3)
+        self.assertEqual(sample.values["Modbus_Version"], str(self.registers.version))
+
+    async def test_register_subset(self):
+        sample = await self.poll(self.device(), register_ids=["Battery_SOC", "Cell_Voltage_2", "Cell_Balance_Status"])
+        self.assertEqual(set(sample.values), {"Battery_SOC", "Cell_Voltage", "Cell_Balance_Status"})
+        self.assertEqual([value is None for value in sample.values["Cell_Voltage"]], [True, False, True, True])
+        self.assertNotIn(None, sample.values["Cell_Balance_Status"])
+
+    def test_unknown_register_id(self):
+        with self.assertRaises(ValueError):
+            Poller(self.registers, [self.device()], register_ids=["Cell_Voltage_5"])
+        with self.assertRaises(ValueError):
+            Poller(self.registers, [self.device()], interval=0)
+
+    async def test_probe_capabilities(self):
+        sample = await self.poll(self.device(), probe_capabilities=True)
+        self.assertIsNone(sample.error)
+        self.assertNotIn("Temperature_Sensor_4", sample.values)
+        self.assertIn("Temperature_Sensor_3", sample.values)
+
+    async def test_unknown_unit_is_an_error_sample(self):
+        sample = await self.poll(self.device(3))
+        self.assertIsInstance(sample.error, ModbusError)
+        self.assertEqual(sample.values, {})
+
+    async def test_refused_connection_is_an_error_sample(self):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        sample = await self.poll(Device("closed", "127.0.0.1", port))
+        self.assertIsInstance(sample.error, OSError)
+
+    async def test_samples(self):
+        devices = [self.device(1), self.device(2)]
+        poller = Poller(self.registers, devices, interval=0.05, timeout=1.0)
+        samples = poller.samples()
+        try:
+            received = [await samples.__anext__() for _ in range(6)]
+        finally:
+            await samples.aclose()
+            await poller.close()
+        self.assertEqual({sample.device.name for sample in received}, {"unit 1", "unit 2"})
+        self.assertTrue(all(sample.error is None for sample in received))
+
+    async def test_dead_poll_task_is_raised(self):
+        poller = Poller(self.registers, [self.device()], interval=0.05)
+
+        async def fail(device, queue):
+            raise RuntimeError("poll task died")
+
+        poller._poll_forever = fail
+        samples = poller.samples()
+        with self.assertRaisesRegex(RuntimeError, "poll task died"):
+            await asyncio.wait_for(samples.__anext__(), 1.0)
+        await poller.close()
+
+class ParseDeviceTest(unittest.TestCase):
+    def test_parse_device(self):
+        device = parse_device("10.0.0.5:5020/3@48")
+        self.assertEqual((device.host, device.port, device.unit_id, device.number_of_cells), ("10.0.0.5", 5020, 3, 48))
+        device = parse_device("gateway")
+        self.assertEqual((device.host, device.port, device.unit_id, device.number_of_cells), ("gateway", 502, 1, 16))
+
+class JsonSafeTest(unittest.TestCase):
+    def test_nan_becomes_null(self):
+        values = {"Battery_Voltage": math.nan, "Cell_Voltage": [3.3, math.nan, math.inf], "Number_of_Cells": 4, "Cell_Balance_Status": [True]}
+        self.assertEqual(json.dumps(json_safe(values), allow_nan=False), '{"Battery_Voltage": null, "Cell_Voltage": [3.3, null, null], "Number_of_Cells": 4, "Cell_Balance_Status": [true]}')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+import os
+import subprocess
+import sys
+import unittest
+from read_plan import MAX_READ_REGISTERS, plan_reads, register_spans
+from test_registers import register_map
+
+class ReadPlanTest(unittest.TestCase):
+    def setUp(self):
+        # General fields 0..1 and 5..6, cells of 3 registers from address 10
+        self.registers = register_map({"a": (0, "uint32"), "b": (5, "float32")}, {"v": (0, "uint16"), "t": (1, "int32")}, 10)
+
+    def plan(self, *args, **kwargs):
+        return [(request.address, request.count, request.register_ids) for request in plan_reads(self.registers, *args, **kwargs)]
+
+    def test_register_spans(self):
+        self.assertEqual(register_spans(self.registers, 2), [(0, 2, "a"), (5, 2, "b"), (10, 1, "v_1"), (11, 2, "t_1"), (13, 1, "v_2"), (14, 2, "t_2")])
+        self.assertEqual(register_spans(self.registers, 3, ["b", "t_2", "v"]), [(5, 2, "b"), (10, 1, "v_1"), (13, 1, "v_2"), (14, 2, "t_2"), (16, 1, "v_3")])
+
+    def test_unknown_register_id(self):
+        for id in ("x", "v_0", "v_3", "v_x"):
+            with self.assertRaises(ValueError):
+                register_spans(self.registers, 2, [id])
+
+    def test_contiguous_fields_are_merged(self):
+        self.assertEqual(self.plan(2), [(0, 2, ["a"]), (5, 2, ["b"]), (10, 6, ["v_1", "t_1", "v_2", "t_2"])])
+
+    def test_gap(self):
+        self.assertEqual(self.plan(2, max_gap=2), [(0, 2, ["a"]), (5, 2, ["b"]), (10, 6, ["v_1", "t_1", "v_2", "t_2"])])
+        self.assertEqual(self.plan(2, max_gap=3), [(0, 16, ["a", "b", "v_1", "t_1", "v_2", "t_2"])])
+        self.assertEqual(self.plan(3, ["v"], max_gap=1), [(10, 1, ["v_1"]), (13, 1, ["v_2"]), (16, 1, ["v_3"])])
+        self.assertEqual(self.plan(3, ["v"], max_gap=2), [(10, 7, ["v_1", "v_2", "v_3"])])
+
+    def test_max_count(self):
+        self.assertEqual(self.plan(2, max_count=4), [(0, 2, ["a"]), (5, 2, ["b"]), (10, 4, ["v_1", "t_1", "v_2"]), (14, 2, ["t_2"])])
+        with self.assertRaises(ValueError):
+            self.plan(2, max_count=MAX_READ_REGISTERS + 1)
+        with self.assertRaises(ValueError):
+            self.plan(2, max_gap=-1)
+
+    def test_large_field_is_split(self):
+        registers = register_map({"a": (0, "uint16"), "s": (1, "uint16[300]")}, {})
+        requests = plan_reads(registers, 0)
+        self.assertEqual([(r.address, r.count) for r in requests], [(0, 1), (1, 125), (126, 125), (251, 50)])
+        self.assertTrue(all(r.count <= MAX_READ_REGISTERS for r in requests))
+
+    def test_every_register_is_read(self):
+        registers = register_map({f"g{i}": (3 * i, "float32") for i in range(100)}, {"v": (0, "uint16"), "t": (2, "float64")}, 400)
+        for gap in (0, 1, 5):
+            requests = plan_reads(registers, 49, max_gap=gap)
+            read = {address for r in requests for address in range(r.address, r.end)}
+            for address, size, id in register_spans(registers, 49):
+                self.assertTrue(set(range(address, address + size)) <= read, id)
+            self.assertTrue(all(r.count <= MAX_READ_REGISTERS for r in requests))
+
+    def test_main_reports_unknown_register_id(self):
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "read_plan.py")
+        data_file = os.path.join(os.path.dirname(script), "data.yaml")
+        result = subprocess.run([sys.executable, script, data_file, "--no-cache", "-r", "SOC"], capture_output=True, text=True)
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("Unknown register id: SOC", result.stderr)
+        self.assertNotIn("Traceback", result.stderr)
+
+if __name__ == "__main__":
+    unittest.main()
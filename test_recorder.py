@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+import math
+import os
+import tempfile
+import unittest
+from recorder import LAYOUT_FILE, Recorder
+from test_registers import DATA_FILE
+from validate_yaml import generate_registers, load_yaml
+
+CELLS = 3
+
+def sample(i: int):
+    return {
+        "Battery_Voltage": 10.0 + i,
+        "Number_of_Cells": CELLS,
+        "Serial_Number": f"SN{i}",
+        "Charge_FET": i % 2 == 0,
+        "Cell_Voltage": [3.0 + i / 100, 3.1, 3.2],
+        "Cell_Balance_Status": [True, False, True],
+    }
+
+class RecorderTest(unittest.TestCase):
+    def setUp(self):
+        self.registers = generate_registers(load_yaml(DATA_FILE))
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "unit")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def recorder(self, capacity: int = 4, **kwargs) -> Recorder:
+        return Recorder(self.path, self.registers, CELLS, capacity, **kwargs)
+
+    def test_window(self):
+        with self.recorder(capacity=10) as recorder:
+            for i in range(5):
+                recorder.append(1000.0 + i, sample(i))
+            window = recorder.window("Battery_Voltage", 1001, 1003)
+            self.assertEqual(list(window.timestamps), [1001.0, 1002.0])
+            self.assertEqual(list(window.values), [11.0, 12.0])
+            self.assertEqual(len(recorder.window("Battery_Voltage")), 5)
+            self.assertEqual(len(recorder.window("Battery_Voltage", 2000)), 0)
+            cells = recorder.window("Cell_Voltage", 1003)
+            self.assertEqual(cells.width, CELLS)
+            self.assertEqual([round(v, 2) for v in cells.column(0)], [3.03, 3.04])
+            self.assertEqual(len(cells.rows()), 2)
+            self.assertEqual(list(recorder.window("Charge_FET").values), [1, 0, 1, 0, 1])
+            self.assertEqual(bytes(recorder.window("Serial_Number", 1004).values), b"SN4\0\0\0\0\0")
+
+    def test_wraparound(self):
+        with self.recorder() as recorder:
+            for i in range(7):
+                recorder.append(1000.0 + i, sample(i))
+            self.assertEqual(recorder.count, 4)
+            self.assertEqual(list(recorder.window("Battery_Voltage").timestamps), [1003.0, 1004.0, 1005.0, 1006.0])
+            self.assertEqual(list(recorder.window("Battery_Voltage", 1004, 1006).values), [14.0, 15.0])
+            self.assertEqual(list(recorder.last("Battery_Voltage", 1.5).timestamps), [1005.0, 1006.0])
+
+    def test_missing_fields_do_not_keep_old_laps(self):
+        with self.recorder() as recorder:
+            for i in range(5):
+                recorder.append(1000.0 + i, sample(i))
+            # Lands in the ring slot of t=1001
+            values = sample(5)
+            del values["Battery_Voltage"], values["Number_of_Cells"]
+            values["Cell_Voltage"] = [None, 3.1, 3.2]
+            recorder.append(1005.0, values)
+            window = recorder.window("Battery_Voltage", 1005)
+            self.assertEqual(list(window.timestamps), [1005.0])
+            self.assertTrue(math.isnan(window.values[0]))
+            self.assertEqual(list(recorder.window("Number_of_Cells", 1005).values), [0])
+            self.assertTrue(math.isnan(recorder.window("Cell_Voltage", 1005).values[0]))
+
+    def test_continue_recording(self):
+        with self.recorder() as recorder:
+            recorder.append(1000.0, sample(0))
+        with self.recorder() as recorder:
+            recorder.append(1001.0, sample(1))
+            self.assertEqual(list(recorder.window("Battery_Voltage").values), [10.0, 11.0])
+        with self.assertRaises(ValueError):
+            self.recorder(capacity=8)
+
+    def test_register_subset(self):
+        with self.recorder(register_ids=["Battery_Voltage", "Cell_Voltage"]) as recorder:
+            recorder.append(1000.0, sample(0))
+            self.assertEqual(set(recorder.columns), {"timestamp", "Battery_Voltage", "Cell_Voltage"})
+            with self.assertRaises(KeyError):
+                recorder.window("Battery_SOC")
+        self.assertTrue(os.path.exists(os.path.join(self.path, LAYOUT_FILE)))
+
+    def test_capacity(self):
+        with self.assertRaises(ValueError):
+            self.recorder(capacity=0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+import os
+import random
+import re
+import unittest
+from typing import Any, Dict, Set
+from validate_yaml import RegisterList, ValueType, generate_registers, load_yaml
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data.yaml")
+
+def register_map(general: Dict[str, Any], cells: Dict[str, Any], cell_address: Any = "auto") -> RegisterList:
+    """
+    Builds a register map from ``{id: (address, ValueType)}`` dictionaries, ``auto`` addresses allowed.
+    """
+    return generate_registers({
+        "version": "1.0.0",
+        "general": {"registers": {id: {"address": address, "ValueType": value_type} for id, (address, value_type) in general.items()}},
+        "cells": {"address": cell_address, "registers": {id: {"offset": offset, "ValueType": value_type} for id, (offset, value_type) in cells.items()}},
+    })
+
+def has_materialised_overlap(registers: RegisterList, number_of_cells: int) -> bool:
+    """The brute-force check: marks every address of every register of all cells."""
+    used = set()
+    for reg in registers.get_all_registers(number_of_cells):
+        for address in range(reg.address, reg.address + reg.value_type.registers_required()):
+            if address in used:
+                return True
+            used.add(address)
+    return False
+
+def general_registers_overlapping_cells(registers: RegisterList, number_of_cells: int) -> Set[str]:
+    """The names of the general registers sharing an address with a cell field, by brute force."""
+    cell_addresses = set()
+    for reg in registers.get_all_registers(number_of_cells)[len(registers.general_registers):]:
+        cell_addresses.update(range(reg.address, reg.address + reg.value_type.registers_required()))
+    return {reg.name for reg in registers.general_registers if cell_addresses.intersection(range(reg.address, reg.address + reg.value_type.registers_required()))}
+
+class AddressOverlapTest(unittest.TestCase):
+    """Compares ``find_address_overlaps`` with the brute-force check over ``get_all_registers``."""
+
+    def assertMatchesMaterialised(self, registers: RegisterList, number_of_cells: int, overlapping: bool):
+        self.assertEqual(has_materialised_overlap(registers, number_of_cells), overlapping)
+        self.assertEqual(bool(registers.find_address_overlaps(number_of_cells)), overlapping)
+
+    def test_data_yaml(self):
+        registers = generate_registers(load_yaml(DATA_FILE))
+        for number_of_cells in (0, 1, 2, 49):
+            self.assertMatchesMaterialised(registers, number_of_cells, False)
+
+    def test_general_registers_overlap(self):
+        registers = register_map({"a": (0, "uint32"), "b": (1, "uint16")}, {"v": ("auto", "uint16")})
+        self.assertMatchesMaterialised(registers, 2, True)
+
+    def test_general_register_inside_long_register(self):
+        # "c" does not overlap "b" but the longer "a" that reaches past both
+        registers = register_map({"a": (0, "uint16[8]"), "b": (1, "uint16"), "c": (5, "uint16")}, {})
+        self.assertEqual(len(registers.find_address_overlaps(0)), 2)
+        self.assertMatchesMaterialised(registers, 0, True)
+
+    def test_cell_field_beyond_cell_size(self):
+        # The cell size ends after "b", so the array of "a" reaches into the next cell
+        registers = register_map({"x": ("auto", "uint16")}, {"a": (0, "uint16[4]"), "b": (2, "uint16")})
+        self.assertMatchesMaterialised(registers, 1, True)
+        self.assertMatchesMaterialised(registers, 2, True)
+
+    def test_general_register_overlapping_field_beyond_last_cell(self):
+        # "a" of the only cell reaches to address 14, past the cell size of 3
+        registers = register_map({"x": (0, "uint16"), "y": (13, "uint16")}, {"a": (0, "uint16[4]"), "b": (2, "uint16")}, 10)
+        conflicts = registers.find_address_overlaps(1)
+        self.assertTrue(any("'a 1'" in conflict and "'y'" in conflict for conflict in conflicts), conflicts)
+        self.assertTrue(any("'a 1'" in conflict and "'b 1'" in conflict for conflict in conflicts), conflicts)
+
+    def test_general_register_overlapping_several_cells(self):
+        registers = register_map({"x": (0, "uint16"), "y": (11, "uint16[5]")}, {"a": (0, "uint16"), "b": (1, "uint16")}, 10)
+        conflicts = registers.find_address_overlaps(4)
+        self.assertEqual(len(conflicts), 3, conflicts)
+
+    def test_general_register_inside_cells(self):
+        registers = register_map({"x": (0, "uint16"), "y": (15, "uint32")}, {"a": (0, "uint16"), "b": (1, "float32")}, 10)
+        self.assertMatchesMaterialised(registers, 1, False)
+        self.assertMatchesMaterialised(registers, 2, True)
+
+    def test_general_register_in_cell_gap(self):
+        # Offset 1 of every cell is reserved, address 14 is offset 1 of cell 2
+        registers = register_map({"x": (0, "uint16"), "y": (14, "uint16")}, {"a": (0, "uint16"), "b": (2, "uint16")}, 10)
+        self.assertMatchesMaterialised(registers, 3, False)
+
+    def test_general_register_after_cells(self):
+        registers = register_map({"x": (0, "uint16"), "y": (16, "uint16")}, {"a": (0, "uint16"), "b": (1, "uint16")}, 10)
+        self.assertMatchesMaterialised(registers, 3, False)
+        self.assertMatchesMaterialised(registers, 4, True)
+
+    def test_random_maps(self):
+        rng = random.Random(0)
+        value_types = ["uint16", "int32", "float64", "char[3]", "uint16[4]", "bool[20]"]
+        for _ in range(300):
+            general = {f"g{i}": (rng.randrange(40), rng.choice(value_types)) for i in range(rng.randint(1, 6))}
+            cells = {f"c{i}": (rng.randrange(8), rng.choice(value_types)) for i in range(rng.randint(0, 4))}
+            registers = register_map(general, cells, rng.randrange(30))
+            number_of_cells = rng.randint(0, 5)
+            conflicts = registers.find_address_overlaps(number_of_cells)
+            context = (general, cells, registers.cell_start_address, number_of_cells)
+            self.assertEqual(bool(conflicts), has_materialised_overlap(registers, number_of_cells), context)
+            # Every general register overlapping a cell is reported with a cell field
+            for name in general_registers_overlapping_cells(registers, number_of_cells):
+                self.assertTrue(any(re.search(f"'{name}' .* 'c\\d+ \\d+'", conflict) for conflict in conflicts), (name, context))
+
+class RegisterViewTest(unittest.TestCase):
+    def setUp(self):
+        # Cells of 4 registers from address 20 with a reserved offset 1
+        self.registers = register_map({"a": (0, "uint16"), "b": (2, "float32"), "c": ("auto", "char[6]")}, {"v": (0, "uint16"), "t": (2, "float32")}, 20)
+        self.view = self.registers.view(3)
+
+    def test_sequence(self):
+        self.assertEqual(len(self.view), 9)
+        self.assertEqual([reg.id for reg in self.view], ["a", "b", "c", "v_1", "t_1", "v_2", "t_2", "v_3", "t_3"])
+        self.assertEqual([reg.address for reg in self.view], [0, 2, 4, 20, 22, 24, 26, 28, 30])
+        self.assertEqual(self.view[-1].name, "t 3")
+        self.assertEqual([reg.id for reg in self.view[2:6:2]], ["c", "t_1"])
+        with self.assertRaises(IndexError):
+            self.view[9]
+
+    def test_register_at(self):
+        owners = {}
+        for reg in self.registers.get_all_registers(3):
+            for address in range(reg.address, reg.address + reg.value_type.registers_required()):
+                owners[address] = reg.id
+        for address in range(-1, 40):
+            reg = self.view.register_at(address)
+            self.assertEqual(reg.id if reg is not None else None, owners.get(address), address)
+
+    def test_by_id(self):
+        self.assertEqual(self.view.by_id("b").address, 2)
+        self.assertEqual(self.view.by_id("t_2").address, 26)
+        self.assertEqual(self.view.by_id("v_3").name, "v 3")
+        for id in ("x", "v", "v_0", "v_4", "t_x"):
+            with self.assertRaises(KeyError):
+                self.view.by_id(id)
+
+    def test_view_does_not_change_the_map(self):
+        registers = RegisterList()
+        registers.add_register("a", "a", ValueType.from_str("uint16"), 0)
+        registers.add_cell_registers("v", "v", ValueType.from_str("uint16"), "auto")
+        # Without a cell start address the cells follow the general registers
+        self.assertEqual(registers.view(2).by_id("v_2").address, 2)
+        self.assertIsNone(registers.cell_start_address)
+
+if __name__ == "__main__":
+    unittest.main()
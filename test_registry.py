@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+import unittest
+from semantic_version import Version
+from registry import DecoderRegistry, FieldChange, breaking_changes, diff_register_maps
+from test_registers import register_map
+from validate_yaml import RegisterList
+
+def versioned_map(version: str) -> RegisterList:
+    registers = register_map({"a": (0, "uint16")}, {"v": ("auto", "float32")})
+    registers.version = Version(version)
+    return registers
+
+class ResolveTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = DecoderRegistry(cache_size=2)
+        for version in ("1.0.0", "1.2.0", "1.3.1", "2.0.0"):
+            self.registry.add(versioned_map(version))
+
+    def test_exact_match(self):
+        self.assertEqual(self.registry.resolve("1.2.0"), Version("1.2.0"))
+
+    def test_newest_older_map_of_the_same_major_version(self):
+        self.assertEqual(self.registry.resolve("1.2.5"), Version("1.2.0"))
+        self.assertEqual(self.registry.resolve("1.9"), Version("1.3.1"))
+        self.assertEqual(self.registry.resolve(Version("2.4.0")), Version("2.0.0"))
+
+    def test_no_match(self):
+        for version in ("0.9.0", "3.0.0"):
+            with self.assertRaises(KeyError):
+                self.registry.resolve(version)
+        registry = DecoderRegistry()
+        registry.add(versioned_map("1.2.0"))
+        with self.assertRaises(KeyError):
+            registry.resolve("1.1.0")
+
+    def test_allow_newer(self):
+        self.registry.allow_newer = True
+        self.registry.maps.pop(Version("1.0.0"))
+        self.assertEqual(self.registry.resolve("1.1.0"), Version("1.2.0"))
+        with self.assertRaises(KeyError):
+            self.registry.resolve("0.1.0")
+
+    def test_decoder_cache(self):
+        decoder = self.registry.decoder("1.2.0")
+        self.assertIs(self.registry.decoder("1.2.7"), decoder)
+        self.registry.decoder("1.0.0")
+        self.registry.decoder("1.2.0")
+        self.registry.decoder("2.0.0")
+        self.assertEqual(list(self.registry._decoders), [Version("1.2.0"), Version("2.0.0")])
+        self.registry.add(versioned_map("1.2.0"))
+        self.assertIsNot(self.registry.decoder("1.2.0"), decoder)
+
+    def test_map_without_version(self):
+        registers = versioned_map("1.0.0")
+        registers.version = None
+        with self.assertRaises(ValueError):
+            self.registry.add(registers)
+
+class DiffTest(unittest.TestCase):
+    def kinds(self, changes):
+        return sorted((c.block, c.id, c.kind) for c in changes)
+
+    def test_identical_maps(self):
+        self.assertEqual(diff_register_maps(versioned_map("1.0.0"), versioned_map("1.1.0")), [])
+
+    def test_changes(self):
+        old = register_map({"a": (0, "uint16"), "b": (1, "uint16"), "c": (2, "uint16"), "d": (3, "uint16")}, {"v": (0, "float32"), "t": (2, "int16")}, cell_address=10)
+        new = register_map({"a": (0, "int16"), "b": (1, "uint32"), "d": (4, "uint16"), "e": (5, "uint16")}, {"v": (0, "float32"), "t": (2, "int16"), "s": (3, "uint16")}, cell_address=10)
+        changes = diff_register_maps(old, new)
+        self.assertEqual(self.kinds(changes), [
+            ("cell", "cells", FieldChange.MOVED),
+            ("cell", "s", FieldChange.ADDED),
+            ("general", "a", FieldChange.RETYPED),
+            ("general", "b", FieldChange.RESIZED),
+            ("general", "b", FieldChange.RETYPED),
+            ("general", "c", FieldChange.REMOVED),
+            ("general", "d", FieldChange.MOVED),
+            ("general", "e", FieldChange.ADDED),
+        ])
+        # Added fields and a retyped field of the same length are allowed within a major version
+        self.assertEqual(self.kinds(breaking_changes(changes)), [
+            ("cell", "cells", FieldChange.MOVED),
+            ("general", "b", FieldChange.RESIZED),
+            ("general", "b", FieldChange.RETYPED),
+            ("general", "c", FieldChange.REMOVED),
+            ("general", "d", FieldChange.MOVED),
+        ])
+
+    def test_compatible_changes(self):
+        old = register_map({"a": (0, "uint16")}, {"v": (0, "float32")}, cell_address=10)
+        new = register_map({"a": (0, "int16"), "b": (1, "uint16")}, {"v": (0, "float32")}, cell_address=10)
+        self.assertEqual(breaking_changes(diff_register_maps(old, new)), [])
+
+    def test_str(self):
+        old = register_map({"a": (0, "uint16")}, {})
+        new = register_map({"a": (1, "uint16")}, {})
+        self.assertEqual(str(diff_register_maps(old, new)[0]), "moved    general a: 0 uint16 -> 1 uint16")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+import struct
+import unittest
+from decoder import RegisterDecoder
+from modbus_tcp import ILLEGAL_DATA_ADDRESS, ILLEGAL_DATA_VALUE, ILLEGAL_FUNCTION, READ_COILS, READ_HOLDING_REGISTERS
+from simulator import GATEWAY_TARGET_FAILED, Simulator
+from test_registers import DATA_FILE
+from validate_yaml import generate_registers, load_yaml
+
+class SimulatorRequestTest(unittest.TestCase):
+    """Answers request PDUs without a server."""
+
+    def setUp(self):
+        self.registers = generate_registers(load_yaml(DATA_FILE))
+        self.simulator = Simulator(self.registers, 4, units=2, unsupported=["Charge_FET"])
+        self.decoder = RegisterDecoder(self.registers)
+
+    def request(self, function_code: int, address: int, count: int, unit_id: int = 1) -> bytes:
+        return self.simulator.handle_request(unit_id, struct.pack(">BHH", function_code, address, count))
+
+    def test_read_holding_registers(self):
+        size = self.decoder.image_size(4)
+        words = b""
+        for address in range(0, size, 100):
+            response = self.request(READ_HOLDING_REGISTERS, address, min(100, size - address))
+            self.assertEqual(response[:2], bytes([READ_HOLDING_REGISTERS, 2 * min(100, size - address)]))
+            words += response[2:]
+        values = self.decoder.decode(words)
+        self.assertEqual(values["Number_of_Cells"], 4)
+        self.assertEqual(len(values["Cell_Voltage"]), 4)
+
+    def test_read_coils(self):
+        coils = {reg.id: reg.hardware_support_register for reg in self.registers.general_registers if reg.hardware_support_register is not None}
+        count = max(coil.address for coil in self.registers.coils) + 1
+        response = self.request(READ_COILS, 0, count)
+        self.assertEqual(response[:2], bytes([READ_COILS, (count + 7) // 8]))
+        data = response[2:]
+        self.assertEqual(data[coils["Charge_FET"] // 8] >> (coils["Charge_FET"] % 8) & 1, 0)
+        self.assertEqual(data[coils["Discharge_FET"] // 8] >> (coils["Discharge_FET"] % 8) & 1, 1)
+
+    def test_exceptions(self):
+        size = self.decoder.image_size(4)
+        self.assertEqual(self.request(READ_HOLDING_REGISTERS, size - 1, 2), bytes([READ_HOLDING_REGISTERS | 0x80, ILLEGAL_DATA_ADDRESS]))
+        self.assertEqual(self.request(READ_HOLDING_REGISTERS, 0, 126), bytes([READ_HOLDING_REGISTERS | 0x80, ILLEGAL_DATA_VALUE]))
+        self.assertEqual(self.request(0x06, 0, 1), bytes([0x86, ILLEGAL_FUNCTION]))
+        self.assertEqual(self.request(READ_HOLDING_REGISTERS, 0, 1, unit_id=3), bytes([READ_HOLDING_REGISTERS | 0x80, GATEWAY_TARGET_FAILED]))
+        self.assertEqual(self.simulator.handle_request(1, bytes([READ_HOLDING_REGISTERS, 0])), bytes([READ_HOLDING_REGISTERS | 0x80, ILLEGAL_DATA_VALUE]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+import math
+import unittest
+from poller import Device, Sample
+from subscription import ChangeFilter, parse_deadband, subscribe
+from test_registers import DATA_FILE
+from validate_yaml import generate_registers, load_yaml
+
+class ChangeFilterTest(unittest.TestCase):
+    def setUp(self):
+        self.registers = generate_registers(load_yaml(DATA_FILE))
+
+    def test_first_sample_is_emitted_completely(self):
+        change_filter = ChangeFilter(self.registers)
+        values = {"Battery_Voltage": 52.0, "Modbus_Version": "1.0.0", "Cell_Voltage": [3.25, 3.26]}
+        self.assertEqual(change_filter.changes("a", values), {"Battery_Voltage": 52.0, "Modbus_Version": "1.0.0", "Cell_Voltage_1": 3.25, "Cell_Voltage_2": 3.26})
+        self.assertEqual(change_filter.changes("a", values), {})
+        # Every source is filtered on its own
+        self.assertEqual(len(change_filter.changes("b", values)), 4)
+
+    def test_deadbands(self):
+        change_filter = ChangeFilter(self.registers, deadbands={"Battery_Voltage": 0.5, "Cell_Voltage": 0.01}, unit_deadbands={"%": 1.0}, default_deadband=0.1)
+        change_filter.changes("a", {"Battery_Voltage": 52.0, "Battery_SOC": 80.0, "Battery_Current": 1.0, "Cell_Voltage": [3.25]})
+        self.assertEqual(change_filter.changes("a", {"Battery_Voltage": 52.3, "Battery_SOC": 80.5, "Battery_Current": 1.05, "Cell_Voltage": [3.255]}), {})
+        self.assertEqual(change_filter.changes("a", {"Battery_Voltage": 52.6, "Battery_SOC": 81.5, "Battery_Current": 1.2, "Cell_Voltage": [3.27]}), {"Battery_Voltage": 52.6, "Battery_SOC": 81.5, "Battery_Current": 1.2, "Cell_Voltage_1": 3.27})
+
+    def test_drift_adds_up(self):
+        change_filter = ChangeFilter(self.registers, deadbands={"Battery_Voltage": 0.5})
+        change_filter.changes("a", {"Battery_Voltage": 52.0})
+        self.assertEqual(change_filter.changes("a", {"Battery_Voltage": 52.3}), {})
+        self.assertEqual(change_filter.changes("a", {"Battery_Voltage": 52.6}), {"Battery_Voltage": 52.6})
+
+    def test_equality_fields(self):
+        change_filter = ChangeFilter(self.registers, default_deadband=10.0)
+        change_filter.changes("a", {"Charge_FET": True, "Serial_Number": "A1", "Number_of_Cells": 4})
+        self.assertEqual(change_filter.changes("a", {"Charge_FET": False, "Serial_Number": "A2", "Number_of_Cells": 4}), {"Charge_FET": False, "Serial_Number": "A2"})
+
+    def test_nan_transitions(self):
+        change_filter = ChangeFilter(self.registers, default_deadband=1.0)
+        change_filter.changes("a", {"Battery_Voltage": 52.0})
+        changed = change_filter.changes("a", {"Battery_Voltage": math.nan})
+        self.assertTrue(math.isnan(changed["Battery_Voltage"]))
+        self.assertEqual(change_filter.changes("a", {"Battery_Voltage": math.nan}), {})
+        self.assertEqual(change_filter.changes("a", {"Battery_Voltage": 52.0}), {"Battery_Voltage": 52.0})
+
+    def test_cells_not_polled_are_skipped(self):
+        change_filter = ChangeFilter(self.registers)
+        self.assertEqual(change_filter.changes("a", {"Cell_Voltage": [None, 3.3, None]}), {"Cell_Voltage_2": 3.3})
+        self.assertEqual(change_filter.changes("a", {"Cell_Voltage": [3.2, None, None]}), {"Cell_Voltage_1": 3.2})
+
+    def test_reset(self):
+        change_filter = ChangeFilter(self.registers)
+        values = {"Battery_Voltage": 52.0}
+        change_filter.changes("a", values)
+        change_filter.changes("b", values)
+        change_filter.reset("a")
+        self.assertEqual(change_filter.changes("a", values), values)
+        self.assertEqual(change_filter.changes("b", values), {})
+        change_filter.reset()
+        self.assertEqual(change_filter.changes("b", values), values)
+
+    def test_unknown_deadband_id(self):
+        with self.assertRaises(ValueError):
+            ChangeFilter(self.registers, deadbands={"Cell_Voltage_1": 0.01})
+
+    def test_parse_deadband(self):
+        self.assertEqual(parse_deadband("Cell_Voltage=0.005"), ("Cell_Voltage", 0.005))
+        self.assertEqual(parse_deadband("m=s=2"), ("m=s", 2.0))
+        for spec in ("Cell_Voltage", "=1", "Cell_Voltage=x"):
+            with self.assertRaises(ValueError):
+                parse_deadband(spec)
+
+class SubscribeTest(unittest.IsolatedAsyncioTestCase):
+    async def test_subscribe(self):
+        device = Device("a", "localhost")
+        error = OSError("refused")
+
+        async def samples():
+            yield Sample(device, 1.0, {"Battery_Voltage": 52.0})
+            yield Sample(device, 2.0, {"Battery_Voltage": 52.0})
+            yield Sample(device, 3.0, {}, error=error)
+            yield Sample(device, 4.0, {"Battery_Voltage": 53.0})
+
+        change_filter = ChangeFilter(generate_registers(load_yaml(DATA_FILE)))
+        received = [sample async for sample in subscribe(samples(), change_filter)]
+        self.assertEqual([sample.timestamp for sample in received], [1.0, 3.0, 4.0])
+        self.assertIs(received[1].error, error)
+        self.assertEqual(received[2].values, {"Battery_Voltage": 53.0})
+
+if __name__ == "__main__":
+    unittest.main()
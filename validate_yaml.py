@@ -1,12 +1,20 @@
 #!/usr/bin/env python3
 import sys
+import argparse
+import bisect
+import glob
+import json
+import os
+import time
 import yaml
 import re
-import jsonschema
 import math
 from semantic_version import Version
+from profiling import add_profile_arguments, check_profile_arguments, profiled, stage, staged
 from enum import Enum
-from typing import Union, Dict, List, Tuple, Any
+from collections.abc import Sequence
+from array import array
+from typing import Union, Dict, List, Tuple, Any, Optional, Iterable
 
 class Result(Enum):
     OK = "OK"
@@ -24,7 +32,24 @@ class BaseType(Enum):
     FLOAT32 = "float32"
     FLOAT64 = "float64"
     BOOL = "bool"
-class ValueType:
+class Frozen:
+    """
+    Base class for immutable model objects with ``__slots__``.
+
+    Attributes are set once in ``__init__`` via ``_set``; afterwards they cannot be changed.
+    """
+    __slots__ = ()
+
+    def _set(self, **values):
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+class ValueType(Frozen):
     """
     Represents a data type (including optional array dimensions) and
     provides methods to compute the total number of bits and required 16-bit registers.
@@ -37,7 +62,12 @@ class ValueType:
       - bool: 8 bits (in practice)
       
     Array declarations are allowed in the form Type[N] (or multi-dimensional like Type[N][M]).
+
+    Instances are immutable and interned: ``ValueType(BaseType.CHAR, 16)`` always returns the
+    same object, with its bit and register sizes computed once.
     """
+    __slots__ = ("base_type", "dimension", "_total_bits", "_registers_required")
+
     # Mapping of base types to bit sizes
     bit_size_map = {
         BaseType.INT8: 8,
@@ -53,26 +83,38 @@ class ValueType:
         BaseType.FLOAT64: 64,
         BaseType.BOOL: 1,
     }
-    
-    def __init__(self, base_type: BaseType, dimension: int = 1):
+
+    # Interned instances by (base type, dimension)
+    _instances: Dict[Tuple[BaseType, int], "ValueType"] = {}
+
+    def __new__(cls, base_type: BaseType, dimension: int = 1):
         """
-        Initializes a DataType with the given base type and dimension.
+        Returns the DataType with the given base type and dimension.
         
         :param base_type: The BaseType enum value.
         :param dimension: The number of elements (default is 1).
         """
-        if dimension < 1:
-            raise ValueError("Dimension must be at least 1")
-        self.base_type: BaseType = base_type
-        self.dimension: int = dimension
+        key = (base_type, dimension)
+        instance = cls._instances.get(key)
+        if instance is None:
+            if dimension < 1:
+                raise ValueError("Dimension must be at least 1")
+            instance = super().__new__(cls)
+            total_bits = cls.bit_size_map[base_type] * dimension
+            instance._set(base_type=base_type, dimension=dimension, _total_bits=total_bits, _registers_required=math.ceil(total_bits / 16))
+            cls._instances[key] = instance
+        return instance
+
+    def __reduce__(self):
+        return (ValueType, (self.base_type, self.dimension))
 
     def total_bits(self) -> int:
-        """Calculates the total number of bits required for this data type."""
-        return self.bit_size_map[self.base_type] * self.dimension
+        """Returns the total number of bits required for this data type."""
+        return self._total_bits
 
     def registers_required(self) -> int:
-        """Calculates the number of 16-bit registers required (rounded up)."""
-        return math.ceil(self.total_bits() / 16)
+        """Returns the number of 16-bit registers required (rounded up)."""
+        return self._registers_required
     
     def __str__(self) -> str:
         """
@@ -84,6 +126,9 @@ class ValueType:
             return self.base_type.value
         else:
             return f"{self.base_type.value}[{self.dimension}]"
+
+    def __repr__(self) -> str:
+        return f"ValueType({self})"
     
     @classmethod
     def from_str(cls, type_str: str) -> Tuple[BaseType, int]:
@@ -105,19 +150,79 @@ class ValueType:
         dimension_str = match.group(2)
         dimension = int(dimension_str) if dimension_str else 1
         return cls(BaseType(base_type_str), dimension)
-class Register:
+class Register(Frozen):
+    __slots__ = ("id", "name", "address", "value_type", "unit", "hardware_support_register", "description")
+
     def __init__(self, id:str, name: str, value_type: ValueType, address: int, unit: str = None, hardware_support_register: int = None, description: str = ""):
-        self.id: str = id
-        self.name: str = name
-        self.address: int = address
-        self.value_type: ValueType = value_type
-        self.unit: str = unit
-        self.hardware_support_register: int = hardware_support_register
-        self.description: str = description
-class Coil:
+        self._set(id=id, name=name, address=address, value_type=value_type, unit=unit, hardware_support_register=hardware_support_register, description=description)
+
+    def __reduce__(self):
+        return (Register, (self.id, self.name, self.value_type, self.address, self.unit, self.hardware_support_register, self.description))
+
+    def __repr__(self) -> str:
+        return f"Register({self.id!r}, address={self.address}, value_type={self.value_type})"
+class Coil(Frozen):
+    __slots__ = ("parent_address", "address")
+
     def __init__(self, parent_address: int, address: int):
-        self.parent_address: int = parent_address
-        self.address: int = address
+        self._set(parent_address=parent_address, address=address)
+
+    def __reduce__(self):
+        return (Coil, (self.parent_address, self.address))
+class RegisterArray(Sequence):
+    """
+    Array-backed bulk storage for large register lists.
+
+    Addresses, coils and value types are kept in ``array`` columns and texts in shared lists,
+    so a map with many cells does not hold one Register object per field.
+    Registers are created on access.
+    """
+    __slots__ = ("ids", "names", "addresses", "type_indices", "units", "coils", "descriptions", "_types", "_type_index")
+
+    # Marker in the coil column for registers without hardware support register
+    NO_COIL = -1
+
+    def __init__(self, registers: Iterable[Register] = ()):
+        self.ids: List[str] = []
+        self.names: List[str] = []
+        self.addresses: array = array("q")
+        self.type_indices: array = array("H")
+        self.units: List[str] = []
+        self.coils: array = array("q")
+        self.descriptions: List[str] = []
+        self._types: List[ValueType] = []
+        self._type_index: Dict[ValueType, int] = {}
+        self.extend(registers)
+
+    def append(self, reg: Register):
+        type_index = self._type_index.get(reg.value_type)
+        if type_index is None:
+            type_index = len(self._types)
+            self._types.append(reg.value_type)
+            self._type_index[reg.value_type] = type_index
+        self.ids.append(reg.id)
+        self.names.append(reg.name)
+        self.addresses.append(reg.address)
+        self.type_indices.append(type_index)
+        self.units.append(reg.unit)
+        self.coils.append(self.NO_COIL if reg.hardware_support_register is None else reg.hardware_support_register)
+        self.descriptions.append(reg.description)
+
+    def extend(self, registers: Iterable[Register]):
+        for reg in registers:
+            self.append(reg)
+
+    def value_type(self, index: int) -> ValueType:
+        return self._types[self.type_indices[index]]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        coil = self.coils[index]
+        return Register(self.ids[index], self.names[index], self.value_type(index), self.addresses[index], self.units[index], None if coil == self.NO_COIL else coil, self.descriptions[index])
 class RegisterList:
     def __init__(self):
         self.general_registers: List[Register] = []
@@ -130,11 +235,9 @@ class RegisterList:
             address = self.next_address()
         if hardware_support_register == "auto":
             hardware_support_register = self.next_coil()
-        self.general_registers.append(Register(id, name, value_type, address, unit, hardware_support_register, description))
-        self.general_registers.sort(key=lambda x: x.address)
+        bisect.insort(self.general_registers, Register(id, name, value_type, address, unit, hardware_support_register, description), key=lambda x: x.address)
         if hardware_support_register is not None:
-            self.coils.append(Coil(address, hardware_support_register))
-            self.coils.sort(key=lambda x: x.address)
+            bisect.insort(self.coils, Coil(address, hardware_support_register), key=lambda x: x.address)
         return Result.OK
     def next_address(self) -> int:
         if self.general_registers:
@@ -153,11 +256,9 @@ class RegisterList:
             offset = self.next_cell_address()
         if hardware_support_register == "auto":
             hardware_support_register = self.next_coil()
-        self.cell_registers.append(Register(id, name, value_type, offset, unit, hardware_support_register, description))
-        self.cell_registers.sort(key=lambda x: x.address)
+        bisect.insort(self.cell_registers, Register(id, name, value_type, offset, unit, hardware_support_register, description), key=lambda x: x.address)
         if hardware_support_register is not None:
-            self.coils.append(Coil(offset, hardware_support_register))
-            self.coils.sort(key=lambda x: x.address)
+            bisect.insort(self.coils, Coil(offset, hardware_support_register), key=lambda x: x.address)
         return Result.OK
     def set_cell_start_address(self, address: Union[int, str]) -> Result:
         if address == "auto":
@@ -166,39 +267,116 @@ class RegisterList:
             self.cell_start_address = address
             return Result.OK
         return Result.ERROR
+    def effective_cell_start_address(self) -> int:
+        """
+        Liefert die Startadresse der Zellen, ohne die RegisterList zu verändern.
+
+        Ist keine Startadresse gesetzt, beginnen die Zellen direkt nach den allgemeinen Registern.
+        """
+        if self.cell_start_address is None:
+            return self.next_address()
+        return self.cell_start_address
     def get_cell_registers_size(self) -> int:
         last_cell_offset = 0
         last_cell_size = 0
         for reg in self.cell_registers:
-            if reg.address > last_cell_offset:
+            if reg.address >= last_cell_offset:
                 last_cell_offset = reg.address
                 last_cell_size = reg.value_type.registers_required()
         total_size = last_cell_offset + last_cell_size
         return total_size
     def get_all_registers(self, number_of_cells: int = 2) -> List[Register]:
-        if self.cell_start_address is None:
-            self.cell_start_address = self.next_address()
-        all_registers = []
-        all_registers.extend(self.general_registers)
-        total_size = self.get_cell_registers_size()
-        for i in range(1, number_of_cells + 1):
+        return list(self.view(number_of_cells))
+    def to_array(self, number_of_cells: int = 2) -> RegisterArray:
+        """
+        Speichert alle Register wie ``get_all_registers`` in einem platzsparenden RegisterArray.
+
+        :param number_of_cells: Die Anzahl der Zellen.
+        :return: Ein RegisterArray.
+        """
+        return RegisterArray(self.view(number_of_cells))
+    def view(self, number_of_cells: int = 2) -> "RegisterView":
+        """
+        Liefert eine Sicht auf die allgemeinen Register und die Zellregister aller Zellen,
+        ohne die Zellregister zu vervielfältigen.
+
+        :param number_of_cells: Die Anzahl der Zellen.
+        :return: Ein RegisterView.
+        """
+        return RegisterView(self, number_of_cells)
+    @staged("validate_address_overlaps")
+    def find_address_overlaps(self, number_of_cells: int = 49) -> List[str]:
+        """
+        Ermittelt alle Adressüberlappungen, ohne die Zellregister zu vervielfältigen.
+
+        Die allgemeinen Register und ein Zellblock werden jeweils einmal sortiert durchlaufen.
+        Überlappungen zwischen Zellen und mit den allgemeinen Registern werden aus der
+        Zellgröße und der Anzahl der Zellen berechnet.
+
+        :param number_of_cells: Die Anzahl der Zellen, für die geprüft wird.
+        :return: Eine Liste mit einer Meldung je Überlappung.
+        """
+        conflicts: List[str] = []
+
+        def report(prev_name: str, prev_address: int, prev_size: int, name: str, address: int, size: int):
+            conflicts.append(f"Adressüberlappung: Register '{prev_name}' (Bereich {prev_address}–{prev_address + prev_size}) und Register '{name}' (Bereich {address}–{address + size})")
+
+        def sweep(registers: List[Register], base_address: int = 0, name_suffix: str = ""):
+            # Registers are sorted by address; compare each one with the register reaching furthest so far
+            furthest = None
+            for reg in registers:
+                size = reg.value_type.registers_required()
+                if furthest is not None:
+                    furthest_size = furthest.value_type.registers_required()
+                    if reg.address < furthest.address + furthest_size:
+                        report(furthest.name + name_suffix, base_address + furthest.address, furthest_size, reg.name + name_suffix, base_address + reg.address, size)
+                    if reg.address + size <= furthest.address + furthest_size:
+                        continue
+                furthest = reg
+
+        sweep(self.general_registers)
+        if number_of_cells >= 1 and self.cell_registers:
+            cell_size = self.get_cell_registers_size()
+            cell_start = self.effective_cell_start_address()
+            sweep(self.cell_registers, cell_start, " 1")
+            first_cell_register = self.cell_registers[0]
+            if number_of_cells > 1:
+                # Fields reaching beyond the cell size overlap the next cell
+                for reg in self.cell_registers:
+                    size = reg.value_type.registers_required()
+                    if reg.address + size > cell_size:
+                        report(f"{reg.name} 1", cell_start + reg.address, size, f"{first_cell_register.name} 2", cell_start + cell_size + first_cell_register.address, first_cell_register.value_type.registers_required())
+            # Furthest end of the first i + 1 cell fields; fields may reach beyond the cell size
+            furthest_ends: List[int] = []
             for reg in self.cell_registers:
-                all_registers.append(Register(reg.id + f"_{i}", reg.name + f" {i}", reg.value_type, reg.address + self.cell_start_address + (i - 1) * total_size, reg.unit, reg.hardware_support_register))
-        return all_registers
-    def validate_address_overlaps(self, number_of_cells: int = 49) -> Result:
-        test_registers = self.get_all_registers(number_of_cells)
-        for i in range(1, len(test_registers)):
-            prev = test_registers[i - 1]
-            current = test_registers[i]
-            if current.address < prev.address + prev.value_type.registers_required():
-                print( f"Adressüberlappung: Register '{prev.name}' (Bereich {prev.address}–{prev.address + prev.value_type.registers_required()}) und Register '{current.name}' (Bereich {current.address}–{current.address + current.value_type.registers_required()})")
-                return Result.ERROR
+                furthest_ends.append(max(furthest_ends[-1] if furthest_ends else 0, reg.address + reg.value_type.registers_required()))
+            cell_reach = furthest_ends[-1]
+            for reg in self.general_registers:
+                size = reg.value_type.registers_required()
+                end = reg.address + size
+                # Only the cells whose fields reach into the register can overlap it
+                first_cell = max((reg.address - cell_start - cell_reach) // cell_size + 1, 0)
+                last_cell = min((end - cell_start - 1) // cell_size, number_of_cells - 1)
+                for cell in range(first_cell, last_cell + 1):
+                    base_address = cell_start + cell * cell_size
+                    # The first cell field ending after the start of the register
+                    index = bisect.bisect_right(furthest_ends, reg.address - base_address)
+                    cell_reg = self.cell_registers[index]
+                    if base_address + cell_reg.address < end:
+                        report(reg.name, reg.address, size, f"{cell_reg.name} {cell + 1}", base_address + cell_reg.address, cell_reg.value_type.registers_required())
+
         for i in range(1, len(self.coils)):
             prev = self.coils[i - 1]
             current = self.coils[i]
-            if current.address < prev.address:
-                print(f"Adressüberlappung: Coil '{prev.parent_address}' (Bereich {prev.address}) und Coil '{current.parent_address}' (Bereich {current.address})")
-                return Result.ERROR
+            if current.address == prev.address:
+                conflicts.append(f"Adressüberlappung: Coil '{prev.parent_address}' (Bereich {prev.address}) und Coil '{current.parent_address}' (Bereich {current.address})")
+        return conflicts
+    def validate_address_overlaps(self, number_of_cells: int = 49) -> Result:
+        conflicts = self.find_address_overlaps(number_of_cells)
+        for conflict in conflicts:
+            print(conflict)
+        if conflicts:
+            return Result.ERROR
         return Result.OK
     def register_to_dict(self) -> Dict[str, Union[Version, Dict[str, Any]]]:
         """
@@ -254,11 +432,106 @@ class RegisterList:
             "register": registers_dict
         }
 
+class RegisterView(Sequence):
+    """
+    Lazy sequence of the general registers followed by the cell registers of each cell,
+    in the same order as ``RegisterList.get_all_registers``.
+
+    Cell registers are created on access from the cell start address and the cell size.
+    Lookups by address use binary search, lookups by id a dictionary of the base registers.
+    The view reflects the RegisterList at creation time.
+    """
+    def __init__(self, registers: RegisterList, number_of_cells: int):
+        self.registers: RegisterList = registers
+        self.number_of_cells: int = number_of_cells
+        self.cell_start_address: int = registers.effective_cell_start_address()
+        self.cell_size: int = registers.get_cell_registers_size()
+        self._general: List[Register] = list(registers.general_registers)
+        self._cells: List[Register] = list(registers.cell_registers)
+        self._general_addresses: List[int] = [reg.address for reg in self._general]
+        self._cell_offsets: List[int] = [reg.address for reg in self._cells]
+        self._general_by_id: Dict[str, Register] = {reg.id: reg for reg in self._general}
+        self._cells_by_id: Dict[str, int] = {reg.id: i for i, reg in enumerate(self._cells)}
+
+    def __len__(self) -> int:
+        return len(self._general) + self.number_of_cells * len(self._cells)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("RegisterView index out of range")
+        if index < len(self._general):
+            return self._general[index]
+        cell, position = divmod(index - len(self._general), len(self._cells))
+        return self.cell_register(self._cells[position], cell + 1)
+
+    def cell_register(self, reg: Register, cell: int) -> Register:
+        """
+        Erzeugt das Zellregister einer Zelle.
+
+        :param reg: Das Zellregister aus ``RegisterList.cell_registers``.
+        :param cell: Die Nummer der Zelle, beginnend mit 1.
+        :return: Das Register mit Id, Name und Adresse der Zelle.
+        """
+        address = reg.address + self.cell_start_address + (cell - 1) * self.cell_size
+        return Register(reg.id + f"_{cell}", reg.name + f" {cell}", reg.value_type, address, reg.unit, reg.hardware_support_register, reg.description)
+
+    def register_at(self, address: int) -> Optional[Register]:
+        """
+        Sucht das Register, das die angegebene Adresse belegt.
+
+        :param address: Eine Holding-Register-Adresse.
+        :return: Das Register oder None, falls die Adresse nicht belegt ist.
+        """
+        index = bisect.bisect_right(self._general_addresses, address) - 1
+        if index >= 0:
+            reg = self._general[index]
+            if address < reg.address + reg.value_type.registers_required():
+                return reg
+        if not self._cells or self.cell_size <= 0 or address < self.cell_start_address:
+            return None
+        cell, offset = divmod(address - self.cell_start_address, self.cell_size)
+        if cell >= self.number_of_cells:
+            return None
+        index = bisect.bisect_right(self._cell_offsets, offset) - 1
+        if index >= 0:
+            reg = self._cells[index]
+            if offset < reg.address + reg.value_type.registers_required():
+                return self.cell_register(reg, cell + 1)
+        return None
+
+    def by_id(self, id: str) -> Register:
+        """
+        Sucht ein Register anhand seiner Id, z.B. ``Battery_Voltage`` oder ``Cell_Voltage_17``.
+
+        :param id: Die Id des Registers, bei Zellregistern mit angehängter Zellnummer.
+        :return: Das Register.
+        :raises KeyError: Wenn es kein Register mit dieser Id gibt.
+        """
+        reg = self._general_by_id.get(id)
+        if reg is not None:
+            return reg
+        base, _, cell = id.rpartition("_")
+        index = self._cells_by_id.get(base)
+        if index is not None and cell.isdigit() and 1 <= int(cell) <= self.number_of_cells:
+            return self.cell_register(self._cells[index], int(cell))
+        raise KeyError(id)
+
+# libyaml-based loader if PyYAML was built with it, otherwise the pure-Python loader
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+@staged("load_yaml")
 def load_yaml(filepath):
     with open(filepath, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=YamlLoader)
 
+@staged("validate_schema")
 def validate_schema(data, schema):
+    # Imported here as jsonschema dominates the import time of this module
+    import jsonschema
     try:
         jsonschema.validate(instance=data, schema=schema)
         print("Schema-Validierung erfolgreich!")
@@ -267,6 +540,7 @@ def validate_schema(data, schema):
         print(e)
         sys.exit(1)
 
+@staged("generate_registers")
 def generate_registers(data) -> RegisterList:
     """
     Erzeugt aus den Daten die Listen mit Register- und Coil-Tupeln,
@@ -302,19 +576,115 @@ def generate_registers(data) -> RegisterList:
         registers.add_cell_registers(id, name, vt, offset, unit, coil, description)
     return registers
 
-def main():
-    if len(sys.argv) != 3:
-        print("Usage: python validate_jsonschema.py <schema.json> <data.yaml>")
-        sys.exit(1)
-    schema_file = sys.argv[1]
-    data_file = sys.argv[2]
-    
+def compile_validator(schema):
+    """
+    Prüft das Schema und erzeugt daraus einen wiederverwendbaren Validator.
+    """
+    import jsonschema
+    validator_class = jsonschema.validators.validator_for(schema)
+    validator_class.check_schema(schema)
+    return validator_class(schema)
+
+def validate_file(data_file: str, validator, number_of_cells: int = 49) -> Dict[str, Any]:
+    """
+    Validiert eine Daten-Datei und sammelt alle Fehler, statt beim ersten Fehler abzubrechen.
+
+    :param data_file: Pfad zur YAML-Datei.
+    :param validator: Ein mit ``compile_validator`` erzeugter Validator.
+    :param number_of_cells: Die Anzahl der Zellen für die Prüfung auf Adressüberlappungen.
+    :return: Ein Dictionary mit Datei, Ergebnis, Fehlern und Laufzeiten je Schritt in Sekunden.
+    """
+    report: Dict[str, Any] = {"file": data_file, "result": Result.OK.value, "errors": [], "timings": {}}
+    timings = report["timings"]
+    start = time.perf_counter()
+
+    def fail(kind: str, message: str):
+        report["result"] = Result.ERROR.value
+        report["errors"].append({"type": kind, "message": message})
+
     try:
-        schema = load_yaml(schema_file)
+        data = load_yaml(data_file)
     except Exception as e:
-        print("Fehler beim Laden des Schema-Files:", e)
-        sys.exit(1)
-    
+        fail("load", str(e))
+    else:
+        timings["load"] = time.perf_counter() - start
+        step = time.perf_counter()
+        with stage("validate_schema"):
+            errors = sorted(validator.iter_errors(data), key=lambda e: list(e.absolute_path))
+        for error in errors:
+            path = "/".join(str(part) for part in error.absolute_path)
+            fail("schema", f"{path}: {error.message}" if path else error.message)
+        timings["schema"] = time.perf_counter() - step
+        step = time.perf_counter()
+        try:
+            registers = generate_registers(data)
+        except Exception as e:
+            fail("registers", str(e))
+        else:
+            timings["registers"] = time.perf_counter() - step
+            step = time.perf_counter()
+            for conflict in registers.find_address_overlaps(number_of_cells):
+                fail("overlap", conflict)
+            timings["overlaps"] = time.perf_counter() - step
+    timings["total"] = time.perf_counter() - start
+    return report
+
+_worker_validator = None
+
+def _init_worker(schema):
+    global _worker_validator
+    _worker_validator = compile_validator(schema)
+
+def _validate_in_worker(data_file: str, number_of_cells: int) -> Dict[str, Any]:
+    return validate_file(data_file, _worker_validator, number_of_cells)
+
+def expand_paths(patterns: List[str]) -> List[str]:
+    """
+    Expandiert Glob-Muster zu Dateipfaden. Muster ohne Treffer werden unverändert übernommen.
+    """
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True))
+        paths.extend(matches if matches else [pattern])
+    return list(dict.fromkeys(paths))
+
+def validate_files(schema, data_files: List[str], jobs: Optional[int] = None, number_of_cells: int = 49) -> List[Dict[str, Any]]:
+    """
+    Validiert mehrere Daten-Dateien gegen ein Schema, bei Bedarf parallel in mehreren Prozessen.
+
+    Der Validator wird je Prozess nur einmal erzeugt.
+
+    :param schema: Das geladene JSON-Schema.
+    :param data_files: Pfade der YAML-Dateien.
+    :param jobs: Anzahl der Prozesse. Standard ist die Anzahl der CPUs, 1 validiert im aktuellen Prozess.
+    :param number_of_cells: Die Anzahl der Zellen für die Prüfung auf Adressüberlappungen.
+    :return: Je Datei ein Bericht wie von ``validate_file``, in der Reihenfolge von ``data_files``.
+    """
+    if jobs is None:
+        jobs = min(len(data_files), os.cpu_count() or 1)
+    if jobs <= 1 or len(data_files) <= 1:
+        validator = compile_validator(schema)
+        return [validate_file(data_file, validator, number_of_cells) for data_file in data_files]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(schema,)) as executor:
+        return list(executor.map(_validate_in_worker, data_files, [number_of_cells] * len(data_files)))
+
+def validate_single(schema, data_file: str, schema_file: Optional[str] = None, cache_dir: Optional[str] = None):
+    """
+    Validiert eine Daten-Datei und beendet das Programm bei Fehlern.
+
+    Mit ``schema_file`` und ``cache_dir`` gilt ein Treffer im Register-Map-Cache als bereits
+    validiert, und eine erfolgreich validierte Datei wird im Cache abgelegt.
+    """
+    cache_file = None
+    if schema_file is not None and cache_dir is not None:
+        # Imported here as map_cache builds on this module
+        import map_cache
+        cache_file = map_cache.cache_path(data_file, schema_file, cache_dir)
+        if map_cache.read_cached_map(cache_file) is not None:
+            print("Unverändert seit der letzten erfolgreichen Validierung (Cache).")
+            print("Alle Validierungen erfolgreich.")
+            return
     try:
         data = load_yaml(data_file)
     except Exception as e:
@@ -336,6 +706,68 @@ def main():
         sys.exit(1)
     else:
         print("Alle Validierungen erfolgreich.")
+        if cache_file is not None:
+            map_cache.write_cached_map(cache_file, registers)
+
+def validate_batch(schema, data_files: List[str], jobs: Optional[int], report_file: Optional[str]):
+    start = time.perf_counter()
+    try:
+        reports = validate_files(schema, data_files, jobs)
+    except Exception as e:
+        print("Fehler im Schema-File:", e)
+        sys.exit(1)
+    failed = [report for report in reports if report["result"] != Result.OK.value]
+    summary = {
+        "result": Result.ERROR.value if failed else Result.OK.value,
+        "files": len(reports),
+        "failed": len(failed),
+        "duration": time.perf_counter() - start,
+        "reports": reports,
+    }
+    if report_file == "-":
+        json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        for report in reports:
+            print(f"{report['result']:<5} {report['file']} ({report['timings']['total'] * 1000:.1f} ms)")
+            for error in report["errors"]:
+                print(f"      [{error['type']}] {error['message']}")
+        if report_file:
+            with open(report_file, "w", encoding="utf-8") as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+        if failed:
+            print(f"{len(failed)} von {len(reports)} Dateien mit Validierungsfehlern.")
+        else:
+            print(f"Alle {len(reports)} Dateien erfolgreich validiert.")
+    if failed:
+        sys.exit(1)
+
+def main():
+    # Imported here as map_cache builds on this module
+    from map_cache import DEFAULT_CACHE_DIR
+    parser = argparse.ArgumentParser(description="Validate YAML register maps against the JSON schema.")
+    parser.add_argument("schema_file", help="Path to the JSON schema")
+    parser.add_argument("data_files", nargs="+", help="YAML files or glob patterns. More than one file switches to batch mode.")
+    parser.add_argument("--jobs", "-j", type=int, help="Number of worker processes in batch mode (default: number of CPUs)")
+    parser.add_argument("--report", "-r", help="Write a JSON report in batch mode ('-' for stdout)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help=f"Compiled-map cache directory; a file found there counts as validated (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--no-cache", action="store_true", help="Always load and validate the YAML file")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    check_profile_arguments(parser, args)
+
+    with profiled(args.profile, args.profile_format):
+        try:
+            schema = load_yaml(args.schema_file)
+        except Exception as e:
+            print("Fehler beim Laden des Schema-Files:", e)
+            sys.exit(1)
+
+        data_files = expand_paths(args.data_files)
+        if len(data_files) == 1 and args.report is None and args.jobs is None:
+            validate_single(schema, data_files[0], args.schema_file, None if args.no_cache else args.cache_dir)
+        else:
+            validate_batch(schema, data_files, args.jobs, args.report)
 
 if __name__ == "__main__":
     main()